@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api.settings')
+# Run the read-heavy views in a thread pool, see core.async_views
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Sends the streamed exports without blocking the event loop
+from core.streaming import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +27,9 @@ SECRET_KEY = 'django-insecure-b0o2(!h=tnqzc0oe$1@gv^9^owx#3(l*r3l5ox1yyliz+mb=)t
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Whether the process runs the test suite
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = []
 
 
@@ -45,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RateLimitMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,11 +86,71 @@ WSGI_APPLICATION = 'api.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DJANGO_DB_ENGINE=postgresql switches from SQLite to PostgreSQL, set up
+# by the other DJANGO_DB_ variables. Connections are kept for
+# DJANGO_DB_CONN_MAX_AGE seconds instead of being opened per request.
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'api'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 60)),
+            # Behind a pooler in transaction mode, e.g. PgBouncer, cursors
+            # cannot outlive the transaction that opened them
+            'DISABLE_SERVER_SIDE_CURSORS':
+                os.environ.get('DJANGO_DB_POOLER') == 'transaction',
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('DJANGO_DB_CONN_MAX_AGE', 60)),
+        }
     }
+
+# Read replicas of the PostgreSQL database, one per host of
+# DJANGO_DB_REPLICA_HOSTS, e.g. "replica1:5432,replica2:5432". Safe
+# requests to the blog end-points read from them, see core.routers.
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': int(os.environ.get('DJANGO_DB_REPLICA_LAG', 5)),
+}
+
+if DB_ENGINE == 'postgresql':
+    for index, address in enumerate(filter(None, os.environ.get(
+        'DJANGO_DB_REPLICA_HOSTS', ''
+    ).split(','))):
+        host, _, port = address.strip().partition(':')
+        DATABASES[f'replica{index + 1}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'PORT': port or DATABASES['default']['PORT'],
+            # Tests read the replicas through the test primary
+            'TEST': {'MIRROR': 'default'},
+        }
+        DATABASE_REPLICAS['ALIASES'].append(f'replica{index + 1}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Set on every new SQLite connection, see core.db. WAL lets readers go on
+# while a transaction writes, busy_timeout is how long, in milliseconds,
+# a writer waits for the lock of another.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 
@@ -104,6 +172,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing, see core.hashers. The first hasher hashes the new
+# passwords, the hashes of the others are upgraded on login. argon2 needs
+# the argon2-cffi package and bcrypt the bcrypt package.
+PREFERRED_PASSWORD_HASHER = os.environ.get('DJANGO_PASSWORD_HASHER', 'pbkdf2')
+
+PASSWORD_HASHERS = sorted(
+    [
+        'core.hashers.PBKDF2PasswordHasher',
+        'core.hashers.Argon2PasswordHasher',
+        'core.hashers.BCryptSHA256PasswordHasher',
+    ],
+    key=lambda path: PREFERRED_PASSWORD_HASHER not in path.lower()
+) + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'PBKDF2_ITERATIONS': int(
+        os.environ.get('DJANGO_PBKDF2_ITERATIONS', 260000)
+    ),
+    'BCRYPT_ROUNDS': int(os.environ.get('DJANGO_BCRYPT_ROUNDS', 12)),
+    # Passwords hashed at once per process, the logins over it wait
+    'MAX_CONCURRENCY': int(
+        os.environ.get('DJANGO_HASHING_CONCURRENCY', os.cpu_count() or 1)
+    ),
+    'QUEUE_TIMEOUT': 5,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -134,3 +231,171 @@ STATIC_ROOT = '/vol/web/static'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+
+# Django REST framework
+# https://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'post.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.TokenBucketThrottle',
+        'core.throttling.ConcurrencyThrottle',
+    ],
+    # Requests per user, or per address for anonymous ones, by scope
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '1200/min',
+        'write': '300/min',
+        'upload': '30/min',
+        'auth': '20/min',
+    },
+}
+
+# Storage of the rate limit buckets, see core.throttling. Use the 'cache'
+# store with a shared cache to limit the clients over every process.
+# Off for the test suite, the tests of the limits turn them on.
+RATE_LIMITS = {
+    'ENABLED': os.environ.get(
+        'DJANGO_RATE_LIMITS',
+        '0' if TESTING else '1'
+    ) == '1',
+    'STORE': os.environ.get('DJANGO_RATE_LIMIT_STORE', 'local'),
+    'CACHE_ALIAS': 'default',
+    'MAX_CONCURRENT_REQUESTS': 16,
+}
+
+# Cache of the authenticated token lookups, see user.authentication. Kept
+# in the default cache behind a short-lived copy in memory, so that every
+# process sees the deleted tokens and deactivated users within LOCAL_TTL
+# seconds.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': 'default',
+    'LOCAL_TTL': 5,
+}
+
+# Caches
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+#
+# The version stamps behind the ETags of the post API, the versions of
+# the cached post representations and the replica pins of the clients
+# must be shared by all the processes serving the API.
+# DJANGO_CACHE_BACKEND=memcached (requires pymemcache) or redis (requires
+# django-redis) keeps the caches on the servers of DJANGO_CACHE_LOCATION,
+# e.g. "cache1:11211,cache2:11211" or "redis://cache:6379/0". The
+# per-process default is rejected by `check --deploy` when several
+# workers serve the API.
+CACHE_BACKENDS = {
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND in CACHE_BACKENDS:
+    CACHES = {
+        alias: {
+            'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+            'LOCATION': os.environ['DJANGO_CACHE_LOCATION'].split(','),
+            'KEY_PREFIX': alias,
+        }
+        for alias in ('default', 'posts')
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'posts': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'posts',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        },
+    }
+
+# Number of processes serving the API, as started by gunicorn.conf.py
+SERVER_WORKERS = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    (os.cpu_count() or 1) * 2 + 1
+))
+
+POST_VERSION_CACHE_ALIAS = 'default'
+
+# Cache of the serialized posts, see post.representations
+POST_REPRESENTATION_CACHE = {
+    'CACHE_ALIAS': 'posts',
+    'TIMEOUT': 60 * 60,
+}
+
+# Always stream uploads to a temporary file instead of memory, so that the
+# storage only has to move the file into MEDIA_ROOT.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Thread pool running the background tasks, see core.tasks
+BACKGROUND_TASKS = {
+    'WORKERS': 2,
+    'ALWAYS_EAGER': False,
+}
+
+# Resized copies generated for every uploaded post image, see post.images
+POST_IMAGE_VARIANTS = {
+    'SIZES': {
+        'thumbnail': 150,
+        'small': 480,
+        'medium': 1024,
+    },
+    'FORMATS': {
+        'webp': 80,
+        'jpeg': 85,
+    },
+}
+
+# Fan-out of the new posts into the feeds of the followers, see post.feed
+FEED = {
+    'FANOUT_LIMIT': 10000,
+    'BATCH_SIZE': 1000,
+    'BACKFILL': 100,
+}
+
+# In-process prefix indexes of the tags, see post.suggest
+TAG_SUGGESTIONS = {
+    'MAX_USERS': 10000,
+    'TIMEOUT': 300,
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+# Maximum number of objects accepted by the bulk end-points
+BULK_MAX_ITEMS = 10000
+
+# Request metrics exposed at /api/metrics/, see core.metrics
+REQUEST_METRICS = {
+    'ENABLED': True,
+    'SLOW_REQUEST_SECONDS': 1.0,
+    'SLOW_QUERIES': 5,
+}
+
+# Serve the read-heavy views from a thread pool under ASGI, see
+# core.async_views. api/asgi.py turns this on for ASGI servers.
+ASYNC_VIEWS = {
+    'ENABLED': os.environ.get('DJANGO_ASYNC_VIEWS') == '1',
+    'MAX_CONCURRENCY': int(os.environ.get('DJANGO_ASYNC_CONCURRENCY', 32)),
+    'QUEUE_TIMEOUT': 10,
+}
+
+# Build the default list representations from .values() rows instead of
+# serializers, see post.fastpath
+FAST_LIST_SERIALIZATION = True
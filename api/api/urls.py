@@ -18,8 +18,12 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import HealthView, MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/post/', include('post.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('api/health/', HealthView.as_view(), name='health'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,104 @@
+"""
+Serve synchronous views from the ASGI event loop.
+
+Under ASGI, Django runs synchronous views one at a time in a single
+thread. `as_async_view` turns a view into a coroutine that runs the view
+in a pool of threads instead, so that a slow request does not hold up
+the others, and bounds the number of views running at once so that the
+database is not flooded. Requests waiting longer than QUEUE_TIMEOUT for
+a slot are answered with 503 Service Unavailable.
+"""
+import asyncio
+import functools
+import weakref
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+
+DEFAULTS = {
+    # Route the views wrapped by as_async_view through the thread pool
+    'ENABLED': False,
+    # Number of views running at once per process
+    'MAX_CONCURRENCY': 32,
+    # Seconds a request waits for a free slot before getting a 503
+    'QUEUE_TIMEOUT': 10,
+}
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'ASYNC_VIEWS', {})}
+
+
+def _get_semaphore(name, limit):
+    """Return the named semaphore limiting views in the running event loop"""
+    semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get(name)
+    if semaphore is None:
+        semaphore = semaphores[name] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+def _run_view(view, request, *args, **kwargs):
+    """Run a view in a pool thread with its own database connection"""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        # Render in this thread, not in the thread of the event loop
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view, max_concurrency=None):
+    """
+    Wrap a synchronous view in a coroutine running it in a thread pool.
+    The view is returned unchanged when ASYNC_VIEWS is not enabled, e.g.
+    under WSGI where the wrapper would only add overhead.
+    :param view: The view function, e.g. from ViewSet.as_view()
+    :param max_concurrency: Number of requests to this view running at
+    once, instead of sharing the MAX_CONCURRENCY slots of the other views
+    :return: The async view, keeping the attributes of the view
+    """
+    options = get_options()
+    if not options['ENABLED']:
+        return view
+
+    run = sync_to_async(
+        functools.partial(_run_view, view),
+        thread_sensitive=False
+    )
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if max_concurrency is None:
+            semaphore = _get_semaphore(None, options['MAX_CONCURRENCY'])
+        else:
+            semaphore = _get_semaphore(view, max_concurrency)
+        try:
+            await asyncio.wait_for(
+                semaphore.acquire(),
+                options['QUEUE_TIMEOUT']
+            )
+        except asyncio.TimeoutError:
+            response = JsonResponse(
+                {'detail': 'The server is busy, try again later.'},
+                status=503
+            )
+            response['Retry-After'] = str(max(1, round(
+                options['QUEUE_TIMEOUT']
+            )))
+            return response
+
+        try:
+            return await run(request, *args, **kwargs)
+        finally:
+            semaphore.release()
+
+    return async_view
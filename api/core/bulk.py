@@ -0,0 +1,40 @@
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+
+def bulk_create_with_ids(model, objs, batch_size=500):
+    """
+    Insert objects in batches and set their primary keys.
+
+    Django only sets the primary keys after bulk_create on databases that
+    can return rows from a bulk insert. SQLite assigns consecutive ids to
+    the rows of an insert and holds the write lock until the transaction
+    ends, so the ids of every batch can be read back from the maximum.
+    Other databases fall back to saving the objects one by one.
+    :param model: The model class of the objects
+    :param objs: List of unsaved model objects
+    :param batch_size: Number of objects per INSERT statement
+    :return: The list of objects, with their primary keys set
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    manager = model._base_manager.using(using)
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        return manager.bulk_create(objs, batch_size=batch_size)
+
+    with transaction.atomic(using=using):
+        if connection.vendor != 'sqlite':
+            for obj in objs:
+                obj.save(force_insert=True, using=using)
+            return objs
+
+        for start in range(0, len(objs), batch_size):
+            batch = objs[start:start + batch_size]
+            manager.bulk_create(batch)
+            last_id = manager.aggregate(last_id=Max('pk'))['last_id']
+            for offset, obj in enumerate(batch):
+                obj.pk = last_id - len(batch) + 1 + offset
+                obj._state.adding = False
+                obj._state.db = using
+    return objs
@@ -0,0 +1,79 @@
+"""
+Database connection set-up and health checks.
+"""
+import functools
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger('core.db')
+
+_PRAGMA_TOKEN = re.compile(r'^[A-Za-z0-9_]+$')
+
+
+def configure_sqlite(connection):
+    """
+    Apply the SQLITE_PRAGMAS setting to a new SQLite connection
+    :param connection: The database wrapper of the connection
+    :return: None
+    """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if not (_PRAGMA_TOKEN.match(name) and
+                    _PRAGMA_TOKEN.match(str(value))):
+                raise ValueError(f'Invalid SQLite pragma {name}={value}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def _check(checks, name, probe):
+    try:
+        probe()
+        checks[name] = None
+    except Exception as exc:
+        logger.warning('Health check of %s failed', name, exc_info=True)
+        checks[name] = type(exc).__name__
+
+
+def _query_database(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def _round_trip_cache(alias):
+    cache = caches[alias]
+    cache.set('health-check', 1, 10)
+    cache.get('health-check')
+
+
+def check_health():
+    """
+    Run a trivial query on every database and a round trip to every cache.
+    The API is down without the primary database and the caches, while
+    the reads of a failed replica go to the primary.
+    :return: Tuple of the required and the optional checks, each a dict
+    of the checked service to None when it works, else the type of the
+    error. The errors themselves are logged.
+    """
+    required = {}
+    optional = {}
+    for alias in connections:
+        _check(
+            required if alias == DEFAULT_DB_ALIAS else optional,
+            f'database:{alias}',
+            functools.partial(_query_database, alias)
+        )
+    for alias in settings.CACHES:
+        _check(
+            required,
+            f'cache:{alias}',
+            functools.partial(_round_trip_cache, alias)
+        )
+    return required, optional
@@ -0,0 +1,133 @@
+"""
+Password hashers with a cost taken from the settings.
+
+The first of PASSWORD_HASHERS hashes the new passwords and
+PASSWORD_HASHING sets the cost of every algorithm. Django verifies a
+password with the hasher of its stored hash and, when that hasher or its
+cost differs from the preferred one, hashes the password again on the
+next successful login, so changing the settings upgrades (or downgrades)
+the stored hashes transparently.
+
+Hashing is meant to be slow and takes a core per login; `hashing_slot`
+bounds the number of hashes computed at once so that a burst of logins
+cannot take every worker thread from the other end-points.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core import checks
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'PBKDF2_ITERATIONS': hashers.PBKDF2PasswordHasher.iterations,
+    'ARGON2_TIME_COST': hashers.Argon2PasswordHasher.time_cost,
+    # In KiB
+    'ARGON2_MEMORY_COST': hashers.Argon2PasswordHasher.memory_cost,
+    'ARGON2_PARALLELISM': hashers.Argon2PasswordHasher.parallelism,
+    # The work of bcrypt is 2 ** BCRYPT_ROUNDS
+    'BCRYPT_ROUNDS': hashers.BCryptSHA256PasswordHasher.rounds,
+    # Number of passwords hashed at once per process, one per core
+    'MAX_CONCURRENCY': os.cpu_count() or 1,
+    # Seconds a login waits for a free slot before getting a 503
+    'QUEUE_TIMEOUT': 5,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return get_options()['PBKDF2_ITERATIONS']
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return get_options()['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return get_options()['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return get_options()['ARGON2_PARALLELISM']
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return get_options()['BCRYPT_ROUNDS']
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The server is busy, try again later.'
+    default_code = 'hashing_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # Sent as the Retry-After header by the DRF exception handler
+        self.wait = wait
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _get_slots(limit):
+    global _slots
+    with _slots_lock:
+        if _slots is None or _slots[0] != limit:
+            _slots = (limit, threading.BoundedSemaphore(limit))
+        return _slots[1]
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Wait for one of the MAX_CONCURRENCY slots for hashing passwords
+    :return: Context manager holding the slot
+    :raises HashingBusy: When no slot got free within QUEUE_TIMEOUT
+    """
+    options = get_options()
+    slots = _get_slots(options['MAX_CONCURRENCY'])
+    if not slots.acquire(timeout=options['QUEUE_TIMEOUT']):
+        raise HashingBusy(max(1, round(options['QUEUE_TIMEOUT'])))
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+class HashingSlotMixin:
+    """API view mixin computing password hashes in a hashing slot"""
+
+    def post(self, request, *args, **kwargs):
+        with hashing_slot():
+            return super().post(request, *args, **kwargs)
+
+
+@checks.register(checks.Tags.security)
+def check_password_hasher(app_configs, **kwargs):
+    """Check the library of the preferred hasher is installed"""
+    hasher = hashers.get_hasher('default')
+    if hasher.library is None:
+        return []
+    try:
+        hasher._load_library()
+    except ValueError as exc:
+        return [checks.Error(
+            f'The preferred password hasher cannot be used: {exc}',
+            hint='Install the library or change PASSWORD_HASHERS.',
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,93 @@
+import json
+import threading
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from core import hashers
+
+HASHERS = {
+    'pbkdf2': hashers.PBKDF2PasswordHasher,
+    'argon2': hashers.Argon2PasswordHasher,
+    'bcrypt': hashers.BCryptSHA256PasswordHasher,
+}
+
+PASSWORD = 'correct horse battery staple'
+
+
+def measure_logins(hasher, logins, threads=1):
+    """
+    Verify a password repeatedly, like logins do
+    :param hasher: The password hasher
+    :param logins: Number of verifications per thread
+    :param threads: Number of threads verifying at once
+    :return: Number of verifications per second
+    """
+    encoded = hasher.encode(PASSWORD, hasher.salt())
+
+    def login():
+        for _ in range(logins):
+            hasher.verify(PASSWORD, encoded)
+
+    workers = [threading.Thread(target=login) for _ in range(threads)]
+    start = perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return logins * threads / (perf_counter() - start)
+
+
+class Command(BaseCommand):
+    """
+    Measure the logins per second the password hashers allow with the
+    costs of PASSWORD_HASHING. One thread measures the logins per core;
+    --threads shows how the hashing scales over the cores.
+    """
+    help = 'Measure the password verifications per second of the hashers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20,
+                            help='Verifications per thread and hasher')
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--json', action='store_true',
+                            help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        for name, hasher_class in HASHERS.items():
+            hasher = hasher_class()
+            if hasher.library is not None:
+                try:
+                    hasher._load_library()
+                except ValueError:
+                    self.stderr.write(f'{name}: the library is not '
+                                      f'installed, skipped')
+                    continue
+
+            per_core = measure_logins(hasher, options['logins'])
+            result = {
+                'hasher': name,
+                'logins_per_second_per_core': round(per_core, 1),
+                'milliseconds_per_login': round(1000 / per_core, 1),
+            }
+            if options['threads'] > 1:
+                result['logins_per_second'] = round(measure_logins(
+                    hasher,
+                    options['logins'],
+                    options['threads']
+                ), 1)
+            results.append(result)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            line = (f'{result["hasher"]:<8} '
+                    f'{result["milliseconds_per_login"]:>8.1f} ms/login '
+                    f'{result["logins_per_second_per_core"]:>8.1f} '
+                    f'logins/s/core')
+            if 'logins_per_second' in result:
+                line += (f' {result["logins_per_second"]:>8.1f} logins/s '
+                         f'with {options["threads"]} threads')
+            self.stdout.write(line)
@@ -0,0 +1,254 @@
+"""
+In-process request metrics.
+
+The metrics middleware measures every request served by a view and
+aggregates the measures into histograms labelled by view and action.
+The histograms live in the memory of each process and are exposed in
+the Prometheus text format, so every worker has to be scraped.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+
+DEFAULTS = {
+    # Whether the middleware records anything
+    'ENABLED': True,
+    # Requests slower than this, in seconds, are logged with their SQL
+    'SLOW_REQUEST_SECONDS': 1.0,
+    # Number of the slowest SQL statements kept for the slow request log
+    'SLOW_QUERIES': 5,
+}
+
+TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LABEL_NAMES = ('view', 'action', 'method', 'status')
+
+_current = ContextVar('request_metrics', default=None)
+_serializing = ContextVar('serializing', default=False)
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class Histogram:
+    """Cumulative histogram of observed values, safe to share by threads"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """Return the cumulative bucket counts, the sum and the count"""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class MetricsRegistry:
+    """Named histograms, one per combination of label values"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, description, buckets):
+        with self._lock:
+            self._metrics.setdefault(name, (description, buckets, {}))
+
+    def observe(self, name, labels, value):
+        """
+        Add a value to a histogram
+        :param name: Name of the registered metric
+        :param labels: Tuple of label values, in the order of LABEL_NAMES
+        :param value: The observed value
+        :return: None
+        """
+        description, buckets, series = self._metrics[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(labels, Histogram(buckets))
+        histogram.observe(value)
+
+    def clear(self):
+        with self._lock:
+            for description, buckets, series in self._metrics.values():
+                series.clear()
+
+    def render(self):
+        """
+        Render all the histograms in the Prometheus text format
+        :return: The exposition text
+        """
+        lines = []
+        with self._lock:
+            metrics = [
+                (name, description, buckets, list(series.items()))
+                for name, (description, buckets, series)
+                in sorted(self._metrics.items())
+            ]
+
+        for name, description, buckets, series in metrics:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in sorted(series):
+                label_text = ','.join(
+                    f'{key}="{_escape(value)}"'
+                    for key, value in zip(LABEL_NAMES, labels)
+                )
+                cumulative, total, count = histogram.snapshot()
+                bounds = [_format(bound) for bound in buckets] + ['+Inf']
+                for bound, bucket_count in zip(bounds, cumulative):
+                    lines.append(
+                        f'{name}_bucket{{{label_text},le="{bound}"}} '
+                        f'{bucket_count}'
+                    )
+                lines.append(f'{name}_sum{{{label_text}}} {_format(total)}')
+                lines.append(f'{name}_count{{{label_text}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+registry.register(
+    'http_request_duration_seconds',
+    'Wall time spent serving the request.',
+    TIME_BUCKETS
+)
+registry.register(
+    'http_request_db_queries',
+    'Number of database queries run by the request.',
+    COUNT_BUCKETS
+)
+registry.register(
+    'http_request_db_duration_seconds',
+    'Time spent in database queries by the request.',
+    TIME_BUCKETS
+)
+registry.register(
+    'http_request_serializer_duration_seconds',
+    'Time spent serializing objects by the request.',
+    TIME_BUCKETS
+)
+registry.register(
+    'http_response_size_bytes',
+    'Size of the response body.',
+    SIZE_BUCKETS
+)
+
+
+class RequestMetrics:
+    """Measures collected while a single request is served"""
+
+    def __init__(self, slow_queries):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.slowest = []
+        self._slow_queries = slow_queries
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper timing every query"""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            entry = (duration, self.queries, sql)
+            if len(self.slowest) < self._slow_queries:
+                heapq.heappush(self.slowest, entry)
+            elif self.slowest and duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_queries(self):
+        """Return the slowest (duration, sql) pairs, slowest first"""
+        return [
+            (duration, sql)
+            for duration, index, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+def start_request(slow_queries):
+    """Start collecting the measures of the current request"""
+    metrics = RequestMetrics(slow_queries)
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def _execute(execute, sql, params, many, context):
+    """Database execute wrapper timing the queries of the current request"""
+    measures = _current.get()
+    if measures is None:
+        return execute(sql, params, many, context)
+    return measures.execute(execute, sql, params, many, context)
+
+
+def instrument_connection(connection):
+    """
+    Time the queries run on a database connection, once for good. The
+    request is looked up in the context of every query, which the threads
+    running sync views under ASGI inherit from the middleware, so a query
+    counts wherever the view runs and only towards its own request.
+    :param connection: The database wrapper of the connection
+    :return: None
+    """
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding the time spent in to_representation to the
+    measures of the current request. Nested serializers are included in
+    the time of the outermost one.
+    """
+
+    def to_representation(self, instance):
+        metrics = _current.get()
+        if metrics is None or _serializing.get():
+            return super().to_representation(instance)
+
+        token = _serializing.set(True)
+        start = perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += perf_counter() - start
+            _serializing.reset(token)
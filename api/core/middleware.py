@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import math
+from time import perf_counter
+
+from core import metrics, routers
+
+logger = logging.getLogger('core.metrics')
+
+
+class MetricsMiddleware:
+    """
+    Record the wall time, database queries, serializer time and response
+    size of every request resolved to a view, see core.metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        options = metrics.get_options()
+        if not options['ENABLED']:
+            return self.get_response(request)
+
+        measures, token = metrics.start_request(options['SLOW_QUERIES'])
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self._finish(request, response, measures, perf_counter() - start,
+                     options)
+        return response
+
+    async def __acall__(self, request):
+        options = metrics.get_options()
+        if not options['ENABLED']:
+            return await self.get_response(request)
+
+        measures, token = metrics.start_request(options['SLOW_QUERIES'])
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self._finish(request, response, measures, perf_counter() - start,
+                     options)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Remember the view and action serving the request"""
+        view_class = getattr(view_func, 'cls', None)
+        if view_class is None:
+            request._metrics_endpoint = (
+                request.resolver_match.view_name,
+                request.method.lower()
+            )
+            return None
+
+        # Viewsets map the HTTP methods to their actions
+        actions = getattr(view_func, 'actions', None) or {}
+        request._metrics_endpoint = (
+            view_class.__name__,
+            actions.get(request.method.lower(), request.method.lower())
+        )
+        return None
+
+    def _finish(self, request, response, measures, duration, options):
+        endpoint = getattr(request, '_metrics_endpoint', None)
+        if endpoint is None:
+            return
+        self._record(request, response, endpoint, measures, duration)
+        if duration >= options['SLOW_REQUEST_SECONDS']:
+            self._log_slow_request(request, endpoint, measures, duration)
+
+    @staticmethod
+    def _record(request, response, endpoint, measures, duration):
+        labels = (*endpoint, request.method, str(response.status_code))
+        registry = metrics.registry
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.observe('http_request_db_queries', labels, measures.queries)
+        registry.observe(
+            'http_request_db_duration_seconds',
+            labels,
+            measures.db_time
+        )
+        registry.observe(
+            'http_request_serializer_duration_seconds',
+            labels,
+            measures.serializer_time
+        )
+        if not response.streaming:
+            registry.observe(
+                'http_response_size_bytes',
+                labels,
+                len(response.content)
+            )
+
+    @staticmethod
+    def _log_slow_request(request, endpoint, measures, duration):
+        statements = '\n'.join(
+            f'  {query_time * 1000:.1f}ms {sql[:1000]}'
+            for query_time, sql in measures.slowest_queries()
+        )
+        logger.warning(
+            'Slow request %s %s (%s.%s): %.3fs, %d queries in %.3fs, '
+            'serializer %.3fs. Slowest queries:\n%s',
+            request.method,
+            request.path,
+            *endpoint,
+            duration,
+            measures.queries,
+            measures.db_time,
+            measures.serializer_time,
+            statements
+        )
+
+
+class RateLimitMiddleware:
+    """
+    Add the RateLimit headers of the token bucket of the request, and
+    free the slot the request holds with the concurrency throttle once
+    the response is ready, or once a streaming response is closed, see
+    core.throttling
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self._release(request)
+            raise
+        self._release_when_sent(request, response)
+        return self._add_headers(request, response)
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            self._release(request)
+            raise
+        self._release_when_sent(request, response)
+        return self._add_headers(request, response)
+
+    @staticmethod
+    def _release(request):
+        for release in getattr(request, 'throttle_releases', ()):
+            release()
+
+    @classmethod
+    def _release_when_sent(cls, request, response):
+        if response.streaming:
+            # The content is produced while it is sent, e.g. the exports.
+            # Servers close the response once it is sent or abandoned.
+            response._resource_closers.extend(
+                getattr(request, 'throttle_releases', ())
+            )
+        else:
+            cls._release(request)
+
+    @staticmethod
+    def _add_headers(request, response):
+        state = getattr(request, 'rate_limit', None)
+        if state is not None:
+            response['RateLimit-Limit'] = str(state.limit)
+            response['RateLimit-Remaining'] = str(state.remaining)
+            response['RateLimit-Reset'] = str(math.ceil(state.reset))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the reads of safe requests to a read replica, and pin clients to
+    the primary for a while after they write, see core.routers
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        token = routers.start_request(request)
+        response = self.get_response(request)
+        routers.end_request(request, response, token)
+        return response
+
+    async def __acall__(self, request):
+        token = routers.start_request(request)
+        response = await self.get_response(request)
+        routers.end_request(request, response, token)
+        return response
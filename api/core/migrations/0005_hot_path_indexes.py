@@ -0,0 +1,24 @@
+# Generated by Django 3.2.2 on 2026-10-17 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_on'], name='comment_post_created_idx'),
+        ),
+        # The through table of Post.tags is created by Django, so the
+        # index for tag lookups has to be managed with plain SQL.
+        migrations.RunSQL(
+            sql='CREATE INDEX core_post_tags_tag_post_idx '
+                'ON core_post_tags (tag_id, post_id);',
+            reverse_sql='DROP INDEX core_post_tags_tag_post_idx;',
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.2 on 2026-10-17 06:58
+
+import core.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def install_search_indexes(apps, schema_editor):
+    core.search.install_search_indexes(schema_editor.connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    core.search.drop_search_indexes(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentSearchIndex',
+            fields=[
+                ('comment', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='core.comment')),
+                ('match', core.search.FullTextMatchField(db_column='core_comment_fts')),
+            ],
+            options={
+                'db_table': 'core_comment_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PostSearchIndex',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='core.post')),
+                ('match', core.search.FullTextMatchField(db_column='core_post_fts')),
+            ],
+            options={
+                'db_table': 'core_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.2 on 2026-10-17 07:08
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_counts(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    Comment = apps.get_model('core', 'Comment')
+    counts = {}
+    for field, related in (('comment_count', Comment.objects),
+                           ('tag_count', Post.tags.through.objects)):
+        subquery = related.filter(
+            post=models.OuterRef('pk')
+        ).order_by().values('post').annotate(
+            count=models.Count('id')
+        ).values('count')
+        counts[field] = Coalesce(
+            models.Subquery(subquery, output_field=models.IntegerField()),
+            0
+        )
+    Post.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tag_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counts, migrations.RunPython.noop),
+    ]
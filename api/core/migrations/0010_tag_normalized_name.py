@@ -0,0 +1,105 @@
+# Generated by Django 3.2.2 on 2026-10-17 07:52
+
+import unicodedata
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def normalize_tag_name(name):
+    # Frozen copy of core.tags.normalize_tag_name
+    return ' '.join(unicodedata.normalize('NFKC', name).split()).casefold()
+
+
+def merge_user_tags(Tag, Post, user_id):
+    """
+    Merge the tags of a user whose names normalize alike into the oldest
+    one, and store the normalized names, like core.tags at the time of
+    this migration
+    """
+    through = Post.tags.through
+    tag_count = through.objects.filter(
+        post_id=models.OuterRef('pk')
+    ).order_by().values('post_id').annotate(
+        count=models.Count('id')
+    ).values('count')
+
+    kept = {}
+    renamed = []
+    duplicates = {}
+    for tag_id, name in Tag.objects.filter(
+        user_id=user_id
+    ).order_by('id').values_list('id', 'name'):
+        normalized = normalize_tag_name(name)
+        if normalized in kept:
+            duplicates.setdefault(kept[normalized], []).append(tag_id)
+        else:
+            kept[normalized] = tag_id
+            renamed.append(Tag(id=tag_id, normalized_name=normalized))
+
+    for keep_id, duplicate_ids in duplicates.items():
+        post_ids = list(through.objects.filter(
+            tag_id__in=duplicate_ids
+        ).values_list('post_id', flat=True).distinct())
+        for start in range(0, len(post_ids), BATCH_SIZE):
+            batch = post_ids[start:start + BATCH_SIZE]
+            tagged = set(through.objects.filter(
+                tag_id=keep_id,
+                post_id__in=batch
+            ).values_list('post_id', flat=True))
+            through.objects.bulk_create([
+                through(post_id=post_id, tag_id=keep_id)
+                for post_id in batch if post_id not in tagged
+            ])
+            through.objects.filter(
+                tag_id__in=duplicate_ids,
+                post_id__in=batch
+            ).delete()
+            Post.objects.filter(id__in=batch).update(tag_count=Coalesce(
+                models.Subquery(tag_count,
+                                output_field=models.IntegerField()),
+                0
+            ))
+        Tag.objects.filter(id__in=duplicate_ids).delete()
+
+    Tag.objects.bulk_update(renamed, ['normalized_name'],
+                            batch_size=BATCH_SIZE)
+
+
+def merge_tags(apps, schema_editor):
+    Tag = apps.get_model('core', 'Tag')
+    Post = apps.get_model('core', 'Post')
+    for user_id in Tag.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct():
+        merge_user_tags(Tag, Post, user_id)
+    if schema_editor.connection.vendor == 'postgresql':
+        # Check the deferred foreign keys now, PostgreSQL refuses to alter
+        # a table with pending trigger events
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        # Merges the duplicates like the merge_duplicate_tags command, which
+        # must happen before the constraint can be added. The code is
+        # copied, so that later changes to core.tags do not change it.
+        migrations.RunPython(merge_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'normalized_name'), name='tag_user_normalized_unique'),
+        ),
+    ]
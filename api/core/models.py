@@ -2,10 +2,14 @@ import uuid
 import os
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractBaseUser, \
     BaseUserManager, PermissionsMixin
 from django.conf import settings
 
+from core.search import FullTextMatchField, search_queryset
+from core.tags import normalize_tag_name
+
 
 def post_image_file_path(instance, filename):
     """Generate the filepath for the new image"""
@@ -64,6 +68,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Set once the user has more followers than the feeds fan out to, see
+    # post.feed. Their followers pull their posts at read time instead.
+    feed_pull = models.BooleanField(default=False)
 
     objects = UserManager()
 
@@ -75,20 +82,219 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class TagQuerySet(models.QuerySet):
+    """Queryset of the blog post tags"""
+
+    def get_or_create_many(self, user_id, names, batch_size=500):
+        """
+        Return the tags of a user with the given names, creating the
+        missing ones with bulk inserts. Names normalizing to the same
+        string are the same tag, which keeps the name it was created with.
+        Bulk inserts send no model signals.
+        :param user_id: Id of the owner of the tags
+        :param names: Iterable of tag names
+        :param batch_size: Number of tags per INSERT statement
+        :return: Dict mapping the normalized names to the tags
+        """
+        wanted = {}
+        for name in names:
+            wanted.setdefault(normalize_tag_name(name), name)
+
+        tags = {
+            tag.normalized_name: tag for tag in self.filter(
+                user_id=user_id,
+                normalized_name__in=list(wanted)
+            )
+        }
+        missing = [name for name in wanted if name not in tags]
+        if missing:
+            # Tags created meanwhile by another request are skipped and
+            # read back with the new ones
+            self.bulk_create([
+                self.model(
+                    user_id=user_id,
+                    name=wanted[name],
+                    normalized_name=name
+                )
+                for name in missing
+            ], batch_size=batch_size, ignore_conflicts=True)
+            tags.update(
+                (tag.normalized_name, tag) for tag in self.filter(
+                    user_id=user_id,
+                    normalized_name__in=missing
+                )
+            )
+        return tags
+
+
 class Tag(models.Model):
     """Tag to be used for a blog post"""
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='tag_user_name_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'normalized_name'],
+                name='tag_user_normalized_unique'
+            ),
+        ]
+
     name = models.CharField(max_length=255)
+    # Set from the name on save, see core.tags.normalize_tag_name
+    normalized_name = models.CharField(max_length=255, editable=False)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    objects = TagQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_tag_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    """Queryset with the prefetch plans used by the blog post API"""
+
+    def with_relation_ids(self, relations=('tags', 'comments')):
+        """
+        Prefetch only the ids of the tags and comments of each post.
+        This is all the list serializer emits for these relations.
+        :param relations: Names of the relations to prefetch
+        :return: Queryset that loads each relation in one extra query
+        """
+        prefetches = {
+            'tags': models.Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id')
+            ),
+            'comments': models.Prefetch(
+                'comments',
+                queryset=Comment.objects.only('id', 'post_id')
+            ),
+        }
+        return self.prefetch_related(*(
+            prefetches[name] for name in relations
+        ))
+
+    def with_tags(self, tag_ids, match='any'):
+        """
+        Filter the posts by tags without joining the tags, so that a
+        post matching several tags is still returned once
+        :param tag_ids: Iterable of tag ids
+        :param match: 'any' for the posts with at least one of the tags,
+        'all' for the posts with every tag
+        :return: Filtered queryset
+        """
+        tag_ids = set(tag_ids)
+        through = self.model.tags.through.objects.filter(tag_id__in=tag_ids)
+        if match == 'all':
+            # GROUP BY post_id HAVING COUNT(*) = n, read off the
+            # (tag_id, post_id) index; every pair is unique
+            return self.filter(pk__in=through.values('post_id').annotate(
+                matched=models.Count('tag_id')
+            ).filter(matched=len(tag_ids)).values('post_id'))
+        return self.filter(models.Exists(
+            through.filter(post_id=models.OuterRef('pk'))
+        ))
+
+    def with_comments(self, comment_ids):
+        """
+        Filter the posts having any of the given comments
+        :param comment_ids: Iterable of comment ids
+        :return: Filtered queryset
+        """
+        return self.filter(models.Exists(Comment.objects.filter(
+            post_id=models.OuterRef('pk'),
+            id__in=list(comment_ids)
+        )))
+
+    def with_relations(self, relations=('tags', 'comments')):
+        """
+        Prefetch the full tags and comments of each post.
+        :param relations: Names of the relations to prefetch
+        :return: Queryset that loads each relation in one extra query
+        """
+        return self.prefetch_related(*relations)
+
+    def search(self, text):
+        """
+        Return the posts matching a full-text search, see core.search
+        :param text: Free text search query
+        :return: Queryset annotated with the search_rank of every post
+        """
+        return search_queryset(self, text)
+
+    def _actual_counts(self):
+        """Subqueries counting the comments and tags of each post"""
+        through = self.model.tags.through
+        comments = Comment.objects.filter(
+            post=models.OuterRef('pk')
+        ).order_by().values('post').annotate(
+            count=models.Count('id')
+        ).values('count')
+        tags = through.objects.filter(
+            post=models.OuterRef('pk')
+        ).order_by().values('post').annotate(
+            count=models.Count('id')
+        ).values('count')
+        return {
+            'comment_count': Coalesce(
+                models.Subquery(comments, output_field=models.IntegerField()),
+                0
+            ),
+            'tag_count': Coalesce(
+                models.Subquery(tags, output_field=models.IntegerField()),
+                0
+            ),
+        }
+
+    def refresh_counts(self):
+        """
+        Recompute the comment and tag counts of the posts in one UPDATE
+        :return: Number of updated posts
+        """
+        return self.update(**self._actual_counts())
+
+    def repair_counts(self):
+        """
+        Recompute the counts of the posts where they drifted
+        :return: List of the ids of the repaired posts
+        """
+        actual = self._actual_counts()
+        stale_ids = list(self.annotate(
+            actual_comment_count=actual['comment_count'],
+            actual_tag_count=actual['tag_count'],
+        ).exclude(
+            comment_count=models.F('actual_comment_count'),
+            tag_count=models.F('actual_tag_count'),
+        ).values_list('pk', flat=True))
+        if stale_ids:
+            self.model.objects.filter(pk__in=stale_ids).refresh_counts()
+        return stale_ids
+
 
 class Post(models.Model):
     """Post object"""
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-created_on', '-id'],
+                name='post_user_created_idx'
+            ),
+        ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -98,16 +304,70 @@ class Post(models.Model):
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=post_image_file_path)
+    # Resized copies of the image, filled in by post.images
+    image_variants = models.JSONField(default=dict, blank=True)
     created_on = models.DateTimeField(auto_now_add=True)
+    # Maintained with F() expressions by post.signals
+    comment_count = models.PositiveIntegerField(default=0)
+    tag_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('comment_count', 'tag_count')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Save the post without writing back the counters, which may have
+        been changed by other requests since the post was loaded.
+        The counters are dropped from `update_fields`, which defaults to
+        the loaded fields as in Model.save.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = [
+                name for name in update_fields
+                if name not in self.COUNTER_FIELDS
+            ]
+        elif not self._state.adding and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+    """Queryset of the blog post comments"""
+
+    def search(self, text):
+        """
+        Return the comments matching a full-text search, see core.search
+        :param text: Free text search query
+        :return: Queryset annotated with the search_rank of every comment
+        """
+        return search_queryset(self, text)
+
 
 class Comment(models.Model):
     """Comment Objects"""
     class Meta:
         ordering = ['created_on']
+        indexes = [
+            models.Index(
+                fields=['user', '-created_on', '-id'],
+                name='comment_user_created_idx'
+            ),
+            models.Index(
+                fields=['post', 'created_on'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -122,5 +382,121 @@ class Comment(models.Model):
     )
     created_on = models.DateTimeField(auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     def __str__(self):
         return f'{self.id}_{self.post.title}'
+
+
+class Follow(models.Model):
+    """A user following the posts of another one"""
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['follower', 'followee'],
+                name='follow_unique'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(follower=models.F('followee')),
+                name='follow_not_self'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['followee', 'follower'],
+                name='follow_followee_idx'
+            ),
+        ]
+
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='following'
+    )
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='followers'
+    )
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.follower_id} -> {self.followee_id}'
+
+
+class FeedEntry(models.Model):
+    """A post written into the feed of a follower of its author"""
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='feed_entry_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_on', '-post'],
+                name='feed_user_created_idx'
+            ),
+        ]
+
+    # Owner of the feed
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    # Copies of the author and the creation time of the post, so that
+    # feeds are paged and pruned without joining the posts
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    created_on = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class PostSearchIndex(models.Model):
+    """
+    Full-text index of the posts. This is an FTS5 table on SQLite
+    that is maintained by triggers, see core.search
+    """
+    class Meta:
+        managed = False
+        db_table = 'core_post_fts'
+
+    post = models.OneToOneField(
+        'Post',
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_index'
+    )
+    match = FullTextMatchField(db_column='core_post_fts')
+
+
+class CommentSearchIndex(models.Model):
+    """
+    Full-text index of the comments. This is an FTS5 table on SQLite
+    that is maintained by triggers, see core.search
+    """
+    class Meta:
+        managed = False
+        db_table = 'core_comment_fts'
+
+    comment = models.OneToOneField(
+        'Comment',
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_index'
+    )
+    match = FullTextMatchField(db_column='core_comment_fts')
@@ -0,0 +1,46 @@
+"""
+JSON rendering with orjson when it is installed.
+
+orjson serializes dicts, lists, strings and numbers natively and much
+faster than the json module. Other objects go through the encoder of
+DRF, so the output matches JSONRenderer. Without orjson, and for the
+indented output of the browsable API, JSONRenderer is used as is.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer rendering with orjson when it is available"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None and indent != 2:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=JSONEncoder().default,
+                # Dates are formatted by the DRF encoder, e.g. with a Z
+                option=orjson.OPT_PASSTHROUGH_DATETIME | (
+                    orjson.OPT_INDENT_2 if indent else 0
+                )
+            )
+        except TypeError:
+            # orjson rejects what it cannot encode exactly, such as
+            # integers over 64 bits; the json module handles these
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape the line separators that are invalid in JavaScript,
+        # like JSONRenderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+            .replace(b'\xe2\x80\xa9', b'\\u2029')
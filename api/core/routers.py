@@ -0,0 +1,193 @@
+"""
+Read replica routing.
+
+Safe requests to the paths of DATABASE_REPLICAS['PATHS'] read the blog
+models from a replica, chosen once per request among the replicas that
+accept connections; a replica that does not is left alone for
+RETRY_SECONDS and the request reads from the primary instead. Writes,
+and every read of other requests, go to the primary.
+
+Replicas lag behind the primary. For STICKY_SECONDS after a successful
+write, a client reads from the primary: clients are recognised by their
+Authorization header, whose pin is kept in a cache, or by a cookie.
+"""
+import hashlib
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+DEFAULTS = {
+    # Database aliases of the replicas
+    'ALIASES': [],
+    # Prefixes of the paths whose safe requests read from a replica
+    'PATHS': ('/api/post/',),
+    # Models read from the replicas, as app_label.model_name
+    'MODELS': ('core.post', 'core.comment', 'core.tag', 'core.follow',
+               'core.feedentry'),
+    # Seconds a client reads from the primary after writing, which should
+    # exceed the replication lag
+    'STICKY_SECONDS': 5,
+    # Seconds a replica refusing connections is skipped
+    'RETRY_SECONDS': 30,
+    # Cache of the pins of the clients sending an Authorization header
+    'CACHE_ALIAS': 'default',
+    'COOKIE_NAME': 'read_primary',
+}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('replica_routing', default=None)
+_down_until = {}
+_down_lock = threading.Lock()
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'DATABASE_REPLICAS', {})}
+
+
+def _connect(alias):
+    connections[alias].ensure_connection()
+
+
+def _is_down(alias, now):
+    return _down_until.get(alias, 0) > now
+
+
+def _mark_down(alias, retry_seconds):
+    with _down_lock:
+        _down_until[alias] = time.monotonic() + retry_seconds
+
+
+class ReplicaChoice:
+    """The replica the reads of a request go to, chosen on first use"""
+
+    def __init__(self, options):
+        self.options = options
+        self._alias = None
+
+    @property
+    def alias(self):
+        if self._alias is None:
+            self._alias = self._choose()
+        return self._alias
+
+    @property
+    def chosen(self):
+        """Whether a replica was chosen and used by the request"""
+        return self._alias not in (None, DEFAULT_DB_ALIAS)
+
+    def _choose(self):
+        now = time.monotonic()
+        candidates = [
+            alias for alias in self.options['ALIASES']
+            if not _is_down(alias, now)
+        ]
+        random.shuffle(candidates)
+        for alias in candidates:
+            try:
+                _connect(alias)
+                return alias
+            except DatabaseError:
+                _mark_down(alias, self.options['RETRY_SECONDS'])
+        return DEFAULT_DB_ALIAS
+
+
+def reading_from_replica():
+    """Whether the reads of the current request went to a replica"""
+    choice = _routing.get()
+    return choice is not None and choice.chosen
+
+
+def replica_lag_seconds():
+    """Return how long replicas may miss a write, 0 without replicas"""
+    options = get_options()
+    return options['STICKY_SECONDS'] if options['ALIASES'] else 0
+
+
+def _pin_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha1(authorization.encode()).hexdigest()
+    return f'replica:pin:{digest}'
+
+
+def _is_pinned(request, options):
+    if request.COOKIES.get(options['COOKIE_NAME']):
+        return True
+    key = _pin_key(request)
+    return key is not None and bool(caches[options['CACHE_ALIAS']].get(key))
+
+
+def start_request(request):
+    """
+    Route the reads of a request to a replica when it can be
+    :param request: The Django request
+    :return: Token for end_request
+    """
+    options = get_options()
+    choice = None
+    if options['ALIASES'] and request.method in SAFE_METHODS and \
+            request.path.startswith(tuple(options['PATHS'])) and \
+            not _is_pinned(request, options):
+        choice = ReplicaChoice(options)
+    return _routing.set(choice)
+
+
+def end_request(request, response, token):
+    """
+    Pin the client to the primary after a successful write
+    :param request: The Django request
+    :param response: Its response
+    :param token: The token returned by start_request
+    :return: None
+    """
+    _routing.reset(token)
+    options = get_options()
+    if not options['ALIASES'] or request.method in SAFE_METHODS or \
+            response.status_code >= 400:
+        return
+
+    key = _pin_key(request)
+    if key is not None:
+        caches[options['CACHE_ALIAS']].set(
+            key, 1, options['STICKY_SECONDS']
+        )
+    response.set_cookie(
+        options['COOKIE_NAME'],
+        '1',
+        max_age=options['STICKY_SECONDS'],
+        httponly=True,
+        samesite='Lax'
+    )
+
+
+class ReplicaRouter:
+    """Send the reads of the routed requests to their replica"""
+
+    def db_for_read(self, model, **hints):
+        choice = _routing.get()
+        if choice is None or model._meta.label_lower not in \
+                choice.options['MODELS']:
+            return DEFAULT_DB_ALIAS
+        return choice.alias
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica are saved to the primary too
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_options()['ALIASES']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_options()['ALIASES']:
+            return False
+        return None
@@ -0,0 +1,203 @@
+"""
+Full-text search indexes of the posts and comments.
+
+On SQLite the text is indexed by FTS5 virtual tables using the model
+tables as external content, kept in sync by triggers. On PostgreSQL a
+GIN index over the tsvector of the same columns is used. Both are
+maintained by the database itself, so bulk inserts and queryset updates
+are indexed as well.
+"""
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Lookup, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+
+# Table and indexed columns of every searchable model
+INDEXES = {
+    'core_post': ('title', 'content'),
+    'core_comment': ('content',),
+}
+
+POSTGRES_CONFIG = 'english'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class FullTextMatchField(TextField):
+    """Hidden column of an FTS5 table named after the table itself"""
+
+
+@FullTextMatchField.register_lookup
+class FullTextMatch(Lookup):
+    """Match the rows of an FTS5 table against a full-text query"""
+    lookup_name = 'fts'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def fts_table(table):
+    """Return the name of the FTS5 table indexing a model table"""
+    return f'{table}_fts'
+
+
+def _sqlite_trigger_sql(table, columns):
+    fts = fts_table(table)
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) " \
+             f"VALUES ('delete', old.id, {old});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});"
+    return {
+        f'{fts}_ai': f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} '
+                     f'BEGIN {insert} END;',
+        f'{fts}_ad': f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} '
+                     f'BEGIN {delete} END;',
+        f'{fts}_au': f'CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} '
+                     f'ON {table} BEGIN {delete} {insert} END;',
+    }
+
+
+def _postgres_vector_sql(table, columns):
+    document = " || ' ' || ".join(
+        f"coalesce({table}.{column}, '')" for column in columns
+    )
+    return f"to_tsvector('{POSTGRES_CONFIG}', {document})"
+
+
+def _sqlite_names(cursor, kind):
+    cursor.execute('SELECT name FROM sqlite_master WHERE type = %s', [kind])
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _install_sqlite_triggers(cursor, table, columns, existing):
+    """Create the missing triggers of a table and re-index it"""
+    fts = fts_table(table)
+    triggers = _sqlite_trigger_sql(table, columns)
+    if set(triggers) <= existing:
+        return
+
+    for name, sql in triggers.items():
+        if name not in existing:
+            cursor.execute(sql)
+    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def install_search_indexes(connection):
+    """
+    Create and fill the full-text indexes of a database
+    :param connection: The database connection
+    :return: None
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            existing = _sqlite_names(cursor, 'trigger')
+            for table, columns in INDEXES.items():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table(table)} "
+                    f"USING fts5({', '.join(columns)}, content='{table}', "
+                    f"content_rowid='id')"
+                )
+                _install_sqlite_triggers(cursor, table, columns, existing)
+
+        elif connection.vendor == 'postgresql':
+            for table, columns in INDEXES.items():
+                cursor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_search_idx '
+                    f'ON {table} USING GIN '
+                    f'(({_postgres_vector_sql(table, columns)}))'
+                )
+
+
+def repair_search_indexes(connection):
+    """
+    Restore the triggers SQLite drops when a migration rebuilds a table.
+    The tables whose triggers had to be created again are re-indexed.
+    :param connection: The database connection
+    :return: None
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        tables = _sqlite_names(cursor, 'table')
+        existing = _sqlite_names(cursor, 'trigger')
+        for table, columns in INDEXES.items():
+            if fts_table(table) in tables:
+                _install_sqlite_triggers(cursor, table, columns, existing)
+
+
+def drop_search_indexes(connection):
+    """Remove the full-text indexes from a database"""
+    with connection.cursor() as cursor:
+        for table in INDEXES:
+            if connection.vendor == 'sqlite':
+                fts = fts_table(table)
+                for name in _sqlite_trigger_sql(table, INDEXES[table]):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cursor.execute(f'DROP TABLE IF EXISTS {fts}')
+            elif connection.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {table}_search_idx')
+
+
+def search_terms(text):
+    """
+    Split the text typed by a user into search terms
+    :param text: Free text search query
+    :return: List of words
+    """
+    return _TOKEN_RE.findall(text)
+
+
+def search_queryset(queryset, text):
+    """
+    Filter a queryset of posts or comments by a full-text search.
+    The matches are annotated with a `search_rank`, lower is better.
+    :param queryset: Queryset of a model listed in INDEXES
+    :param text: Free text search query
+    :return: Filtered and annotated queryset
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none().annotate(
+            search_rank=Value(0.0, FloatField())
+        )
+
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+    columns = INDEXES[table]
+
+    if vendor == 'sqlite':
+        fts = fts_table(table)
+        # Every term must match, the last one also as a prefix
+        match = ' '.join(f'"{term}"' for term in terms) + '*'
+        return queryset.filter(
+            search_index__match__fts=match
+        ).annotate(
+            search_rank=RawSQL(f'bm25("{fts}"."{fts}")', (), FloatField())
+        )
+
+    if vendor == 'postgresql':
+        vector = _postgres_vector_sql(table, columns)
+        query = ' & '.join(terms) + ':*'
+        tsquery = f"to_tsquery('{POSTGRES_CONFIG}', %s)"
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f'-ts_rank({vector}, {tsquery})', (query,), FloatField()
+            )
+        ).extra(where=[f'{vector} @@ {tsquery}'], params=[query])
+
+    # Databases without a full-text index fall back to a scan
+    condition = Q()
+    for term in terms:
+        term_condition = Q()
+        for column in columns:
+            term_condition |= Q(**{f'{column}__icontains': term})
+        condition &= term_condition
+    return queryset.filter(condition).annotate(
+        search_rank=Value(0.0, FloatField())
+    )
@@ -0,0 +1,28 @@
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from core.db import configure_sqlite
+from core.metrics import instrument_connection
+from core.search import repair_search_indexes
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    """
+    Tune every new SQLite connection, see SQLITE_PRAGMAS, and time its
+    queries for the request metrics
+    """
+    configure_sqlite(connection)
+    instrument_connection(connection)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    """
+    Migrations altering a table on SQLite copy it to a new table, which
+    drops the triggers keeping the full-text index in sync.
+    """
+    if sender.name == 'core':
+        repair_search_indexes(connections[using])
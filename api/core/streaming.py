@@ -0,0 +1,202 @@
+"""
+Streaming responses produced in a worker thread.
+
+The ASGI handler of Django 3.2 iterates streaming responses in the
+thread of the event loop, where the ORM refuses to run and where any
+wait on the producer stalls every other connection of the worker.
+`ThreadedStreamingHttpResponse` produces its content in a thread of its
+own, with a database connection of its own, and `ASGIHandler` awaits
+the produced items instead of blocking the event loop for them.
+"""
+import asyncio
+import queue
+import threading
+
+from asgiref.sync import sync_to_async
+
+from django.core.handlers import asgi
+from django.db import connections
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def _produce_in_thread(factory, put):
+    """
+    Hand the items of an iterable to `put` from a worker thread, then
+    _DONE or the failure of the iterable. The producer stops when `put`
+    returns False.
+    """
+    def produce():
+        try:
+            for item in factory():
+                if not put(item):
+                    return
+            put(_DONE)
+        except Exception as exception:
+            put(_Failure(exception))
+        finally:
+            for connection in connections.all():
+                connection.close()
+
+    threading.Thread(
+        target=produce,
+        name='stream-producer',
+        daemon=True
+    ).start()
+
+
+def iterate_in_thread(factory, max_buffered=8):
+    """
+    Produce the items of an iterable in a worker thread, keeping the
+    queries out of the thread iterating. At most `max_buffered` items are
+    produced ahead of the consumer, so memory stays bounded.
+    :param factory: Function returning the iterable to produce
+    :param max_buffered: Number of items produced ahead of the consumer
+    :return: Generator of the items of the iterable, blocking while the
+    producer falls behind
+    """
+    items = queue.Queue(max_buffered)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    _produce_in_thread(factory, put)
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        # The consumer is done or went away, e.g. the client disconnected
+        stopped.set()
+
+
+async def aiterate_in_thread(factory, max_buffered=8):
+    """
+    Async version of iterate_in_thread, awaiting the items on the running
+    event loop without blocking it
+    :param factory: Function returning the iterable to produce
+    :param max_buffered: Number of items produced ahead of the consumer
+    :return: Async generator of the items of the iterable
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    slots = threading.Semaphore(max_buffered)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            if slots.acquire(timeout=0.5):
+                try:
+                    loop.call_soon_threadsafe(items.put_nowait, item)
+                except RuntimeError:
+                    # The event loop is closed
+                    return False
+                return True
+        return False
+
+    _produce_in_thread(factory, put)
+    try:
+        while True:
+            item = await items.get()
+            slots.release()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stopped.set()
+
+
+class ThreadedStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response whose content is produced in a worker thread.
+    ASGIHandler awaits the content, other handlers iterate it and block
+    while the producer falls behind.
+    """
+
+    def __init__(self, factory, *args, max_buffered=8, **kwargs):
+        """
+        :param factory: Function returning the iterable of the content
+        :param max_buffered: Number of parts produced ahead of the client
+        """
+        self.factory = factory
+        self.max_buffered = max_buffered
+        super().__init__(
+            iterate_in_thread(factory, max_buffered),
+            *args,
+            **kwargs
+        )
+
+    def __aiter__(self):
+        return self._aiterate()
+
+    async def _aiterate(self):
+        parts = aiterate_in_thread(self.factory, self.max_buffered)
+        try:
+            async for part in parts:
+                yield self.make_bytes(part)
+        finally:
+            await parts.aclose()
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """
+    ASGI handler sending the content of ThreadedStreamingHttpResponse as
+    it is produced, instead of blocking the event loop on every part
+    """
+
+    async def send_response(self, response, send):
+        if not isinstance(response, ThreadedStreamingHttpResponse):
+            return await super().send_response(response, send)
+
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            headers.append((
+                b'Set-Cookie',
+                cookie.output(header='').encode('ascii').strip()
+            ))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+
+        parts = response.__aiter__()
+        try:
+            async for part in parts:
+                for chunk, last in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            await send({'type': 'http.response.body'})
+        finally:
+            await parts.aclose()
+            # Also when the client went away, to free what the response
+            # holds, such as its concurrency slot
+            await sync_to_async(response.close, thread_sensitive=True)()
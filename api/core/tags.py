@@ -0,0 +1,122 @@
+"""
+Normalization and de-duplication of the tag names.
+
+Two tags of a user are the same tag when their names normalize to the
+same string. The functions take the model classes as arguments; migration
+0010 keeps a copy of its own, which later changes here do not affect.
+"""
+import unicodedata
+from itertools import islice
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+
+
+def normalize_tag_name(name):
+    """
+    Return the form of a tag name compared for uniqueness
+    :param name: Name of the tag as entered
+    :return: NFKC normalized, case-folded name with the whitespace
+    collapsed
+    """
+    return ' '.join(unicodedata.normalize('NFKC', name).split()).casefold()
+
+
+def _batches(values, size):
+    values = iter(values)
+    while True:
+        batch = list(islice(values, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _find_duplicates(tag_model, user_id):
+    """
+    Group the tags of a user by normalized name
+    :return: Tuple of a dict mapping the id of the oldest tag of every
+    name to the ids of its duplicates, and the unsaved tags whose stored
+    normalized name is out of date
+    """
+    kept = {}
+    duplicates = {}
+    renamed = []
+    for tag_id, name, stored in tag_model.objects.filter(
+        user_id=user_id
+    ).order_by('id').values_list('id', 'name', 'normalized_name'):
+        normalized = normalize_tag_name(name)
+        if normalized in kept:
+            duplicates.setdefault(kept[normalized], []).append(tag_id)
+            continue
+        kept[normalized] = tag_id
+        if stored != normalized:
+            renamed.append(tag_model(id=tag_id, normalized_name=normalized))
+    return duplicates, renamed
+
+
+def _merge(tag_model, post_model, keep_id, duplicate_ids, batch_size):
+    """
+    Move the posts of duplicate tags to the tag kept and delete them
+    :return: List of the ids of the posts re-tagged
+    """
+    through = post_model.tags.through
+    post_ids = list(through.objects.filter(
+        tag_id__in=duplicate_ids
+    ).values_list('post_id', flat=True).distinct())
+
+    tag_count = through.objects.filter(
+        post_id=models.OuterRef('pk')
+    ).order_by().values('post_id').annotate(
+        count=models.Count('id')
+    ).values('count')
+    for batch in _batches(post_ids, batch_size):
+        tagged = set(through.objects.filter(
+            tag_id=keep_id,
+            post_id__in=batch
+        ).values_list('post_id', flat=True))
+        through.objects.bulk_create([
+            through(post_id=post_id, tag_id=keep_id)
+            for post_id in batch if post_id not in tagged
+        ])
+        through.objects.filter(
+            tag_id__in=duplicate_ids,
+            post_id__in=batch
+        ).delete()
+        post_model.objects.filter(id__in=batch).update(tag_count=Coalesce(
+            models.Subquery(tag_count, output_field=models.IntegerField()),
+            0
+        ))
+
+    tag_model.objects.filter(id__in=duplicate_ids).delete()
+    return post_ids
+
+
+def merge_duplicate_tags(tag_model, post_model, batch_size=1000):
+    """
+    Merge the tags of every user whose names normalize to the same
+    string into the oldest one, and store the normalized names.
+    The tags of every user are read and merged in a transaction of their
+    own, and the Post.tags through rows are rewritten `batch_size` posts
+    at a time.
+    :param tag_model: The Tag model
+    :param post_model: The Post model
+    :param batch_size: Number of rows read or written per query
+    :return: Tuple of the number of tags merged away and the set of the
+    ids of the posts re-tagged
+    """
+    user_ids = list(tag_model.objects.order_by('user_id').values_list(
+        'user_id', flat=True
+    ).distinct())
+
+    merged = 0
+    post_ids = set()
+    for user_id in user_ids:
+        with transaction.atomic():
+            duplicates, renamed = _find_duplicates(tag_model, user_id)
+            for keep_id, duplicate_ids in duplicates.items():
+                post_ids.update(_merge(tag_model, post_model, keep_id,
+                                       duplicate_ids, batch_size))
+                merged += len(duplicate_ids)
+            tag_model.objects.bulk_update(renamed, ['normalized_name'],
+                                          batch_size=batch_size)
+    return merged, post_ids
@@ -0,0 +1,63 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Number of threads running the background tasks of a process
+    'WORKERS': 2,
+    # Run the tasks inline instead of in the pool, e.g. for tests
+    'ALWAYS_EAGER': False,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _options():
+    return {**DEFAULTS, **getattr(settings, 'BACKGROUND_TASKS', {})}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_options()['WORKERS'],
+                thread_name_prefix='background-task'
+            )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    """Run a task in a worker thread with its own database connection"""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Run a function in the background once the current transaction commits.
+    Waiting for the commit guarantees the task sees the rows written by
+    the request that scheduled it.
+    :param func: The function to run
+    :param args: Positional arguments for the function
+    :param kwargs: Keyword arguments for the function
+    :return: None
+    """
+    if _options()['ALWAYS_EAGER']:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+
+    transaction.on_commit(
+        lambda: _get_executor().submit(_run, func, args, kwargs)
+    )
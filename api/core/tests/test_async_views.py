@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.async_views import as_async_view
+from core.models import Post
+from post.views import PostViewSet
+
+ASYNC_VIEWS = {'ENABLED': True, 'MAX_CONCURRENCY': 1, 'QUEUE_TIMEOUT': 0.05}
+
+
+def slow_view(request):
+    """Sync view holding its slot for a while"""
+    time.sleep(0.3)
+    return HttpResponse('done')
+
+
+class AsyncViewsTests(SimpleTestCase):
+    """Test cases for the thread pool bridge of the sync views"""
+
+    def test_disabled_returns_view(self):
+        """Test the views are left alone when async views are disabled"""
+        with override_settings(ASYNC_VIEWS={'ENABLED': False}):
+            self.assertIs(as_async_view(slow_view), slow_view)
+
+    @override_settings(ASYNC_VIEWS=ASYNC_VIEWS)
+    def test_busy_server_answers_503(self):
+        """Test requests waiting too long for a slot are turned away"""
+        view = as_async_view(slow_view)
+        request = APIRequestFactory().get('/')
+
+        async def send_two():
+            return await asyncio.gather(view(request), view(request))
+
+        responses = async_to_sync(send_two)()
+
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [200, 503])
+        busy = [r for r in responses if r.status_code == 503][0]
+        self.assertEqual(busy['Retry-After'], '1')
+
+    @override_settings(ASYNC_VIEWS={**ASYNC_VIEWS, 'MAX_CONCURRENCY': 2})
+    def test_view_with_own_limit(self):
+        """Test a view with its own limit does not use the shared slots"""
+        limited = as_async_view(slow_view, max_concurrency=1)
+        shared = as_async_view(slow_view)
+        request = APIRequestFactory().get('/')
+
+        async def send():
+            return await asyncio.gather(
+                limited(request), limited(request),
+                shared(request), shared(request)
+            )
+
+        responses = async_to_sync(send)()
+
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [200, 503, 200, 200]
+        )
+
+
+class AsyncViewSetTests(TransactionTestCase):
+    """Test cases for viewsets served through the thread pool"""
+
+    @override_settings(ASYNC_VIEWS=ASYNC_VIEWS)
+    def test_viewset_served_from_thread(self):
+        """Test a viewset answers the same through the bridge"""
+        user = get_user_model().objects.create_user('user@test.com', 'Test')
+        Post.objects.create(user=user, title='Post', content='Text')
+        view = as_async_view(PostViewSet.as_view({'get': 'list'}))
+        request = APIRequestFactory().get('/api/post/posts/')
+        force_authenticate(request, user)
+
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertIs(view.cls, PostViewSet)
+        response = async_to_sync(view)(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertTrue(response.is_rendered)
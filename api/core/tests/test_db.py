@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import configure_sqlite
+
+HEALTH_URL = reverse('health')
+
+
+class SQLitePragmaTests(TestCase):
+    """Test cases for the set-up of the SQLite connections"""
+
+    def _pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Test new connections get the pragmas of the settings"""
+        # 1 is NORMAL
+        self.assertEqual(self._pragma('synchronous'), 1)
+        self.assertEqual(self._pragma('busy_timeout'), 20000)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': '1; DROP TABLE x'})
+    def test_invalid_pragma(self):
+        """Test pragmas are not open to SQL injection"""
+        with self.assertRaises(ValueError):
+            configure_sqlite(connection)
+
+
+class HealthCheckTests(TestCase):
+    """Test cases for the health check end-point"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_healthy(self):
+        """Test the end-point answers 200 without authentication"""
+        res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'ok')
+        self.assertEqual(res.data['checks']['database:default'], 'ok')
+        self.assertEqual(res.data['checks']['cache:default'], 'ok')
+        self.assertEqual(res['Cache-Control'], 'no-store')
+
+    def test_database_down(self):
+        """Test the end-point answers 503 when the database fails"""
+        with mock.patch.object(
+            connection,
+            'cursor',
+            side_effect=OperationalError('unable to open database file')
+        ), self.assertLogs('core.db', 'WARNING') as logs:
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['status'], 'error')
+        self.assertEqual(res.data['checks']['database:default'],
+                         'OperationalError')
+        self.assertNotIn(b'database file', res.content)
+        self.assertIn('unable to open database file', logs.output[0])
+
+    def test_replica_down(self):
+        """Test a failed replica degrades the check without failing it"""
+        replica = mock.Mock()
+        replica.cursor.side_effect = OperationalError('replica1 refused')
+        with mock.patch('core.db.connections',
+                        {'default': connection, 'replica1': replica}), \
+                self.assertLogs('core.db', 'WARNING'):
+            res = self.client.get(HEALTH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], 'degraded')
+        self.assertEqual(res.data['checks']['database:default'], 'ok')
+        self.assertEqual(res.data['checks']['database:replica1'],
+                         'OperationalError')
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashers
+
+TOKEN_URL = reverse('user:token')
+
+
+class MissingLibraryPasswordHasher(hashers.PBKDF2PasswordHasher):
+    algorithm = 'missing'
+    library = 'a_library_that_is_not_installed'
+
+
+@override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000})
+class PasswordHashingTests(TestCase):
+    """Test cases for the password hashers and their costs"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+
+    def _login(self):
+        return self.client.post(
+            TOKEN_URL,
+            {'email': 'user@test.com', 'password': 'Test123'}
+        )
+
+    def _stored_hash(self):
+        return get_user_model().objects.get(id=self.user.id).password
+
+    def test_cost_from_settings(self):
+        """Test new passwords are hashed with the configured cost"""
+        self.assertTrue(self._stored_hash().startswith('pbkdf2_sha256$1000$'))
+
+    def test_cost_upgraded_on_login(self):
+        """Test the hash is upgraded to the new cost on the next login"""
+        with self.settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 2000}):
+            res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self._stored_hash().startswith('pbkdf2_sha256$2000$'))
+
+    def test_algorithm_upgraded_on_login(self):
+        """Test a hash of a legacy algorithm is replaced on login"""
+        get_user_model().objects.filter(id=self.user.id).update(
+            password=make_password('Test123', hasher='pbkdf2_sha1')
+        )
+
+        res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self._stored_hash().startswith('pbkdf2_sha256$'))
+
+    @override_settings(PASSWORD_HASHING={
+        'PBKDF2_ITERATIONS': 1000,
+        'MAX_CONCURRENCY': 1,
+        'QUEUE_TIMEOUT': 0.01,
+    })
+    def test_busy_hashing_answers_503(self):
+        """Test logins are turned away while every hashing slot is taken"""
+        with hashers.hashing_slot():
+            res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+        self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+    def test_check_missing_library(self):
+        """Test the system check reports a preferred hasher without library"""
+        with self.settings(PASSWORD_HASHERS=[
+            'core.tests.test_hashers.MissingLibraryPasswordHasher',
+        ]):
+            errors = hashers.check_password_hasher(None)
+
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        self.assertEqual(hashers.check_password_hasher(None), [])
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports the logins per second per core"""
+        out = StringIO()
+        call_command('benchmark_hashers', '--logins', '2', stdout=out,
+                     stderr=StringIO())
+
+        self.assertIn('pbkdf2', out.getvalue())
+        self.assertIn('logins/s/core', out.getvalue())
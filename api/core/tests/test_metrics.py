@@ -0,0 +1,117 @@
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, registry
+from core.models import Post
+
+METRICS_URL = reverse('metrics')
+HEALTH_URL = reverse('health')
+POSTS_URL = reverse('post:post-list')
+
+
+class HistogramTests(TestCase):
+    """Test cases for the in-process histograms"""
+
+    def test_observe_cumulative_buckets(self):
+        """Test values are counted in every bucket they fit in"""
+        histogram = Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 20):
+            histogram.observe(value)
+
+        cumulative, total, count = histogram.snapshot()
+
+        self.assertEqual(cumulative, [2, 3, 3, 4])
+        self.assertEqual(total, 24.5)
+        self.assertEqual(count, 4)
+
+
+class MetricsMiddlewareTests(TestCase):
+    """Test cases for the request metrics and their end-point"""
+
+    def setUp(self):
+        registry.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@test.com',
+            'Test123'
+        )
+
+    def _metrics(self):
+        self.client.force_authenticate(self.admin)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.content.decode()
+
+    def test_records_viewset_action(self):
+        """Test a request is recorded under its viewset and action"""
+        Post.objects.create(user=self.user, title='Post', content='Text')
+        self.client.force_authenticate(self.user)
+        self.client.get(POSTS_URL)
+
+        text = self._metrics()
+
+        labels = 'view="PostViewSet",action="list",method="GET",status="200"'
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 1',
+                      text)
+        self.assertIn(f'http_request_db_queries_count{{{labels}}} 1', text)
+        self.assertIn(f'http_response_size_bytes_count{{{labels}}} 1', text)
+        self.assertIn(
+            f'http_request_serializer_duration_seconds_sum{{{labels}}}',
+            text
+        )
+
+    def test_counts_queries(self):
+        """Test the database queries of a request are counted"""
+        self.client.force_authenticate(self.user)
+        self.client.get(POSTS_URL)
+
+        text = self._metrics()
+
+        labels = 'view="PostViewSet",action="list",method="GET",status="200"'
+        self.assertIn(f'http_request_db_queries_bucket{{{labels},le="1"}} 1',
+                      text)
+
+    def test_counts_queries_under_asgi(self):
+        """Test the queries of sync views are counted under ASGI"""
+        res = async_to_sync(AsyncClient().get)(HEALTH_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        text = self._metrics()
+
+        labels = 'view="HealthView",action="get",method="GET",status="200"'
+        self.assertIn(f'http_request_db_queries_sum{{{labels}}} 1', text)
+
+    def test_unresolved_requests_not_recorded(self):
+        """Test requests to unknown URLs do not add label values"""
+        self.client.get('/unknown/')
+
+        self.assertNotIn('unknown', self._metrics())
+
+    def test_metrics_admin_only(self):
+        """Test the metrics are not visible to regular users"""
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(REQUEST_METRICS={'SLOW_REQUEST_SECONDS': 0})
+    def test_slow_request_logged_with_queries(self):
+        """Test slow requests are logged with their slowest statements"""
+        self.client.force_authenticate(self.user)
+
+        with self.assertLogs('core.metrics', 'WARNING') as logs:
+            self.client.get(POSTS_URL)
+
+        self.assertIn('PostViewSet.list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -0,0 +1,60 @@
+import datetime
+import decimal
+import io
+import uuid
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONTests(SimpleTestCase):
+    """Test cases for the orjson renderer and parser"""
+
+    data = {
+        'text': 'Line\u2028separator and ünicode',
+        'created_on': datetime.datetime(
+            2021, 5, 1, 12, 30, tzinfo=datetime.timezone.utc
+        ),
+        'day': datetime.date(2021, 5, 1),
+        'amount': decimal.Decimal('1.50'),
+        'key': uuid.UUID(int=7),
+        'message': _('Not found.'),
+        'items': [1, 2.5, None, True, {'nested': []}],
+        'big': 2 ** 70,
+    }
+
+    def test_renders_like_json_renderer(self):
+        """Test the output matches JSONRenderer byte for byte"""
+        self.assertEqual(
+            FastJSONRenderer().render(self.data),
+            JSONRenderer().render(self.data)
+        )
+
+    def test_renders_indented_output(self):
+        """Test requested indentation falls back to JSONRenderer"""
+        context = {'indent': 4}
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, renderer_context=context),
+            JSONRenderer().render(self.data, renderer_context=context)
+        )
+
+    def test_parses_like_json_parser(self):
+        """Test the parsed data matches JSONParser"""
+        body = '{"title": "Café", "tags": [1, 2], "n": 1.5}'.encode()
+
+        self.assertEqual(
+            FastJSONParser().parse(io.BytesIO(body)),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_parse_error(self):
+        """Test invalid JSON is a parse error"""
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"a": NaN}'))
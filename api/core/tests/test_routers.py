@@ -0,0 +1,152 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Post
+from post import representations
+
+REPLICAS = {'ALIASES': ['replica'], 'STICKY_SECONDS': 5}
+POSTS_PATH = '/api/post/posts/'
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Test cases for routing the reads to the read replicas"""
+
+    def setUp(self):
+        routers._down_until.clear()
+        caches['default'].clear()
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.connect = mock.patch('core.routers._connect').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def _serve(self, request, status=200):
+        """Serve a request, returning where Post and User are read from"""
+        seen = {}
+
+        def view(request):
+            seen['post'] = self.router.db_for_read(Post)
+            seen['user'] = self.router.db_for_read(get_user_model())
+            return HttpResponse(status=status)
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_without_replicas(self):
+        """Test everything is read from the primary without replicas"""
+        seen, response = self._serve(self.factory.get(POSTS_PATH))
+
+        self.assertEqual(seen, {'post': 'default', 'user': 'default'})
+        self.assertFalse(self.connect.called)
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_safe_requests_read_replica(self):
+        """Test the blog models of safe requests are read from a replica"""
+        seen, response = self._serve(self.factory.get(POSTS_PATH))
+        self.assertEqual(seen, {'post': 'replica', 'user': 'default'})
+
+        seen, response = self._serve(self.factory.get('/api/user/me/'))
+        self.assertEqual(seen['post'], 'default')
+
+        seen, response = self._serve(self.factory.post(POSTS_PATH))
+        self.assertEqual(seen['post'], 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_failover_to_primary(self):
+        """Test a replica refusing connections is skipped for a while"""
+        self.connect.side_effect = OperationalError('connection refused')
+
+        seen, response = self._serve(self.factory.get(POSTS_PATH))
+        self.assertEqual(seen['post'], 'default')
+
+        self.connect.reset_mock()
+        seen, response = self._serve(self.factory.get(POSTS_PATH))
+        self.assertEqual(seen['post'], 'default')
+        self.assertFalse(self.connect.called)
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_read_your_writes(self):
+        """Test clients read from the primary for a while after writing"""
+        auth = {'HTTP_AUTHORIZATION': 'Token abc'}
+        seen, response = self._serve(
+            self.factory.post(POSTS_PATH, **auth),
+            status=201
+        )
+        self.assertEqual(response.cookies['read_primary']['max-age'], 5)
+
+        seen, response = self._serve(self.factory.get(POSTS_PATH, **auth))
+        self.assertEqual(seen['post'], 'default')
+
+        request = self.factory.get(POSTS_PATH)
+        request.COOKIES['read_primary'] = '1'
+        seen, response = self._serve(request)
+        self.assertEqual(seen['post'], 'default')
+
+        other = {'HTTP_AUTHORIZATION': 'Token other'}
+        seen, response = self._serve(self.factory.get(POSTS_PATH, **other))
+        self.assertEqual(seen['post'], 'replica')
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_failed_writes_do_not_pin(self):
+        """Test rejected writes leave the client on the replicas"""
+        seen, response = self._serve(self.factory.post(POSTS_PATH),
+                                     status=400)
+
+        self.assertNotIn('read_primary', response.cookies)
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_recent_versions_not_cached_from_replica(self):
+        """Test posts changed within the lag are not cached off a replica"""
+        caches['posts'].clear()
+        representations.invalidate_posts([1])
+        versions = representations.get_versions([1])
+        token = routers._routing.set(
+            routers.ReplicaChoice(routers.get_options())
+        )
+        try:
+            self.router.db_for_read(Post)
+            representations.set_representations('kind', {1: (1, 'old')},
+                                                versions)
+        finally:
+            routers._routing.reset(token)
+
+        self.assertEqual(
+            representations.get_representations('kind', versions),
+            {}
+        )
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_settled_versions_cached_from_replica(self):
+        """Test posts changed longer than the lag ago are cached"""
+        caches['posts'].clear()
+        now = time.monotonic()
+        samples = representations._CounterSamples()
+        with mock.patch.object(representations, '_samples', samples), \
+                mock.patch('post.representations.time.monotonic') as clock:
+            clock.return_value = now - 10
+            representations.invalidate_posts([1])
+            versions = representations.get_versions([1])
+            clock.return_value = now
+            token = routers._routing.set(
+                routers.ReplicaChoice(routers.get_options())
+            )
+            try:
+                self.router.db_for_read(Post)
+                representations.set_representations('kind', {1: (1, 'new')},
+                                                    versions)
+            finally:
+                routers._routing.reset(token)
+
+        self.assertEqual(
+            representations.get_representations('kind', versions),
+            {1: (1, 'new')}
+        )
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+
+from django.test import SimpleTestCase
+
+from core.streaming import aiterate_in_thread, iterate_in_thread
+
+
+class IterateInThreadTests(SimpleTestCase):
+    """Test cases for producing streamed items in a worker thread"""
+
+    def test_items_produced_in_another_thread(self):
+        """Test the items are produced in order by another thread"""
+        def produce():
+            for index in range(20):
+                yield index, threading.current_thread()
+
+        items = list(iterate_in_thread(produce, max_buffered=2))
+
+        self.assertEqual([index for index, thread in items], list(range(20)))
+        self.assertNotIn(threading.current_thread(),
+                         {thread for index, thread in items})
+
+    def test_errors_reraised(self):
+        """Test an error of the producer is raised to the consumer"""
+        def produce():
+            yield 1
+            raise ValueError('Broken')
+
+        items = iterate_in_thread(produce)
+
+        self.assertEqual(next(items), 1)
+        with self.assertRaisesMessage(ValueError, 'Broken'):
+            next(items)
+
+    def test_producer_stops_when_closed(self):
+        """Test the producer stops once the consumer goes away"""
+        finished = threading.Event()
+
+        def produce():
+            try:
+                for index in range(1000):
+                    yield index
+            finally:
+                finished.set()
+
+        items = iterate_in_thread(produce, max_buffered=1)
+        next(items)
+        items.close()
+
+        self.assertTrue(finished.wait(5))
+
+    def test_async_items_awaited_without_blocking(self):
+        """Test the event loop keeps running while the producer is slow"""
+        def produce():
+            for index in range(3):
+                time.sleep(0.1)
+                yield index
+
+        async def consume():
+            ticks = 0
+            consumer = asyncio.ensure_future(self._collect(
+                aiterate_in_thread(produce, max_buffered=1)
+            ))
+            while not consumer.done():
+                await asyncio.sleep(0.01)
+                ticks += 1
+            return await consumer, ticks
+
+        items, ticks = async_to_sync(consume)()
+
+        self.assertEqual(items, [0, 1, 2])
+        self.assertGreater(ticks, 10)
+
+    def test_async_errors_reraised(self):
+        """Test an error of the producer is raised to the async consumer"""
+        def produce():
+            yield 1
+            raise ValueError('Broken')
+
+        with self.assertRaisesMessage(ValueError, 'Broken'):
+            async_to_sync(self._collect)(aiterate_in_thread(produce))
+
+    @staticmethod
+    async def _collect(items):
+        return [item async for item in items]
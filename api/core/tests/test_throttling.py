@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, \
+    force_authenticate
+
+from core import throttling
+
+POSTS_URL = reverse('post:post-list')
+EXPORT_URL = reverse('post:post-export')
+TOKEN_URL = reverse('user:token')
+
+RATES = {'read': '2/min', 'write': '5/min', 'upload': '1/min', 'auth': '1/min'}
+
+
+def throttle_rates(rates):
+    """Turn the rate limits on, they are off for the test suite"""
+    return override_settings(
+        REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': rates,
+        },
+        RATE_LIMITS={**settings.RATE_LIMITS, 'ENABLED': True}
+    )
+
+
+class BucketStoreTests(SimpleTestCase):
+    """Test cases for the rate limit stores"""
+
+    def test_local_store(self):
+        """Test the local buckets allow bursts up to their capacity"""
+        store = throttling.LocalBucketStore(max_buckets=10)
+
+        states = [store.take('key', 3, 60) for _ in range(4)]
+
+        self.assertEqual([state.allowed for state in states],
+                         [True, True, True, False])
+        self.assertEqual([state.remaining for state in states], [2, 1, 0, 0])
+        self.assertAlmostEqual(states[-1].wait, 20, delta=0.1)
+        self.assertTrue(store.take('other', 3, 60).allowed)
+
+    def test_local_store_drops_full_buckets(self):
+        """Test the local store forgets the buckets that refilled"""
+        store = throttling.LocalBucketStore(max_buckets=2)
+        for key in ('a', 'b', 'c'):
+            store.take(key, 1000, 0.001)
+
+        self.assertLessEqual(len(store._full_at), 2)
+
+    def test_cache_store(self):
+        """Test the shared windows count the requests of the period"""
+        store = throttling.CacheWindowStore('default')
+        store.clear()
+
+        states = [store.take('key', 2, 3600) for _ in range(3)]
+
+        self.assertEqual([state.allowed for state in states],
+                         [True, True, False])
+        self.assertEqual(states[1].remaining, 0)
+        self.assertGreater(states[2].wait, 0)
+
+
+@throttle_rates(RATES)
+class RateLimitAPITests(TestCase):
+    """Test cases for the rate limits of the API"""
+
+    def setUp(self):
+        throttling.get_store().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_read_limit(self):
+        """Test reads over the limit get a 429 and rate limit headers"""
+        first = self.client.get(POSTS_URL)
+        second = self.client.get(POSTS_URL)
+        third = self.client.get(POSTS_URL)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['RateLimit-Limit'], '2')
+        self.assertEqual(first['RateLimit-Remaining'], '1')
+        self.assertEqual(second['RateLimit-Remaining'], '0')
+        self.assertEqual(third.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(third['Retry-After'], '30')
+
+        # Writes and other users have buckets of their own
+        res = self.client.post(POSTS_URL, {'title': 'Post', 'content': 'Hi'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['RateLimit-Limit'], '5')
+        other = get_user_model().objects.create_user('o@test.com', 'Test123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(POSTS_URL).status_code,
+                         status.HTTP_200_OK)
+
+    def test_auth_limit(self):
+        """Test logins are limited per client address"""
+        client = APIClient()
+        payload = {'email': 'user@test.com', 'password': 'Test123'}
+
+        self.assertEqual(client.post(TOKEN_URL, payload).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(client.post(TOKEN_URL, payload).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(RATE_LIMITS={'ENABLED': False})
+    def test_disabled(self):
+        """Test nothing is limited when the rate limits are disabled"""
+        for _ in range(3):
+            res = self.client.get(POSTS_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('RateLimit-Limit', res)
+
+    def test_buckets_follow_the_rates(self):
+        """Test the buckets filled with a rate do not limit another one"""
+        self.client.get(POSTS_URL)
+        self.client.get(POSTS_URL)
+
+        with throttle_rates({**RATES, 'read': '3/min'}):
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['RateLimit-Remaining'], '2')
+
+
+class ConcurrencyThrottleTests(TestCase):
+    """Test cases for the limit of requests in progress per user"""
+
+    @override_settings(RATE_LIMITS={'MAX_CONCURRENT_REQUESTS': 1})
+    def test_requests_in_progress_limited(self):
+        """Test a user cannot run more requests at once than allowed"""
+        user = get_user_model().objects.create_user('user@test.com', 'Test')
+        throttle = throttling.ConcurrencyThrottle()
+
+        def request():
+            http_request = APIRequestFactory().get('/')
+            force_authenticate(http_request, user)
+            request = Request(http_request)
+            request.user = user
+            return request
+
+        first = request()
+        self.assertTrue(throttle.allow_request(first, None))
+        self.assertFalse(throttle.allow_request(request(), None))
+
+        for release in first._request.throttle_releases:
+            release()
+        last = request()
+        self.assertTrue(throttle.allow_request(last, None))
+        for release in last._request.throttle_releases:
+            release()
+
+    @override_settings(RATE_LIMITS={'MAX_CONCURRENT_REQUESTS': 1})
+    def test_streaming_response_holds_its_slot(self):
+        """Test a streamed response frees its slot once it is sent"""
+        user = get_user_model().objects.create_user('user@test.com', 'Test')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        export = client.get(EXPORT_URL)
+        self.assertEqual(export.status_code, status.HTTP_200_OK)
+        self.assertEqual(client.get(POSTS_URL).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+        b''.join(export.streaming_content)
+        self.assertEqual(client.get(POSTS_URL).status_code,
+                         status.HTTP_200_OK)
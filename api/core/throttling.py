@@ -0,0 +1,260 @@
+"""
+Rate limiting with token buckets, or with fixed windows shared through a cache.
+
+Every client has a bucket per scope holding up to N tokens and refilled
+at N tokens per period, for a DEFAULT_THROTTLE_RATES entry of 'N/period'.
+Each request takes a token, requests finding the bucket empty get a 429.
+Reads, writes, uploads and logins have scopes of their own; views pick
+one with a `throttle_scope` attribute, other requests are reads or
+writes depending on their method.
+
+The buckets of the local store are kept with the generic cell rate
+algorithm: only the time at which a bucket will be full again is stored,
+so a request costs one read-modify-write of a number under a lock.
+
+The cache store shares the limits of every process through a cache such
+as memcached or redis, which only offers atomic increments. It is not a
+token bucket but a fixed window counter: N requests are allowed per
+period, counted from the start of the period, so a client can make up
+to 2N requests around the end of a period. A request costs one atomic
+increment, two for the first request of a period.
+"""
+import math
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+DEFAULTS = {
+    # Whether the throttles limit anything
+    'ENABLED': True,
+    # 'local' keeps the buckets in the memory of every process, 'cache'
+    # shares them through the cache CACHE_ALIAS
+    'STORE': 'local',
+    'CACHE_ALIAS': 'default',
+    # Buckets kept by the local store before dropping the full ones
+    'MAX_BUCKETS': 100000,
+    # Requests of a user in progress at once per process, None for no limit
+    'MAX_CONCURRENT_REQUESTS': None,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'RATE_LIMITS', {})}
+
+
+class BucketState:
+    """Outcome of taking a token from a bucket"""
+
+    def __init__(self, allowed, limit, remaining, reset, wait):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        # Seconds until the bucket is full again
+        self.reset = reset
+        # Seconds until a token is available, when none was
+        self.wait = wait
+
+
+class LocalBucketStore:
+    """Token buckets in the memory of the process"""
+
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self._full_at = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, period):
+        """
+        Take a token from a bucket
+        :param key: Identifies the bucket
+        :param limit: Capacity of the bucket, refilled over `period`
+        :param period: Seconds to refill an empty bucket
+        :return: BucketState
+        """
+        interval = period / limit
+        now = time.monotonic()
+        with self._lock:
+            full_at = max(self._full_at.get(key, now), now)
+            # The tolerance absorbs the rounding of the sums of intervals
+            allowed = full_at + interval - now <= period + 1e-9
+            if allowed:
+                full_at += interval
+                self._full_at[key] = full_at
+                if len(self._full_at) > self.max_buckets:
+                    self._drop_full(now)
+
+        return BucketState(
+            allowed,
+            limit,
+            int((period - (full_at - now)) / interval + 1e-9),
+            full_at - now,
+            0 if allowed else full_at + interval - now - period
+        )
+
+    def _drop_full(self, now):
+        self._full_at = {
+            key: full_at for key, full_at in self._full_at.items()
+            if full_at > now
+        }
+
+    def clear(self):
+        with self._lock:
+            self._full_at.clear()
+
+
+class CacheWindowStore:
+    """Fixed window counters shared through a cache, see the module"""
+
+    def __init__(self, cache_alias):
+        self.cache = caches[cache_alias]
+
+    def take(self, key, limit, period):
+        now = time.time()
+        window = int(now // period)
+        cache_key = f'throttle:{key}:{window}'
+        try:
+            taken = self.cache.incr(cache_key)
+        except ValueError:
+            # First request of the period, unless another process won
+            if self.cache.add(cache_key, 1, math.ceil(period) + 1):
+                taken = 1
+            else:
+                taken = self.cache.incr(cache_key)
+
+        reset = (window + 1) * period - now
+        allowed = taken <= limit
+        return BucketState(
+            allowed,
+            limit,
+            max(0, limit - taken),
+            reset,
+            0 if allowed else reset
+        )
+
+    def clear(self):
+        self.cache.clear()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store():
+    """Return the bucket store configured by RATE_LIMITS"""
+    options = get_options()
+    key = (options['STORE'], options['CACHE_ALIAS'], options['MAX_BUCKETS'])
+    with _stores_lock:
+        if key not in _stores:
+            if options['STORE'] == 'cache':
+                _stores[key] = CacheWindowStore(options['CACHE_ALIAS'])
+            else:
+                _stores[key] = LocalBucketStore(options['MAX_BUCKETS'])
+        return _stores[key]
+
+
+def _reset_stores(*args, setting, **kwargs):
+    """Start with empty local buckets when the limits change"""
+    if setting in ('RATE_LIMITS', 'REST_FRAMEWORK', 'CACHES'):
+        with _stores_lock:
+            _stores.clear()
+
+
+setting_changed.connect(_reset_stores)
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle taking a token from the bucket of the user, or of the client
+    address for anonymous requests, for the scope of the request
+    """
+
+    def __init__(self):
+        # The rate depends on the scope of each request
+        self._wait = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        return 'read' if request.method in SAFE_METHODS else 'write'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'{self.get_scope(request, view)}:{ident}'
+
+    def allow_request(self, request, view):
+        if not get_options()['ENABLED']:
+            return True
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(
+            self.get_scope(request, view)
+        )
+        if rate is None:
+            return True
+
+        limit, period = self.parse_rate(rate)
+        # A bucket is only used with the rate it was filled for
+        state = get_store().take(
+            f'{self.get_cache_key(request, view)}:{limit}/{period}',
+            limit,
+            period
+        )
+        # Sent as RateLimit headers by core.middleware.RateLimitMiddleware
+        request._request.rate_limit = state
+        self._wait = state.wait
+        return state.allowed
+
+    def wait(self):
+        return self._wait
+
+
+_in_progress = Counter()
+_in_progress_lock = threading.Lock()
+
+
+class ConcurrencyThrottle(BaseThrottle):
+    """
+    Throttle limiting the requests of a user in progress at once in this
+    process to MAX_CONCURRENT_REQUESTS. The slot of a request is freed by
+    core.middleware.RateLimitMiddleware once its response is ready, or
+    once a streaming response has been sent.
+    """
+
+    def allow_request(self, request, view):
+        options = get_options()
+        limit = options['MAX_CONCURRENT_REQUESTS']
+        if not options['ENABLED'] or limit is None:
+            return True
+        if not (request.user and request.user.is_authenticated):
+            return True
+
+        ident = request.user.pk
+        with _in_progress_lock:
+            if _in_progress[ident] >= limit:
+                return False
+            _in_progress[ident] += 1
+
+        def release():
+            with _in_progress_lock:
+                _in_progress[ident] -= 1
+                if _in_progress[ident] <= 0:
+                    del _in_progress[ident]
+
+        request._request.throttle_releases = [
+            *getattr(request._request, 'throttle_releases', ()),
+            release
+        ]
+        return True
+
+    def wait(self):
+        return 1
@@ -0,0 +1,61 @@
+from django.http import HttpResponse
+
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.db import check_health
+from core.metrics import registry
+from user.authentication import CachedTokenAuthentication
+
+
+class MetricsView(APIView):
+    """Expose the request metrics of this process to Prometheus"""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SessionAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return the metrics in the Prometheus text format"""
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+class HealthView(APIView):
+    """Tell load balancers whether the databases and caches respond"""
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    throttle_classes = ()
+
+    def get(self, request):
+        """
+        Return 200 when the required checks pass, with the status
+        `degraded` when an optional one fails, and 503 otherwise
+        """
+        required, optional = check_health()
+        healthy = not any(required.values())
+        if not healthy:
+            state = 'error'
+        elif any(optional.values()):
+            state = 'degraded'
+        else:
+            state = 'ok'
+        response = Response(
+            {
+                'status': state,
+                'checks': {
+                    name: error or 'ok'
+                    for name, error in {**required, **optional}.items()
+                },
+            },
+            status=status.HTTP_200_OK if healthy
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration serving the ASGI application with uvicorn workers:
+
+    gunicorn api.asgi:application -c gunicorn.conf.py
+
+Every worker is an event loop serving many connections at once; the
+number of views running at once per worker is bounded by
+DJANGO_ASYNC_CONCURRENCY, see core.async_views.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get(
+    'GUNICORN_WORKERS',
+    multiprocessing.cpu_count() * 2 + 1
+))
+
+# Connections waiting to be accepted by a worker
+backlog = 2048
+# Restart a worker that does not answer its heartbeat for this long
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle the workers now and then to bound memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = '-'
+errorlog = '-'
@@ -0,0 +1,493 @@
+"""
+Reproducible benchmarks of the API end-points.
+
+`seed_blog` fills the database with synthetic users, tags, posts and
+comments from a random seed. `run_benchmark` replays requests against
+every end-point, either in process through the test client or over HTTP
+against a real WSGI/ASGI server, and summarises the latencies, the
+throughput and the number of database queries as JSON documents that
+`compare_results` can diff between commits.
+"""
+import http.client
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+from urllib.parse import urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.bulk import bulk_create_with_ids
+from core.models import Comment, Post, Tag
+
+EMAIL_DOMAIN = 'benchmark.local'
+PASSWORD = 'benchmark'
+
+_WORDS = (
+    'python', 'django', 'rest', 'api', 'cache', 'index', 'query', 'latency',
+    'database', 'server', 'client', 'token', 'image', 'search', 'tag',
+    'comment', 'post', 'blog', 'design', 'deploy', 'scale', 'profile',
+    'stream', 'worker', 'thread', 'async', 'replica', 'feed', 'batch',
+)
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(_WORDS) for _ in range(words))
+
+
+def seed_blog(users=10, posts_per_user=100, tags_per_user=20,
+              tags_per_post=3, comments_per_post=5, seed=0, batch_size=500):
+    """
+    Create a synthetic data set for the benchmarks.
+    The same arguments always produce the same rows.
+    :param users: Number of users
+    :param posts_per_user: Number of posts of every user
+    :param tags_per_user: Number of tags of every user
+    :param tags_per_post: Number of tags of every post
+    :param comments_per_post: Number of comments on every post, written
+    by random users
+    :param seed: Seed of the random generator
+    :param batch_size: Number of rows per INSERT statement
+    :return: List of the created users
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+
+    with transaction.atomic():
+        accounts = bulk_create_with_ids(get_user_model(), [
+            get_user_model()(
+                email=f'user{index}.{seed}@{EMAIL_DOMAIN}',
+                name=f'Benchmark user {index}',
+                password=password
+            )
+            for index in range(users)
+        ], batch_size)
+        Token.objects.bulk_create([
+            Token(user=account, key=Token.generate_key())
+            for account in accounts
+        ], batch_size=batch_size)
+
+        tags = bulk_create_with_ids(Tag, [
+            Tag(user=account, name=name, normalized_name=name)
+            for account in accounts
+            for name in (
+                f'{rng.choice(_WORDS)}-{index}'
+                for index in range(tags_per_user)
+            )
+        ], batch_size)
+        tags_by_user = {}
+        for tag in tags:
+            tags_by_user.setdefault(tag.user_id, []).append(tag)
+
+        posts = bulk_create_with_ids(Post, [
+            Post(
+                user=account,
+                title=_text(rng, 5),
+                content=_text(rng, 80),
+                link=f'https://{EMAIL_DOMAIN}/{rng.getrandbits(32)}'
+            )
+            for account in accounts
+            for _ in range(posts_per_user)
+        ], batch_size)
+
+        Post.tags.through.objects.bulk_create([
+            Post.tags.through(post_id=post.id, tag_id=tag.id)
+            for post in posts
+            for tag in rng.sample(
+                tags_by_user.get(post.user_id, []),
+                min(tags_per_post, len(tags_by_user.get(post.user_id, [])))
+            )
+        ], batch_size=batch_size)
+
+        bulk_create_with_ids(Comment, [
+            Comment(
+                user=rng.choice(accounts),
+                post=post,
+                content=_text(rng, 20)
+            )
+            for post in posts
+            for _ in range(comments_per_post)
+        ], batch_size)
+        Post.objects.filter(user__in=accounts).refresh_counts()
+    return accounts
+
+
+class Scenario:
+    """A request replayed by the benchmark with varying users and ids"""
+
+    def __init__(self, name, method, build, writes=False):
+        """
+        :param name: Name of the scenario in the results
+        :param method: HTTP method of the request
+        :param build: Function of (rng, fixture) returning the path and
+        the JSON body of a request
+        :param writes: Whether the request changes the data
+        """
+        self.name = name
+        self.method = method
+        self.build = build
+        self.writes = writes
+
+
+def _detail(name):
+    return lambda pk: reverse(name, args=[pk])
+
+
+def _id_list(rng, ids, count):
+    return ','.join(str(pk) for pk in rng.sample(ids, min(count, len(ids))))
+
+
+SCENARIOS = [
+    Scenario('post-list', 'GET', lambda rng, fx: (
+        reverse('post:post-list'), None
+    )),
+    Scenario('post-list-tags', 'GET', lambda rng, fx: (
+        f"{reverse('post:post-list')}?tags={rng.choice(fx['tags'])}", None
+    )),
+    Scenario('post-list-tags-any', 'GET', lambda rng, fx: (
+        f"{reverse('post:post-list')}?tags="
+        f"{_id_list(rng, fx['tags'], 3)}", None
+    )),
+    Scenario('post-list-tags-all', 'GET', lambda rng, fx: (
+        f"{reverse('post:post-list')}?tags_match=all&tags="
+        f"{_id_list(rng, fx['tags'], 2)}", None
+    )),
+    Scenario('post-search', 'GET', lambda rng, fx: (
+        f"{reverse('post:post-list')}?q={rng.choice(_WORDS)}", None
+    )),
+    Scenario('post-detail', 'GET', lambda rng, fx: (
+        _detail('post:post-detail')(rng.choice(fx['posts'])), None
+    )),
+    Scenario('comment-list', 'GET', lambda rng, fx: (
+        reverse('post:comment-list'), None
+    )),
+    Scenario('comment-detail', 'GET', lambda rng, fx: (
+        _detail('post:comment-detail')(rng.choice(fx['comments'])), None
+    )),
+    Scenario('tag-list', 'GET', lambda rng, fx: (
+        reverse('post:tag-list'), None
+    )),
+    Scenario('user-me', 'GET', lambda rng, fx: (
+        reverse('user:me'), None
+    )),
+    Scenario('post-create', 'POST', lambda rng, fx: (
+        reverse('post:post-list'),
+        {
+            'title': _text(rng, 5),
+            'content': _text(rng, 80),
+            'tags': rng.sample(fx['tags'], min(3, len(fx['tags']))),
+        }
+    ), writes=True),
+    Scenario('post-update', 'PATCH', lambda rng, fx: (
+        _detail('post:post-detail')(rng.choice(fx['posts'])),
+        {'title': _text(rng, 5)}
+    ), writes=True),
+    Scenario('token-create', 'POST', lambda rng, fx: (
+        reverse('user:token'),
+        {'email': fx['email'], 'password': PASSWORD}
+    ), writes=True),
+]
+
+
+def load_fixtures(limit=100):
+    """
+    Load the seeded users with the ids the scenarios pick from
+    :param limit: Maximum number of ids loaded per user and model
+    :return: List of dicts, one per seeded user with posts
+    """
+    fixtures = []
+    users = get_user_model().objects.filter(
+        email__endswith=f'@{EMAIL_DOMAIN}'
+    ).select_related('auth_token').order_by('id')
+    for user in users:
+        fixture = {
+            'email': user.email,
+            'token': user.auth_token.key,
+            'posts': list(Post.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:limit]),
+            'comments': list(Comment.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:limit]),
+            'tags': list(Tag.objects.filter(
+                user=user
+            ).values_list('id', flat=True)[:limit]),
+        }
+        if fixture['posts'] and fixture['comments'] and fixture['tags']:
+            fixtures.append(fixture)
+    return fixtures
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ClientTransport:
+    """Send the requests in process through the DRF test client"""
+    name = 'client'
+    counts_queries = True
+
+    def __init__(self):
+        self.client = APIClient()
+        self.host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS
+             if host != '*'),
+            'localhost'
+        )
+
+    def send(self, method, path, body, token):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.client.generic(
+                method,
+                path,
+                json.dumps(body) if body is not None else '',
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Token {token}',
+                HTTP_HOST=self.host
+            )
+        return response.status_code, counter.count
+
+
+class HTTPTransport:
+    """Send the requests to a running server, one connection per thread"""
+    name = 'http'
+    counts_queries = False
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.connection_class = http.client.HTTPSConnection \
+            if parts.scheme == 'https' else http.client.HTTPConnection
+        self._local = threading.local()
+
+    def _connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection = self.connection_class(
+                self.host,
+                self.port,
+                timeout=30
+            )
+        return self._local.connection
+
+    def send(self, method, path, body, token):
+        headers = {'Authorization': f'Token {token}'}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        conn = self._connection()
+        try:
+            conn.request(method, self.prefix + path, payload, headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.connection = None
+            return None, None
+        return response.status, None
+
+
+def percentile(values, fraction):
+    """
+    Return a percentile of the values by the nearest rank method
+    :param values: Sorted list of numbers
+    :param fraction: The percentile as a fraction, e.g. 0.95
+    :return: The value at the percentile, or None without values
+    """
+    if not values:
+        return None
+    rank = math.ceil(fraction * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def _summarise(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2)
+        if elapsed else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3)
+            if latencies else None,
+            'p50': None, 'p95': None, 'p99': None, 'max': None,
+        },
+        'queries': None,
+    }
+    for key, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99),
+                          ('max', 1.0)):
+        value = percentile(latencies, fraction)
+        summary['latency_ms'][key] = round(value * 1000, 3) \
+            if value is not None else None
+    if queries:
+        summary['queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        }
+    return summary
+
+
+def run_scenario(transport, scenario, fixtures, requests, warmup=10,
+                 concurrency=1, seed=0):
+    """
+    Replay a scenario and summarise the measures
+    :param transport: ClientTransport or HTTPTransport
+    :param scenario: The Scenario to replay
+    :param fixtures: Seeded users returned by load_fixtures
+    :param requests: Number of measured requests
+    :param warmup: Number of requests sent before measuring
+    :param concurrency: Number of threads sending requests
+    :param seed: Seed of the random choices of users and ids
+    :return: Dict of the measures
+    """
+    rng = random.Random(f'{seed}:{scenario.name}')
+    plan = []
+    for index in range(warmup + requests):
+        fixture = fixtures[index % len(fixtures)]
+        path, body = scenario.build(rng, fixture)
+        plan.append((path, body, fixture['token']))
+
+    for path, body, token in plan[:warmup]:
+        transport.send(scenario.method, path, body, token)
+
+    def send(item):
+        path, body, token = item
+        start = perf_counter()
+        status, queries = transport.send(scenario.method, path, body, token)
+        return perf_counter() - start, status, queries
+
+    start = perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            measures = list(executor.map(send, plan[warmup:]))
+    else:
+        measures = [send(item) for item in plan[warmup:]]
+    elapsed = perf_counter() - start
+
+    return _summarise(
+        [duration for duration, status, queries in measures],
+        [queries for duration, status, queries in measures
+         if queries is not None],
+        sum(1 for duration, status, queries in measures
+            if status is None or status >= 400),
+        elapsed
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(transport, scenarios=None, requests=200, warmup=10,
+                  concurrency=1, seed=0):
+    """
+    Benchmark the end-points with the seeded data
+    :param transport: ClientTransport or HTTPTransport
+    :param scenarios: Scenarios to run, all of them by default
+    :param requests: Number of measured requests per scenario
+    :param warmup: Number of unmeasured requests per scenario
+    :param concurrency: Number of threads sending requests
+    :param seed: Seed of the random choices of users and ids
+    :return: JSON serializable dict of the results
+    """
+    fixtures = load_fixtures()
+    if not fixtures:
+        raise ValueError('No benchmark data, run the seed_blog command')
+
+    results = {}
+    for scenario in scenarios or SCENARIOS:
+        results[scenario.name] = run_scenario(
+            transport, scenario, fixtures, requests, warmup, concurrency,
+            seed
+        )
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'transport': transport.name,
+            'requests': requests,
+            'warmup': warmup,
+            'concurrency': concurrency,
+            'seed': seed,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'data': {
+                'users': len(fixtures),
+                'posts': Post.objects.count(),
+                'comments': Comment.objects.count(),
+                'tags': Tag.objects.count(),
+            },
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.1):
+    """
+    Compare two benchmark results
+    :param baseline: Results of the reference run
+    :param current: Results of the new run
+    :param threshold: Relative increase reported as a regression
+    :return: List of (scenario, metric, baseline, current, change,
+    regressed) tuples
+    """
+    rows = []
+    for name, measures in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        metrics = [
+            ('p50_ms', reference['latency_ms']['p50'],
+             measures['latency_ms']['p50']),
+            ('p95_ms', reference['latency_ms']['p95'],
+             measures['latency_ms']['p95']),
+            ('p99_ms', reference['latency_ms']['p99'],
+             measures['latency_ms']['p99']),
+            ('queries', (reference['queries'] or {}).get('mean'),
+             (measures['queries'] or {}).get('mean')),
+        ]
+        for metric, old, new in metrics:
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else 0.0
+            regressed = change > threshold
+            rows.append((name, metric, old, new, change, regressed))
+
+        old, new = reference['throughput_rps'], measures['throughput_rps']
+        if old and new:
+            change = (new - old) / old
+            rows.append((name, 'throughput_rps', old, new, change,
+                         change < -threshold))
+    return rows
@@ -0,0 +1,281 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+
+from core.bulk import bulk_create_with_ids
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves ids from objects loaded up front.
+    Bulk requests load all the referenced objects with one query and put
+    them in the serializer context, instead of one query per id.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(
+            self.get_queryset().model
+        )
+        if preloaded is None:
+            return super().to_internal_value(data)
+
+        try:
+            pk = self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkModelMixin:
+    """
+    Create, update and delete many objects with a single request.
+
+    POST takes a list of objects, PATCH a list of partial objects with
+    their `id` and DELETE a list of ids. Every item is validated before
+    anything is written, errors are reported per item, and the whole
+    request runs in one transaction with batched queries.
+    """
+    bulk_batch_size = 500
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """Create, update or delete a list of objects"""
+        items = request.data
+        max_items = getattr(settings, 'BULK_MAX_ITEMS', 10000)
+        if not isinstance(items, list):
+            return Response(
+                {'detail': _('Expected a list of items.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > max_items:
+            return Response(
+                {'detail': _('At most %d items can be sent at once.')
+                    % max_items},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        handler = {
+            'POST': self.bulk_create,
+            'PATCH': self.bulk_update,
+            'DELETE': self.bulk_destroy,
+        }[request.method]
+        with transaction.atomic():
+            return handler(items)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['preloaded'] = getattr(self, '_preloaded', {})
+        return context
+
+    def get_bulk_save_kwargs(self):
+        """Return the attributes set on every created object"""
+        return {'user': self.request.user}
+
+    def bulk_changed(self, instances):
+        """
+        Hook called with the objects a bulk request creates, updates or
+        is about to delete, since bulk queries send no model signals.
+        """
+
+    def bulk_create(self, items):
+        """Validate and insert a list of new objects"""
+        serializer = self._validate_items(items)
+        if serializer is None:
+            return Response(self._errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        save_kwargs = self.get_bulk_save_kwargs()
+        instances = []
+        relations = []
+        for attrs in serializer.validated_data:
+            fields, many = self._split_attrs(model, attrs)
+            instances.append(model(**fields, **save_kwargs))
+            relations.append(many)
+
+        bulk_create_with_ids(model, instances, self.bulk_batch_size)
+        self._set_many_to_many(model, instances, relations)
+        self.bulk_changed(instances)
+
+        return Response(
+            self._bulk_representation([instance.pk for instance in instances]),
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, items):
+        """Validate and update a list of existing objects"""
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        existing = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+
+        serializer = self._validate_items(items, partial=True)
+        errors = self._errors if serializer is None else [{}] * len(items)
+        for index, pk in enumerate(ids):
+            if pk not in existing:
+                errors[index] = {
+                    **errors[index],
+                    'id': [_('Not found.')]
+                }
+        if serializer is None or any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.get_queryset().model
+        instances = [existing[pk] for pk in ids]
+        self.bulk_changed(instances)
+
+        changed_fields = set()
+        relations = []
+        for instance, attrs in zip(instances, serializer.validated_data):
+            fields, many = self._split_attrs(model, attrs)
+            for name, value in fields.items():
+                setattr(instance, name, value)
+            changed_fields.update(fields)
+            relations.append(many)
+
+        if changed_fields:
+            model.objects.bulk_update(
+                instances,
+                sorted(changed_fields),
+                batch_size=self.bulk_batch_size
+            )
+        self._set_many_to_many(model, instances, relations, replace=True)
+        self.bulk_changed(instances)
+
+        return Response(self._bulk_representation(ids))
+
+    def bulk_destroy(self, items):
+        """Delete a list of objects given by their ids"""
+        if not all(isinstance(pk, int) for pk in items):
+            return Response(
+                {'detail': _('Expected a list of ids.')},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Views may list distinct objects, which cannot be deleted as is
+        model = self.get_queryset().model
+        deleted = model._default_manager.filter(
+            pk__in=self.get_queryset().filter(pk__in=items).values('pk')
+        ).delete()[1]
+        return Response({'deleted': deleted.get(model._meta.label, 0)})
+
+    def _validate_items(self, items, partial=False):
+        """
+        Validate all the items in one pass
+        :param items: List of the items sent by the client
+        :param partial: Whether the items are partial updates
+        :return: The valid list serializer, or None when items are invalid
+        """
+        self._preloaded = self._preload_related(items)
+        serializer = self.get_serializer(
+            data=items,
+            many=True,
+            partial=partial
+        )
+        if serializer.is_valid():
+            return serializer
+        self._errors = serializer.errors
+        return None
+
+    def _preload_related(self, items):
+        """
+        Load every object referenced by the items with one query per model
+        :param items: List of the items sent by the client
+        :return: Dict mapping models to dicts of objects by primary key
+        """
+        preloaded = {}
+        for name, field in self.get_serializer().fields.items():
+            if isinstance(field, ManyRelatedField):
+                relation, many = field.child_relation, True
+            else:
+                relation, many = field, False
+            if field.read_only or \
+                    not isinstance(relation, PreloadedPrimaryKeyRelatedField):
+                continue
+
+            queryset = relation.get_queryset()
+            ids = set()
+            for item in items:
+                value = item.get(name) if isinstance(item, dict) else None
+                values = value if many and isinstance(value, list) \
+                    else [value]
+                for pk in values:
+                    try:
+                        ids.add(queryset.model._meta.pk.to_python(pk))
+                    except (TypeError, ValidationError):
+                        continue
+            ids.discard(None)
+
+            preloaded.setdefault(queryset.model, {}).update(
+                queryset.in_bulk(ids)
+            )
+        return preloaded
+
+    @staticmethod
+    def _split_attrs(model, attrs):
+        """
+        Split validated data into column values and many-to-many lists.
+        Reverse relations, such as the comments of a post, are owned by
+        the related objects and are not written by bulk requests.
+        """
+        opts = model._meta
+        columns = {field.name for field in opts.concrete_fields}
+        many_names = {field.name for field in opts.many_to_many}
+        fields = {k: v for k, v in attrs.items() if k in columns}
+        many = {k: v for k, v in attrs.items() if k in many_names}
+        return fields, many
+
+    def _set_many_to_many(self, model, instances, relations, replace=False):
+        """
+        Write the many-to-many relations of the objects with bulk queries
+        :param model: The model class of the objects
+        :param instances: List of saved objects
+        :param relations: Dicts of related objects, one per object
+        :param replace: Whether to remove the current relations first
+        :return: None
+        """
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+
+            assigned = [
+                (instance, many[field.name])
+                for instance, many in zip(instances, relations)
+                if field.name in many
+            ]
+            if not assigned:
+                continue
+
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [
+                        instance.pk for instance, related in assigned
+                    ]
+                }).delete()
+
+            through.objects.bulk_create([
+                through(**{source: instance.pk, target: related.pk})
+                for instance, related_objects in assigned
+                for related in {obj.pk: obj for obj in related_objects}
+                .values()
+            ], batch_size=self.bulk_batch_size)
+
+    def _bulk_representation(self, ids):
+        """Return the representation of the given objects, in order"""
+        objects = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [objects[pk] for pk in ids],
+            many=True
+        )
+        return serializer.data
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from core import routers
+from post import representations
+from user import authentication
+
+
+def _shared_state_aliases():
+    """Return the caches whose entries every process must see, by use"""
+    uses = {}
+    uses.setdefault(
+        getattr(settings, 'POST_VERSION_CACHE_ALIAS', 'default'), []
+    ).append('the ETag version stamps')
+    uses.setdefault(
+        representations.get_options()['CACHE_ALIAS'], []
+    ).append('the post representation versions')
+    token_alias = authentication.get_options()['CACHE_ALIAS']
+    if token_alias is not None:
+        uses.setdefault(token_alias, []).append('the authenticated tokens')
+    replicas = routers.get_options()
+    if replicas['ALIASES']:
+        uses.setdefault(replicas['CACHE_ALIAS'], []).append(
+            'the replica pins'
+        )
+    return uses
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_caches(app_configs, **kwargs):
+    """
+    Warn about the caches holding state shared by the processes serving
+    the API that are kept in the memory of each process. The default
+    LocMemCache is fine for a single process, so this is not an error.
+    """
+    workers = getattr(settings, 'SERVER_WORKERS', 1)
+    if workers <= 1:
+        return []
+
+    return [
+        checks.Warning(
+            f'The cache {alias!r} holding {" and ".join(uses)} is kept '
+            f'in the memory of each of the {workers} worker processes.',
+            hint='Set DJANGO_CACHE_BACKEND to memcached or redis, or '
+                 'GUNICORN_WORKERS to 1.',
+            id='post.W001',
+        )
+        for alias, uses in _shared_state_aliases().items()
+        if isinstance(caches[alias], LocMemCache)
+    ]
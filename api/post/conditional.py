@@ -0,0 +1,140 @@
+import hashlib
+import math
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core import routers
+
+
+def _stamp_cache():
+    return caches[getattr(settings, 'POST_VERSION_CACHE_ALIAS', 'default')]
+
+
+def _stamp_key(user_id):
+    return f'post:stamp:{user_id}'
+
+
+def get_user_stamp(user_id):
+    """
+    Return the version stamp of the blog data visible to a user.
+    A missing stamp is replaced by a new random one, so an evicted
+    stamp can never match an ETag handed out before.
+    :param user_id: The id of the user
+    :return: Tuple of the version string and the time it was set
+    """
+    cache = _stamp_cache()
+    key = _stamp_key(user_id)
+    stamp = cache.get(key)
+    if stamp is None:
+        cache.add(key, (uuid.uuid4().hex, time.time()), None)
+        stamp = cache.get(key)
+    return stamp
+
+
+def touch_users(user_ids):
+    """
+    Give new version stamps to the given users.
+    When called inside a transaction the stamps are renewed again once
+    it commits, so no reader can pair a new stamp with the old rows.
+    :param user_ids: Iterable of user ids whose data has changed
+    :return: None
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return
+
+    def renew():
+        now = time.time()
+        _stamp_cache().set_many({
+            _stamp_key(user_id): (uuid.uuid4().hex, now)
+            for user_id in user_ids
+        }, None)
+
+    renew()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(renew)
+
+
+class ConditionalGetMixin:
+    """
+    Support conditional GET requests on the list and retrieve actions.
+
+    The ETag is derived from the version stamp of the user and the
+    request, so a matching If-None-Match is answered with 304 without
+    touching the database or running the serializer.
+    """
+
+    def get_etag(self, request, version):
+        """
+        Return the ETag of the response to a request
+        :param request: The request being served
+        :param version: The version stamp of the user's data
+        :return: Quoted ETag string
+        """
+        digest = hashlib.sha1('\n'.join((
+            version,
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        )).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        """
+        Answer with 304 when the client already has the current version
+        :param handler: The action that builds the full response
+        :param request: The request being served
+        :return: Response object
+        """
+        version, modified = get_user_stamp(request.user.id)
+        etag = self.get_etag(request, version)
+        last_modified = math.ceil(modified)
+
+        if self._not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            # A replica may not have the last change of a recent stamp
+            # yet, such a response must not be validated later
+            if routers.reading_from_replica() and \
+                    time.time() - modified < routers.replica_lag_seconds():
+                return response
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    @staticmethod
+    def _not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return etag in tags or '*' in tags
+
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return if_modified_since is not None and \
+            last_modified <= if_modified_since
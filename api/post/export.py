@@ -0,0 +1,165 @@
+"""
+Streaming exports of blog posts with their tags and comments.
+
+The posts are read with a server-side cursor, `chunk_size` at a time,
+and the tags and comments of every chunk are prefetched in two queries.
+Every chunk is encoded and handed to the response before the next one
+is read, so the memory used does not grow with the size of the export.
+"""
+import csv
+import io
+import zlib
+from itertools import islice
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from rest_framework import serializers
+
+from core.models import Comment, Tag
+from core.renderers import FastJSONRenderer
+
+CHUNK_SIZE = 500
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+GZIP_CONTENT_TYPE = 'application/gzip'
+
+CSV_COLUMNS = (
+    'record', 'id', 'post', 'user', 'title', 'content', 'link', 'tags',
+    'created_on'
+)
+
+_datetime_field = serializers.DateTimeField()
+_renderer = FastJSONRenderer()
+
+
+def post_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over posts in chunks, with their tags and comments loaded
+    :param queryset: The posts to export
+    :param chunk_size: Number of posts read and prefetched at once
+    :return: Generator of lists of posts, in the order of their ids
+    """
+    # iterator() ignores prefetch_related, the chunks are prefetched below
+    posts = queryset.order_by('id').prefetch_related(None).only(
+        'id', 'user', 'title', 'content', 'link', 'created_on'
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(posts, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(
+            chunk,
+            Prefetch('tags', queryset=Tag.objects.order_by('id').only(
+                'id', 'name'
+            )),
+            Prefetch('comments', queryset=Comment.objects.order_by('id'))
+        )
+        yield chunk
+
+
+def post_record(post):
+    """Return the exported representation of a prefetched post"""
+    return {
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'link': post.link,
+        'created_on': _datetime_field.to_representation(post.created_on),
+        'tags': [{'id': tag.id, 'name': tag.name} for tag in post.tags.all()],
+        'comments': [
+            {
+                'id': comment.id,
+                'user': comment.user_id,
+                'content': comment.content,
+                'created_on': _datetime_field.to_representation(
+                    comment.created_on
+                ),
+            }
+            for comment in post.comments.all()
+        ],
+    }
+
+
+def ndjson_chunks(chunks):
+    """Encode every post as a line of JSON, one bytes string per chunk"""
+    for chunk in chunks:
+        yield b''.join(
+            _renderer.render(post_record(post)) + b'\n' for post in chunk
+        )
+
+
+def csv_chunks(chunks):
+    """
+    Encode the posts as CSV, one bytes string per chunk. Every post row
+    is followed by the rows of its comments, told apart by the `record`
+    column; the tag names of a post are joined with semicolons.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        for post in chunk:
+            record = post_record(post)
+            writer.writerow((
+                'post', record['id'], '', post.user_id, record['title'],
+                record['content'], record['link'],
+                ';'.join(tag['name'] for tag in record['tags']),
+                record['created_on']
+            ))
+            writer.writerows(
+                (
+                    'comment', comment['id'], record['id'], comment['user'],
+                    '', comment['content'], '', '', comment['created_on']
+                )
+                for comment in record['comments']
+            )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Without any post, only the header is exported
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+ENCODERS = {
+    'ndjson': ndjson_chunks,
+    'csv': csv_chunks,
+}
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compress a stream of bytes into the gzip format on the fly
+    :param chunks: Iterable of bytes strings
+    :param level: Compression level, from 1 (fastest) to 9 (smallest)
+    :return: Generator of the compressed bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_posts(queryset, export_format='ndjson', compress=False,
+                 chunk_size=CHUNK_SIZE):
+    """
+    Export posts with their tags and comments
+    :param queryset: The posts to export
+    :param export_format: Either 'ndjson' or 'csv'
+    :param compress: Whether to compress the export with gzip
+    :param chunk_size: Number of posts read and prefetched at once
+    :return: Generator of the bytes of the export
+    """
+    chunks = ENCODERS[export_format](post_chunks(queryset, chunk_size))
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(export_format, compress=False):
+    return f'posts.{export_format}' + ('.gz' if compress else '')
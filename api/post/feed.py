@@ -0,0 +1,179 @@
+"""
+Feeds of the posts of the followed users.
+
+A new post is written into the feed of every follower of its author by
+a background task (fan-out on write), so reading a feed is a seek on
+the (user, created_on, post) index of the feed entries and costs a page
+whatever the number of followed users.
+
+Writing a post of a user followed by millions into millions of feeds
+does not scale, so once a user has more than FANOUT_LIMIT followers
+`User.feed_pull` is set and their posts are no longer fanned out. The
+feeds pull the posts of such users, and the own posts of the reader, at
+read time with a seek on the post index of every author instead, and
+post.pagination.FeedPagination merges both sources.
+"""
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+
+from core import tasks
+from core.models import FeedEntry, Follow, Post
+
+DEFAULTS = {
+    # Followers above which the posts of a user are pulled at read time
+    'FANOUT_LIMIT': 10000,
+    # Followers whose entries are inserted by a single query
+    'BATCH_SIZE': 1000,
+    # Latest posts of a user copied into the feed of a new follower
+    'BACKFILL': 100,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'FEED', {})}
+
+
+def _entries(follower_ids, posts):
+    return [
+        FeedEntry(
+            user_id=follower_id,
+            post_id=post_id,
+            author_id=author_id,
+            created_on=created_on
+        )
+        for follower_id in follower_ids
+        for post_id, author_id, created_on in posts
+    ]
+
+
+def fan_out_posts(post_ids):
+    """
+    Write new posts into the feeds of the followers of their authors
+    :param post_ids: Iterable of post ids
+    :return: Number of feed entries offered to the feeds, including the
+    ones already there, which are skipped
+    """
+    options = get_options()
+    by_author = defaultdict(list)
+    for post in Post.objects.filter(
+        id__in=list(post_ids),
+        user__feed_pull=False
+    ).values_list('id', 'user_id', 'created_on'):
+        by_author[post[1]].append(post)
+
+    offered = 0
+    for author_id, posts in by_author.items():
+        followers = Follow.objects.filter(
+            followee_id=author_id
+        ).values_list('follower_id', flat=True).iterator(
+            chunk_size=options['BATCH_SIZE']
+        )
+        while True:
+            chunk = list(islice(followers, options['BATCH_SIZE']))
+            if not chunk:
+                break
+            # Entries already written by a retry or a backfill are skipped
+            offered += len(FeedEntry.objects.bulk_create(
+                _entries(chunk, posts),
+                batch_size=options['BATCH_SIZE'],
+                ignore_conflicts=True
+            ))
+    return offered
+
+
+def backfill_feed(follower_id, followee_id):
+    """
+    Copy the latest posts of a user into the feed of a new follower
+    :param follower_id: Id of the follower
+    :param followee_id: Id of the followed user
+    :return: None
+    """
+    if not Follow.objects.filter(
+        follower_id=follower_id,
+        followee_id=followee_id
+    ).exists():
+        return
+    posts = Post.objects.filter(
+        user_id=followee_id
+    ).order_by('-created_on', '-id').values_list(
+        'id', 'user_id', 'created_on'
+    )[:get_options()['BACKFILL']]
+    FeedEntry.objects.bulk_create(
+        _entries([follower_id], posts),
+        ignore_conflicts=True
+    )
+
+
+def follow(follower, followee):
+    """
+    Make a user follow another one
+    :param follower: The following user
+    :param followee: The followed user
+    :return: Tuple of the Follow and whether it was created
+    """
+    with transaction.atomic():
+        relation, created = Follow.objects.get_or_create(
+            follower=follower,
+            followee=followee
+        )
+    if not created or followee.feed_pull:
+        return relation, created
+
+    if Follow.objects.filter(followee=followee).count() > \
+            get_options()['FANOUT_LIMIT']:
+        # Sticky, so that no post is left out of both paths
+        get_user_model().objects.filter(
+            pk=followee.pk
+        ).update(feed_pull=True)
+    else:
+        tasks.submit(backfill_feed, follower.id, followee.id)
+    return relation, created
+
+
+def unfollow(follower_id, followee_id):
+    """
+    Make a user stop following another one and drop their posts from
+    the feed of the user
+    :param follower_id: Id of the following user
+    :param followee_id: Id of the followed user
+    :return: Whether the user was following the other one
+    """
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower_id=follower_id,
+            followee_id=followee_id
+        ).delete()
+        FeedEntry.objects.filter(
+            user_id=follower_id,
+            author_id=followee_id
+        ).delete()
+    return bool(deleted)
+
+
+def feed_querysets(user_id):
+    """
+    Return the sources of the feed of a user for FeedPagination
+    :param user_id: Id of the reader
+    :return: Querysets of dicts with the created_on, post_id and
+    author_id of the posts
+    """
+    pulled = Follow.objects.filter(
+        follower_id=user_id,
+        followee__feed_pull=True
+    ).values_list('followee_id', flat=True)
+
+    return [
+        FeedEntry.objects.filter(user_id=user_id).values(
+            'created_on', 'post_id', 'author_id'
+        ),
+        Post.objects.filter(user_id__in=[user_id, *pulled]).values(
+            'created_on',
+            post_id=F('id'),
+            author_id=F('user_id')
+        ),
+    ]
@@ -0,0 +1,144 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from core.models import Post
+from post.signals import posts_changed
+
+DEFAULTS = {
+    # Name and longest side in pixels of every generated variant
+    'SIZES': {
+        'thumbnail': 150,
+        'small': 480,
+        'medium': 1024,
+    },
+    # Encodings generated for every variant, with their quality
+    'FORMATS': {
+        'webp': 80,
+        'jpeg': 85,
+    },
+}
+
+_PILLOW_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def _options():
+    return {**DEFAULTS, **getattr(settings, 'POST_IMAGE_VARIANTS', {})}
+
+
+def variant_path(image_name, size_name, fmt):
+    """
+    Return the storage path of an image variant
+    :param image_name: Storage name of the original image
+    :param size_name: Name of the variant size, e.g. thumbnail
+    :param fmt: Encoding of the variant, e.g. webp
+    :return: Path of the variant next to the original
+    """
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{size_name}.{fmt}')
+
+
+def render_variants(image_name):
+    """
+    Generate the resized and re-encoded variants of an image
+    :param image_name: Storage name of the original image
+    :return: Dict of the variants, keyed by size name
+    """
+    options = _options()
+    with default_storage.open(image_name) as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    variants = {}
+    for size_name, size in options['SIZES'].items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+
+        variant = {'width': resized.width, 'height': resized.height}
+        for fmt, quality in options['FORMATS'].items():
+            if fmt == 'jpeg' and resized.mode != 'RGB':
+                encoded = resized.convert('RGB')
+            else:
+                encoded = resized
+            buffer = io.BytesIO()
+            encoded.save(buffer, _PILLOW_FORMATS[fmt], quality=quality)
+
+            path = variant_path(image_name, size_name, fmt)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            variant[fmt] = default_storage.save(
+                path,
+                ContentFile(buffer.getvalue())
+            )
+        variants[size_name] = variant
+    return variants
+
+
+def delete_variants(variants, keep=()):
+    """
+    Delete the files of previously generated variants
+    :param variants: Dict of variants as stored on the post
+    :param keep: Paths that must not be deleted
+    :return: None
+    """
+    for variant in (variants or {}).values():
+        for fmt in _PILLOW_FORMATS:
+            path = variant.get(fmt)
+            if path and path not in keep:
+                default_storage.delete(path)
+
+
+def _variant_paths(variants):
+    return {
+        variant[fmt]
+        for variant in variants.values()
+        for fmt in _PILLOW_FORMATS if fmt in variant
+    }
+
+
+def process_post_image(post_id, image_name, stale_variants=None):
+    """
+    Background task generating the variants of a newly uploaded image.
+    The variants are only stored when the post still has the same image,
+    so a slow task cannot overwrite the variants of a newer upload.
+    :param post_id: The id of the post the image was uploaded to
+    :param image_name: Storage name of the uploaded image
+    :param stale_variants: Variants of the replaced image to delete
+    :return: None
+    """
+    variants = render_variants(image_name)
+    updated = Post.objects.filter(
+        id=post_id,
+        image=image_name
+    ).update(image_variants=variants)
+
+    if not updated:
+        # The image was replaced while the variants were rendered
+        delete_variants(variants)
+        delete_variants(stale_variants)
+        return
+
+    delete_variants(stale_variants, keep=_variant_paths(variants))
+    posts_changed([post_id])
+
+
+def variant_urls(variants):
+    """
+    Return the public URLs of the variants stored on a post
+    :param variants: Dict of variants as stored on the post
+    :return: Dict of the variants with URLs instead of storage paths
+    """
+    return {
+        size_name: {
+            key: default_storage.url(value) if key in _PILLOW_FORMATS
+            else value
+            for key, value in variant.items()
+        }
+        for size_name, variant in (variants or {}).items()
+    }
@@ -0,0 +1,270 @@
+"""
+Bulk import of blog posts with their tags and comments from NDJSON.
+
+Every line holds a post in the format of post.export, e.g.
+`{"title": ..., "content": ..., "tags": ["python"], "comments": [...]}`.
+The posts are imported in chunks, one transaction per chunk: the tags
+are resolved through an in-memory map of the tag ids of every user, and
+the posts, their tag links and their comments are inserted with a few
+bulk INSERT statements per chunk instead of a request per object.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from core import tasks
+from core.bulk import bulk_create_with_ids
+from core.models import Comment, Post, Tag
+from core.tags import normalize_tag_name
+from post.conditional import touch_users
+from post.feed import fan_out_posts
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class ImportRecordError(ValueError):
+    """A line of the import cannot be turned into a post"""
+
+
+def parse_record(line):
+    """
+    Parse a line of NDJSON into a post record, checking its values fit
+    the columns they are written to
+    :param line: The bytes of the line
+    :return: The record, a dict
+    """
+    try:
+        record = _loads(line)
+    except ValueError as exc:
+        raise ImportRecordError(f'Invalid JSON: {exc}')
+    if not isinstance(record, dict):
+        raise ImportRecordError('Expected a JSON object')
+    if not isinstance(record.get('title'), str) or not record['title']:
+        raise ImportRecordError('The post has no title')
+    for key in ('tags', 'comments'):
+        if not isinstance(record.get(key, []), list):
+            raise ImportRecordError(f'"{key}" must be a list')
+
+    for key in ('title', 'content', 'link'):
+        _check_text(Post, key, record.get(key))
+    _check_user(record.get('user'))
+    _created_on(record)
+    for tag in record.get('tags', []):
+        _tag_name(tag)
+    for comment in record.get('comments', []):
+        if not isinstance(comment, dict):
+            raise ImportRecordError('A comment must be a JSON object')
+        _check_text(Comment, 'content', comment.get('content'),
+                    'comment content')
+        _check_user(comment.get('user'))
+        _created_on(comment)
+    return record
+
+
+def _check_text(model, name, value, label=None):
+    """
+    Check a value can be stored in a text column, as the database would
+    otherwise fail the whole chunk
+    :param model: The model of the column
+    :param name: The name of the field
+    :param value: The value given, None when missing
+    :param label: Name of the value in the error message
+    :return: None
+    """
+    label = label or name
+    if value is None:
+        return
+    if not isinstance(value, str):
+        raise ImportRecordError(f'"{label}" must be a string')
+    if '\x00' in value:
+        raise ImportRecordError(f'"{label}" contains a null character')
+    try:
+        model._meta.get_field(name).run_validators(value)
+    except ValidationError as exc:
+        raise ImportRecordError(f'Invalid {label}: {" ".join(exc.messages)}')
+
+
+def _check_user(user):
+    """Users are given by email or id, see BlogImporter._user_id"""
+    if user is not None and (
+        isinstance(user, bool) or not isinstance(user, (int, str))
+    ):
+        raise ImportRecordError(f'Invalid user: {user}')
+
+
+def _created_on(record):
+    value = record.get('created_on')
+    if value is None:
+        return None
+    try:
+        created_on = parse_datetime(value) if isinstance(value, str) \
+            else None
+    except ValueError:
+        created_on = None
+    if created_on is None:
+        raise ImportRecordError(f'Invalid date: {value}')
+    return created_on
+
+
+def _tag_name(tag):
+    """Tags are given by name, or as exported, by {"id": ..., "name": ...}"""
+    name = tag.get('name') if isinstance(tag, dict) else tag
+    if not isinstance(name, str) or not normalize_tag_name(name):
+        raise ImportRecordError(f'Invalid tag: {tag}')
+    _check_text(Tag, 'name', name, 'tag')
+    return name
+
+
+class BlogImporter:
+    """
+    Import chunks of post records. The importer remembers the ids of the
+    tags and users it has seen, so it is meant to be used for one import.
+    """
+
+    def __init__(self, default_user=None, batch_size=500):
+        """
+        :param default_user: Owner of the posts without a "user" email
+        :param batch_size: Number of rows per INSERT statement
+        """
+        self.default_user_id = getattr(default_user, 'id', None)
+        self.batch_size = batch_size
+        self._user_ids = {}
+        self._tag_ids = {}
+
+    def _user_id(self, user):
+        """Users are given by email, or by id as in the exports"""
+        if user is None:
+            if self.default_user_id is None:
+                raise ImportRecordError('The post has no user')
+            return self.default_user_id
+
+        if user not in self._user_ids:
+            lookup = 'id' if isinstance(user, int) else 'email'
+            user_id = get_user_model().objects.filter(
+                **{lookup: user}
+            ).values_list('id', flat=True).first()
+            if user_id is None:
+                raise ImportRecordError(f'No user {user}')
+            self._user_ids[user] = user_id
+        return self._user_ids[user]
+
+    def _resolve_tags(self, names_by_user):
+        """
+        Map tag names to ids, creating the missing tags
+        :param names_by_user: Dict of user id to dict of normalized tag
+        names to names
+        :return: None, the ids are added to the tag map
+        """
+        for user_id, names in names_by_user.items():
+            known = self._tag_ids.setdefault(user_id, {})
+            missing = [
+                name for normalized, name in names.items()
+                if normalized not in known
+            ]
+            if missing:
+                tags = Tag.objects.get_or_create_many(
+                    user_id,
+                    missing,
+                    self.batch_size
+                )
+                known.update(
+                    (normalized, tag.id) for normalized, tag in tags.items()
+                )
+
+    def _prepare(self, record):
+        """Build the unsaved post and comments of a record"""
+        user_id = self._user_id(record.get('user'))
+        post = Post(
+            user_id=user_id,
+            title=record['title'],
+            content=record.get('content') or '',
+            link=record.get('link') or '',
+            created_on=_created_on(record)
+        )
+        # Names normalizing to the same string are the same tag
+        post.tag_names = {}
+        for tag in record.get('tags', []):
+            name = _tag_name(tag)
+            post.tag_names.setdefault(normalize_tag_name(name), name)
+        post.new_comments = [
+            Comment(
+                user_id=user_id if comment.get('user') is None
+                else self._user_id(comment['user']),
+                content=comment.get('content') or '',
+                created_on=_created_on(comment)
+            )
+            for comment in record['comments'] if isinstance(comment, dict)
+        ] if record.get('comments') else []
+        post.tag_count = len(post.tag_names)
+        post.comment_count = len(post.new_comments)
+        return post
+
+    def import_records(self, records):
+        """
+        Insert a chunk of post records in one transaction
+        :param records: List of records from parse_record
+        :return: Tuple of the numbers of posts and comments created
+        """
+        posts = [self._prepare(record) for record in records]
+        names_by_user = {}
+        for post in posts:
+            names = names_by_user.setdefault(post.user_id, {})
+            for normalized, name in post.tag_names.items():
+                names.setdefault(normalized, name)
+
+        with transaction.atomic():
+            self._resolve_tags(names_by_user)
+            # created_on is set to now on insert, the given dates are
+            # restored afterwards
+            dates = [post.created_on for post in posts]
+            bulk_create_with_ids(Post, posts, self.batch_size)
+
+            Post.tags.through.objects.bulk_create([
+                Post.tags.through(
+                    post_id=post.id,
+                    tag_id=self._tag_ids[post.user_id][normalized]
+                )
+                for post in posts
+                for normalized in post.tag_names
+            ], batch_size=self.batch_size)
+
+            comments = []
+            for post in posts:
+                for comment in post.new_comments:
+                    comment.post_id = post.id
+                    comments.append(comment)
+            comment_dates = [comment.created_on for comment in comments]
+            bulk_create_with_ids(Comment, comments, self.batch_size)
+
+            self._restore_dates(posts, dates)
+            self._restore_dates(comments, comment_dates)
+
+            # New posts have no cached representations, only the lists
+            # of their owners and commenters change
+            touch_users(
+                {post.user_id for post in posts}
+                | {comment.user_id for comment in comments}
+            )
+            tasks.submit(fan_out_posts, [post.id for post in posts])
+        return len(posts), len(comments)
+
+    def _restore_dates(self, objs, dates):
+        dated = []
+        for obj, created_on in zip(objs, dates):
+            if created_on is not None:
+                obj.created_on = created_on
+                dated.append(obj)
+        if dated:
+            type(dated[0]).objects.bulk_update(
+                dated,
+                ['created_on'],
+                batch_size=self.batch_size
+            )
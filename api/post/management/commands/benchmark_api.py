@@ -0,0 +1,136 @@
+import json
+import threading
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, \
+    WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+
+from post.benchmark import SCENARIOS, ClientTransport, HTTPTransport, \
+    compare_results, run_benchmark
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    """
+    Benchmark every API end-point against the data created by seed_blog.
+    Requests go through the test client by default, to a running server
+    with --base-url, e.g. gunicorn or uvicorn, or to a threaded WSGI
+    server started in this process with --serve.
+    """
+    help = 'Measure the latency, throughput and queries of the API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Measured requests per scenario')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Unmeasured requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Threads sending requests over HTTP')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenarios',
+            help='Comma separated names of the scenarios to run: ' +
+                 ', '.join(scenario.name for scenario in SCENARIOS)
+        )
+        parser.add_argument('--read-only', action='store_true',
+                            help='Skip the scenarios that write data')
+        server = parser.add_mutually_exclusive_group()
+        server.add_argument('--base-url',
+                            help='URL of a running server to benchmark')
+        server.add_argument('--serve', action='store_true',
+                            help='Benchmark a WSGI server in this process')
+        parser.add_argument('--output', help='File to write the JSON to')
+        parser.add_argument('--compare',
+                            help='JSON results of a previous run')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Relative slowdown reported as regression')
+
+    def handle(self, *args, **options):
+        scenarios = self._get_scenarios(options)
+        # A benchmark is one client going flat out, which the rate limits
+        # would turn away. Servers given by --base-url should be started
+        # with DJANGO_RATE_LIMITS=0
+        rate_limits = nullcontext() if options['base_url'] else \
+            override_settings(RATE_LIMITS={
+                **getattr(settings, 'RATE_LIMITS', {}),
+                'ENABLED': False
+            })
+        server = None
+        if options['serve']:
+            server = ThreadedWSGIServer(
+                ('127.0.0.1', 0),
+                QuietWSGIRequestHandler
+            )
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            options['base_url'] = f'http://127.0.0.1:{server.server_port}'
+
+        if options['base_url']:
+            transport = HTTPTransport(options['base_url'])
+            concurrency = options['concurrency']
+        else:
+            transport = ClientTransport()
+            concurrency = 1
+
+        try:
+            with rate_limits:
+                results = run_benchmark(
+                    transport,
+                    scenarios,
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    concurrency=concurrency,
+                    seed=options['seed']
+                )
+        except ValueError as error:
+            raise CommandError(str(error))
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+            rows = compare_results(baseline, results, options['threshold'])
+            self._write_comparison(rows)
+            if any(row[-1] for row in rows):
+                raise CommandError('Performance regressed')
+
+    @staticmethod
+    def _get_scenarios(options):
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            names = options['scenarios'].split(',')
+            unknown = set(names) - {scenario.name for scenario in SCENARIOS}
+            if unknown:
+                raise CommandError(
+                    f'Unknown scenarios: {", ".join(sorted(unknown))}'
+                )
+            scenarios = [s for s in SCENARIOS if s.name in names]
+        if options['read_only']:
+            scenarios = [s for s in scenarios if not s.writes]
+        return scenarios
+
+    def _write_comparison(self, rows):
+        """Print the compared measures, regressions in red"""
+        for name, metric, old, new, change, regressed in rows:
+            line = f'{name:<16} {metric:<15} {old:>10} -> {new:>10} ' \
+                   f'({change:+.1%})'
+            # Keep stdout parseable when the JSON is written to it
+            self.stderr.write(line, self.style.ERROR if regressed else None)
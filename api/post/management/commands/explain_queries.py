@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Comment, Post, Tag
+from post import views
+
+
+class Command(BaseCommand):
+    """
+    Print the query plans of the querysets used by the post API viewsets.
+    This helps to verify that the indexes are used at the real row counts.
+    """
+    help = 'Run EXPLAIN on the querysets of the post API viewsets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the user to build the querysets for. '
+                 'Defaults to the user with the most posts.'
+        )
+        parser.add_argument(
+            '--tags',
+            help='Comma separated tag ids for the tag filter query'
+        )
+
+    def handle(self, *args, **options):
+        user = self._get_user(options['user'])
+        tags = options['tags'] or ','.join(
+            str(pk) for pk in
+            Tag.objects.filter(user=user).values_list('id', flat=True)[:3]
+        )
+
+        post_ids = list(
+            Post.objects.filter(user=user).values_list('id', flat=True)[:50]
+        )
+        plans = [
+            ('PostViewSet.list', views.PostViewSet, 'list', {}),
+            ('PostViewSet.list ?tags=', views.PostViewSet, 'list',
+             {'tags': tags} if tags else None),
+            ('PostViewSet.list ?tags=&tags_match=all', views.PostViewSet,
+             'list', {'tags': tags, 'tags_match': 'all'} if tags else None),
+            ('PostViewSet.retrieve', views.PostViewSet, 'retrieve', {}),
+            ('CommentViewSet.list', views.CommentViewSet, 'list', {}),
+            ('TagViewSet.list', views.TagViewSet, 'list', {}),
+            ('TagViewSet.list ?assigned_only=1', views.TagViewSet, 'list',
+             {'assigned_only': 1}),
+        ]
+
+        for label, viewset, action, params in plans:
+            if params is None:
+                continue
+            queryset = self._viewset_queryset(viewset, action, params, user)
+            self._explain(label, queryset)
+
+        # Queries issued by the prefetch plans of the post serializers
+        self._explain(
+            'Post.comments prefetch',
+            Comment.objects.filter(post__in=post_ids)
+        )
+        self._explain(
+            'Post.tags prefetch',
+            Tag.objects.filter(post__in=post_ids)
+        )
+
+    def _get_user(self, email):
+        """
+        Return the user to build the querysets for
+        :param email: Email of the user, if one was given
+        :return: User object
+        """
+        users = get_user_model().objects.all()
+        if email:
+            try:
+                return users.get(email=email)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'User "{email}" does not exist')
+
+        user = users.annotate(
+            posts=Count('post')
+        ).order_by('-posts').first()
+        if user is None:
+            raise CommandError('There are no users in the database')
+        return user
+
+    def _viewset_queryset(self, viewset, action, params, user):
+        """
+        Build the queryset a viewset runs for a request
+        :param viewset: The viewset class
+        :param action: The viewset action, e.g. list
+        :param params: Query parameters of the request
+        :param user: The authenticated user
+        :return: The queryset, limited to a single page for list actions
+        """
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+
+        view = viewset(request=request, action=action, format_kwarg=None)
+        queryset = view.get_queryset()
+
+        if action == 'list':
+            paginator = view.paginator
+            page_size = paginator.get_page_size(request)
+            return queryset.order_by(*paginator.ordering)[:page_size + 1]
+
+        return queryset.order_by()[:1]
+
+    def _explain(self, label, queryset):
+        """Write the query plan of a queryset to the output"""
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(str(queryset.query))
+        self.stdout.write(queryset.explain())
+        self.stdout.write('')
@@ -0,0 +1,57 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Post
+from post.export import CHUNK_SIZE, CONTENT_TYPES, export_posts
+
+
+class Command(BaseCommand):
+    """
+    Export blog posts with their tags and comments as NDJSON or CSV.
+    The export is streamed to the output, so it can be of any size.
+    """
+    help = 'Export the posts of a user, or of everybody, as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user',
+                            help='Email of the user whose posts to export')
+        parser.add_argument('--output-format', choices=list(CONTENT_TYPES),
+                            default='ndjson')
+        parser.add_argument('--gzip', action='store_true',
+                            help='Compress the export with gzip')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help='Number of posts read at once')
+        parser.add_argument('--output', default='-',
+                            help='File to write, - for the standard output')
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user with email {options["user"]}')
+            queryset = queryset.filter(user=user)
+
+        chunks = export_posts(
+            queryset,
+            options['output_format'],
+            options['gzip'],
+            options['chunk_size']
+        )
+        if options['output'] == '-':
+            self._write(sys.stdout.buffer, chunks)
+            sys.stdout.buffer.flush()
+        else:
+            with open(options['output'], 'wb') as output:
+                self._write(output, chunks)
+            self.stderr.write(self.style.SUCCESS(
+                f'Exported the posts to {options["output"]}'
+            ))
+
+    @staticmethod
+    def _write(output, chunks):
+        for chunk in chunks:
+            output.write(chunk)
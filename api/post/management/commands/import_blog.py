@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import sys
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from post.importer import BlogImporter, ImportRecordError, parse_record
+
+
+class Command(BaseCommand):
+    """
+    Import blog posts with their tags and comments from NDJSON, e.g. the
+    output of export_posts. The input is read as a stream and imported in
+    chunks, one transaction per chunk. With --checkpoint, the number of
+    lines imported is saved after every chunk and a new run with the same
+    checkpoint resumes after them.
+    """
+    help = 'Import posts, tags and comments from an NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input',
+                            help='NDJSON file, gzipped if it ends with .gz, '
+                                 'or - for the standard input')
+        parser.add_argument('--user',
+                            help='Email of the owner of the posts without '
+                                 'a "user"')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of posts per transaction')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of rows per INSERT statement')
+        parser.add_argument('--checkpoint',
+                            help='File keeping track of the progress')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(email=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No user with email {options["user"]}')
+
+        importer = BlogImporter(user, options['batch_size'])
+        checkpoint = options['checkpoint']
+        done = self._read_checkpoint(checkpoint)
+        posts = comments = 0
+
+        with self._open(options['input']) as lines:
+            for _ in islice(lines, done):
+                pass
+            while True:
+                chunk = list(islice(lines, options['chunk_size']))
+                if not chunk:
+                    break
+                records = []
+                for number, line in enumerate(chunk, done + 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(parse_record(line))
+                    except ImportRecordError as exc:
+                        raise CommandError(f'Line {number}: {exc}')
+
+                try:
+                    created = importer.import_records(records)
+                except ImportRecordError as exc:
+                    raise CommandError(
+                        f'Lines {done + 1}-{done + len(chunk)}: {exc}'
+                    )
+                posts += created[0]
+                comments += created[1]
+                done += len(chunk)
+                if checkpoint:
+                    self._write_checkpoint(checkpoint, done)
+                self.stderr.write(f'{done} lines imported')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {posts} posts and {comments} comments'
+        ))
+
+    @staticmethod
+    def _open(path):
+        if path == '-':
+            return os.fdopen(os.dup(sys.stdin.fileno()), 'rb')
+        if path.endswith('.gz'):
+            return gzip.open(path, 'rb')
+        return open(path, 'rb')
+
+    @staticmethod
+    def _read_checkpoint(path):
+        """Return the number of lines already imported"""
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as checkpoint:
+            return json.load(checkpoint)['lines']
+
+    @staticmethod
+    def _write_checkpoint(path, lines):
+        # Replace the file at once, so a crash cannot leave half of it
+        with open(f'{path}.tmp', 'w') as checkpoint:
+            json.dump({'lines': lines}, checkpoint)
+        os.replace(f'{path}.tmp', path)
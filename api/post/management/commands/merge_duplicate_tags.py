@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Post, Tag
+from core.tags import merge_duplicate_tags
+from post.signals import posts_changed
+
+
+class Command(BaseCommand):
+    """
+    Merge the tags of every user whose names normalize to the same name
+    into the oldest one, moving their posts to it. The core migrations
+    run the same merge once; run it again after changing the rules of
+    core.tags.normalize_tag_name.
+    """
+    help = 'Merge the duplicate tags of every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of posts re-tagged per query')
+
+    def handle(self, *args, **options):
+        merged, post_ids = merge_duplicate_tags(
+            Tag,
+            Post,
+            options['batch_size']
+        )
+        if post_ids:
+            posts_changed(post_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {merged} duplicate tags, re-tagging {len(post_ids)} '
+            f'posts'
+        ))
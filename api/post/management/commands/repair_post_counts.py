@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from core.models import Post
+from post.signals import posts_changed
+
+
+class Command(BaseCommand):
+    """
+    Recompute the comment and tag counts stored on the posts.
+    The posts are processed in ranges of ids, one transaction per range,
+    and only the posts whose counts drifted are written.
+    """
+    help = 'Recompute the comment_count and tag_count of the posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of post ids per transaction')
+
+    def handle(self, *args, **options):
+        bounds = Post.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write('There are no posts')
+            return
+
+        batch_size = options['batch_size']
+        repaired = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                post_ids = Post.objects.filter(
+                    id__gte=start,
+                    id__lt=start + batch_size
+                ).repair_counts()
+                if post_ids:
+                    posts_changed(post_ids)
+            repaired += len(post_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Repaired the counts of {repaired} posts'
+        ))
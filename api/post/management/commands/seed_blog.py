@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from post.benchmark import EMAIL_DOMAIN, PASSWORD, seed_blog
+
+
+class Command(BaseCommand):
+    """Fill the database with synthetic data for the benchmarks"""
+    help = 'Create users, tags, posts and comments for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--posts-per-user', type=int, default=100)
+        parser.add_argument('--tags-per-user', type=int, default=20)
+        parser.add_argument('--tags-per-post', type=int, default=3)
+        parser.add_argument('--comments-per-post', type=int, default=5)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the random generator, every seed creates its '
+                 'own users'
+        )
+
+    def handle(self, *args, **options):
+        if get_user_model().objects.filter(
+            email__endswith=f'.{options["seed"]}@{EMAIL_DOMAIN}'
+        ).exists():
+            raise CommandError(
+                f'The data of seed {options["seed"]} already exists'
+            )
+
+        users = seed_blog(
+            users=options['users'],
+            posts_per_user=options['posts_per_user'],
+            tags_per_user=options['tags_per_user'],
+            tags_per_post=options['tags_per_post'],
+            comments_per_post=options['comments_per_post'],
+            seed=options['seed']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users with the password "{PASSWORD}"'
+        ))
@@ -0,0 +1,258 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor based pagination that seeks on the ordering columns.
+
+    Every page is fetched with a `WHERE (a, b) < (x, y)` style filter on
+    the ordering columns instead of an OFFSET, so the cost of a page does
+    not depend on how deep into the results the client is. The last
+    ordering column must be unique to keep the ordering stable.
+
+    Views can order their results differently, e.g. by search rank, with
+    a `get_keyset_ordering()` method.
+    """
+    ordering = ('-created_on', '-id')
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return a single page of results from the queryset
+        :param queryset: Queryset to paginate
+        :param request: The request being served
+        :param view: The view that is paginating the results
+        :return: List of objects on the requested page
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        return self._set_page(self._seek(queryset, cursor), cursor)
+
+    def _seek(self, queryset, cursor):
+        """Return the first rows of the page plus one, from the cursor on"""
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = self._reverse(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(
+                self._seek_filter(ordering, cursor['position'])
+            )
+        return list(queryset[:self.page_size + 1])
+
+    def _set_page(self, results, cursor):
+        """Keep the page out of the rows found after the cursor"""
+        reverse = bool(cursor and cursor['reverse'])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering given by the view, or the default one"""
+        get_keyset_ordering = getattr(view, 'get_keyset_ordering', None)
+        ordering = get_keyset_ordering() if get_keyset_ordering else None
+        return tuple(ordering) if ordering else type(self).ordering
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client within limits"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        """Return the link to the page after the current one"""
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        """Return the link to the page before the current one"""
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, instance, reverse):
+        """
+        Build the URL to the page next to the given object
+        :param instance: First or last object of the current page
+        :param reverse: Whether the cursor points to the previous page
+        :return: URL with an opaque cursor in its query string
+        """
+        position = [
+            self._get_value(instance, name.lstrip('-'))
+            for name in self.ordering
+        ]
+        payload = json.dumps(
+            {'p': position, 'r': int(reverse)},
+            default=str,
+            separators=(',', ':')
+        )
+        encoded = urlsafe_b64encode(payload.encode()).decode('ascii')
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded.rstrip('=')
+        )
+
+    def decode_cursor(self, request, model):
+        """
+        Decode the cursor sent by the client, if any
+        :param request: The request being served
+        :param model: Model of the paginated queryset
+        :return: None or a dict with the position and the direction
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(encoded + padding))
+            position = payload['p']
+            if len(position) != len(self.ordering):
+                raise ValueError('Cursor does not match the ordering')
+            position = [
+                self._to_python(model, name.lstrip('-'), value)
+                for name, value in zip(self.ordering, position)
+            ]
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {'position': position, 'reverse': reverse}
+
+    def _seek_filter(self, ordering, position):
+        """
+        Build the filter matching the rows after the given position
+        :param ordering: Ordering of the queryset
+        :param position: Values of the ordering columns at the cursor
+        :return: Q object expanding the row comparison
+        """
+        seek = Q()
+        for index, name in enumerate(ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition = Q(**{f'{name.lstrip("-")}__{lookup}': position[index]})
+            for previous, value in zip(ordering[:index], position):
+                condition &= Q(**{previous.lstrip('-'): value})
+            seek |= condition
+        return seek
+
+    @staticmethod
+    def _reverse(ordering):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in ordering
+        )
+
+    @staticmethod
+    def _get_value(instance, name):
+        if isinstance(instance, dict):
+            return instance[name]
+        return getattr(instance, name)
+
+    @staticmethod
+    def _to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are kept as decoded
+            return value
+        return field.to_python(value)
+
+
+class TagPagination(KeysetPagination):
+    """Keyset pagination for tags, ordered by name"""
+    ordering = ('-name', '-id')
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pagination merging several sources of feed rows, such as the
+    materialized entries of a feed and the posts pulled at read time.
+    Every source is a queryset of dicts holding the `created_on` and the
+    `post_id` of the posts; each one is seeked on its own index and their
+    pages are merged, so a page costs a page from every source.
+    """
+    ordering = ('-created_on', '-post_id')
+
+    def paginate_querysets(self, querysets, request, view=None):
+        """
+        Return a single page of the merged rows of the querysets
+        :param querysets: Querysets of feed rows
+        :param request: The request being served
+        :param view: The view that is paginating the results
+        :return: List of rows on the requested page
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = type(self).ordering
+
+        cursor = self.decode_cursor(request, querysets[0].model)
+        reverse = bool(cursor and cursor['reverse'])
+        rows = sorted(
+            (row for queryset in querysets
+             for row in self._seek(queryset, cursor)),
+            key=lambda row: (row['created_on'], row['post_id']),
+            reverse=not reverse
+        )
+
+        # A post can come from several sources, e.g. when its author
+        # switched to the pull path after it was written into the feeds
+        seen = set()
+        unique = []
+        for row in rows:
+            if row['post_id'] not in seen:
+                seen.add(row['post_id'])
+                unique.append(row)
+        return self._set_page(unique[:self.page_size + 1], cursor)
@@ -0,0 +1,341 @@
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from rest_framework.response import Response
+
+from core import routers
+
+DEFAULTS = {
+    # Alias of the Django cache holding the representations. Its
+    # MAX_ENTRIES option bounds the number of cached posts.
+    'CACHE_ALIAS': 'posts',
+    # Seconds a representation is kept without being invalidated
+    'TIMEOUT': 60 * 60,
+}
+
+# Counter the versions of the posts are taken from
+_COUNTER_KEY = 'post:serial'
+
+
+def get_options():
+    return {
+        **DEFAULTS,
+        **getattr(settings, 'POST_REPRESENTATION_CACHE', {})
+    }
+
+
+def _cache():
+    return caches[get_options()['CACHE_ALIAS']]
+
+
+def _version_key(post_id):
+    return f'post:serial:{post_id}'
+
+
+def _representation_key(kind, post_id, version):
+    return f'post:repr:{kind}:{post_id}:{version}'
+
+
+class _CounterSamples:
+    """
+    Values of the version counter seen by this process, with the time of
+    its monotonic clock they were seen at. Posts whose version is at most
+    a value seen `lag` seconds ago were changed at least that long ago,
+    whatever the clocks of the other processes say.
+    """
+
+    def __init__(self, interval=0.1):
+        # Seconds between the samples kept
+        self.interval = interval
+        self._samples = deque()
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        now = time.monotonic()
+        with self._lock:
+            if self._samples and now - self._samples[-1][0] < self.interval:
+                return
+            self._samples.append((now, value))
+            self._drop_before(now - routers.replica_lag_seconds())
+
+    def seen_before(self, seconds):
+        """
+        Return the last value seen at least `seconds` ago, None when no
+        value was seen that long ago
+        """
+        limit = time.monotonic() - seconds
+        with self._lock:
+            self._drop_before(limit)
+            if self._samples and self._samples[0][0] <= limit:
+                return self._samples[0][1]
+        return None
+
+    def _drop_before(self, limit):
+        # The last sample before the limit is kept
+        while len(self._samples) > 1 and self._samples[1][0] <= limit:
+            self._samples.popleft()
+
+
+_samples = _CounterSamples()
+
+
+def _new_versions(cache, count):
+    """
+    Return `count` new versions, greater than any version given before by
+    any process. A counter evicted from the cache restarts from the time
+    in microseconds, past the versions it gave unless it gave more than
+    a million a second.
+    """
+    try:
+        last = cache.incr(_COUNTER_KEY, count)
+    except ValueError:
+        cache.add(_COUNTER_KEY, int(time.time() * 1e6), None)
+        last = cache.incr(_COUNTER_KEY, count)
+    _samples.add(last)
+    return list(range(last - count + 1, last + 1))
+
+
+def read_counter():
+    """
+    Return the last version given to a post, 0 when it is not known.
+    Posts whose version is at most this value were changed before.
+    """
+    value = _cache().get(_COUNTER_KEY, 0)
+    _samples.add(value)
+    return value
+
+
+def get_versions(post_ids):
+    """
+    Return the current version of every given post.
+    Posts without a version get a new one, so that representations
+    stored before an eviction can never be served again.
+    :param post_ids: List of post ids
+    :return: Dict mapping the post ids to their versions
+    """
+    cache = _cache()
+    keys = {_version_key(post_id): post_id for post_id in post_ids}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(keys).items()
+    }
+    missing = [key for key, post_id in keys.items() if post_id not in versions]
+    if missing:
+        for key, version in zip(missing, _new_versions(cache, len(missing))):
+            cache.add(key, version, None)
+            versions[keys[key]] = cache.get(key)
+    return versions
+
+
+def get_representations(kind, versions):
+    """
+    Return the cached representations of the given posts
+    :param kind: Name of the serializer the representations came from
+    :param versions: Dict mapping post ids to their versions, as returned
+    by get_versions
+    :return: Dict mapping post ids to (owner id, data) tuples
+    """
+    if not versions:
+        return {}
+
+    keys = {
+        _representation_key(kind, post_id, version): post_id
+        for post_id, version in versions.items()
+    }
+    return {
+        keys[key]: value
+        for key, value in _cache().get_many(keys).items()
+    }
+
+
+def set_representations(kind, representations, versions, read_at=None):
+    """
+    Store the representations of the given posts under the versions they
+    were looked up with. Were the versions read again, a change committed
+    after the rows were read would file the old rows under its version.
+    :param kind: Name of the serializer the representations came from
+    :param representations: Dict mapping post ids to (owner id, data)
+    :param versions: Dict mapping post ids to their versions, read before
+    the rows unless `read_at` is given
+    :param read_at: Value of read_counter() before the rows were read,
+    when the versions were read after the rows. Posts whose version is
+    greater may have changed after their row was read and are not stored.
+    :return: None
+    """
+    settled = read_at
+    if routers.reading_from_replica():
+        # The replica may not have the last change of a recent version yet
+        lagged = _samples.seen_before(routers.replica_lag_seconds())
+        if lagged is None:
+            return
+        settled = lagged if settled is None else min(settled, lagged)
+    if settled is not None:
+        representations = {
+            post_id: value for post_id, value in representations.items()
+            if versions[post_id] <= settled
+        }
+    if not representations:
+        return
+
+    _cache().set_many({
+        _representation_key(kind, post_id, versions[post_id]): value
+        for post_id, value in representations.items()
+    }, get_options()['TIMEOUT'])
+
+
+def invalidate_posts(post_ids):
+    """
+    Give new versions to the given posts, orphaning their cached
+    representations. Inside a transaction this happens again when it
+    commits, as a reader may cache the old rows under the first version.
+    :param post_ids: Iterable of post ids whose representation changed
+    :return: None
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+
+    def renew():
+        cache = _cache()
+        cache.set_many(dict(zip(
+            [_version_key(post_id) for post_id in post_ids],
+            _new_versions(cache, len(post_ids))
+        )), None)
+
+    renew()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(renew)
+
+
+class RepresentationCacheMixin:
+    """
+    Serve the list and retrieve actions from cached post representations.
+
+    Only the posts missing from the cache are serialized, and only those
+    get their relations prefetched. A cached post is retrieved without
+    any query at all.
+
+    Representations are stored under the versions read before their rows
+    or, when the rows come first as in lists, only for posts whose version
+    was given before the request started. A post changed while it is being
+    served is thus never cached in its old state, though a request may
+    still answer with the rows it read.
+    """
+    # Query parameters that filter single objects, bypassing the cache
+    representation_filter_params = ('tags', 'comments')
+    # Version counter when the request started, before any of its rows
+    # were read, see read_counter
+    rows_read_after = None
+
+    def initial(self, request, *args, **kwargs):
+        if self.action != 'retrieve':
+            # Retrieve reads the version before the row instead
+            self.rows_read_after = read_counter()
+        super().initial(request, *args, **kwargs)
+
+    def get_representation_kind(self):
+        """Return the cache namespace of the current action"""
+        return self.get_serializer_class().__name__
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        prefetches = queryset._prefetch_related_lookups
+
+        queryset = queryset.prefetch_related(None)
+        page = self.paginate_queryset(queryset)
+        posts = list(queryset) if page is None else page
+
+        data = self._represent(posts, prefetches)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        versions = None
+        if self._cacheable_lookup(lookup):
+            versions = get_versions([int(lookup)])
+            cached = get_representations(
+                self.get_representation_kind(),
+                versions
+            ).get(int(lookup))
+            if cached is not None and cached[0] == request.user.id:
+                return Response(cached[1])
+
+        instance = self.get_object()
+        return Response(self._represent([instance], (), versions)[0])
+
+    def _cacheable_lookup(self, lookup):
+        params = self.request.query_params
+        return str(lookup).isdigit() and not any(
+            param in params for param in self.representation_filter_params
+        )
+
+    def _represent(self, posts, prefetches, versions=None):
+        """
+        Return the representations of the posts, serializing the misses
+        :param posts: List of post objects
+        :param prefetches: Prefetch lookups needed by the serializer
+        :param versions: Versions of the posts read before their rows
+        :return: List of representations in the order of the posts
+        """
+        def serialize(misses):
+            if prefetches:
+                prefetch_related_objects(misses, *prefetches)
+            return self.get_serializer(misses, many=True).data
+
+        return self.cached_representations(
+            posts,
+            lambda post: (post.id, post.user_id),
+            serialize,
+            versions
+        )
+
+    def cached_representations(self, items, identify, build, versions=None):
+        """
+        Return the representations of posts, building the cache misses
+        :param items: List of posts, as objects or rows
+        :param identify: Function returning the id and the owner id of
+        an item
+        :param build: Function returning the representations of a list
+        of items, None for the items it cannot represent
+        :param versions: Dict mapping the post ids to their versions read
+        before the items, read now when not given
+        :return: List of representations in the order of the items, None
+        for the items `build` could not represent
+        """
+        kind = self.get_representation_kind()
+        keys = [identify(item) for item in items]
+        read_at = None
+        if versions is None:
+            versions = get_versions([pk for pk, owner in keys])
+            # Nothing is stored when the counter was not read first
+            read_at = self.rows_read_after or 0
+        cached = get_representations(kind, versions)
+
+        misses = [
+            (item, key) for item, key in zip(items, keys)
+            if key[0] not in cached
+        ]
+        if misses:
+            fresh = {
+                pk: (owner, data)
+                for (item, (pk, owner)), data in zip(
+                    misses,
+                    build([item for item, key in misses])
+                )
+                if data is not None
+            }
+            set_representations(kind, fresh, versions, read_at)
+            cached.update(fresh)
+
+        return [
+            cached[pk][1] if pk in cached else None
+            for pk, owner in keys
+        ]
@@ -1,9 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+
 from rest_framework import serializers
 
-from core.models import Tag, Post, Comment
+from core.metrics import TimedSerializerMixin
+from core.models import Follow, Tag, Post, Comment
+from core.tags import normalize_tag_name
+from post.bulk import PreloadedPrimaryKeyRelatedField
+from post.images import variant_urls
+from post.sparse import SparseFieldsetMixin
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -11,10 +19,17 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
         read_only_fields = ('id',)
 
+    def validate(self, attrs):
+        """Store the normalized name, bulk writes do not call save()"""
+        if 'name' in attrs:
+            attrs['normalized_name'] = normalize_tag_name(attrs['name'])
+        return attrs
+
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
-    user = serializers.ReadOnlyField(source='user.id')
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+    user = serializers.ReadOnlyField(source='user_id')
 
     class Meta:
         model = Comment
@@ -22,9 +37,13 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_on',)
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(
+    TimedSerializerMixin,
+    SparseFieldsetMixin,
+    serializers.ModelSerializer
+):
     """Serialize a blog post"""
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -32,12 +51,35 @@ class PostSerializer(serializers.ModelSerializer):
     #     many=True,
     #     queryset=Comment.objects.all()
     # )
+    image_variants = serializers.SerializerMethodField()
+
+    expandable_fields = {
+        'tags': lambda: TagSerializer(many=True, read_only=True),
+        'comments': lambda: CommentSerializer(many=True, read_only=True),
+    }
 
     class Meta:
         model = Post
-        fields = ('id', 'title', 'tags',
-                  'content', 'comments', 'link', 'created_on')
-        read_only_fields = ('id', 'created_on',)
+        fields = ('id', 'title', 'tags', 'content', 'comments', 'link',
+                  'image_variants', 'comment_count', 'tag_count',
+                  'created_on')
+        # Comments are added to a post through the comment end-points;
+        # writing them here would move comments of other posts
+        read_only_fields = ('id', 'comments', 'comment_count', 'tag_count',
+                            'created_on',)
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized copies of the post image"""
+        return variant_urls(obj.image_variants)
+
+
+class PostSlimSerializer(PostSerializer):
+    """Serialize a blog post with the counts of its relations only"""
+
+    class Meta(PostSerializer.Meta):
+        fields = ('id', 'title', 'content', 'link', 'image_variants',
+                  'comment_count', 'tag_count', 'created_on')
+        read_only_fields = fields
 
 
 class CommentDetailSerializer(CommentSerializer):
@@ -47,14 +89,37 @@ class CommentDetailSerializer(CommentSerializer):
 
 class PostDetailSerializer(PostSerializer):
     """Serialize a post content"""
-    tags = TagSerializer(many=True, read_only=True)
-    comments = CommentSerializer(many=True)
+    default_expand = ('tags', 'comments')
 
 
-class PostImageSerializer(serializers.ModelSerializer):
+class PostImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for uploading images to posts"""
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_variants')
         read_only_fields = ('id',)
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized copies of the post image"""
+        return variant_urls(obj.image_variants)
+
+
+class FollowSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """Serializer for the users followed by the authenticated user"""
+    followee = serializers.PrimaryKeyRelatedField(
+        queryset=get_user_model().objects.filter(is_active=True)
+    )
+
+    class Meta:
+        model = Follow
+        fields = ('followee', 'created_on')
+        read_only_fields = ('created_on',)
+
+    def validate_followee(self, value):
+        """Reject following oneself"""
+        if value == self.context['request'].user:
+            raise serializers.ValidationError(_('Users cannot follow '
+                                                'themselves.'))
+        return value
@@ -0,0 +1,206 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete, pre_save
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+
+from core.models import Comment, Post, Tag
+from post import suggest
+from post.conditional import touch_users
+from post.representations import invalidate_posts
+
+
+def _post_readers(post_ids):
+    """
+    Return the users whose responses embed the given posts,
+    i.e. the owners of the posts and the users commenting on them.
+    :param post_ids: Iterable of post ids
+    :return: Set of user ids
+    """
+    post_ids = list(post_ids)
+    owners = Post.objects.filter(
+        id__in=post_ids
+    ).values_list('user_id', flat=True)
+    commenters = Comment.objects.filter(
+        post_id__in=post_ids
+    ).values_list('user_id', flat=True)
+    return set(owners) | set(commenters)
+
+
+def posts_changed(post_ids, user_ids=()):
+    """
+    Invalidate everything derived from the given posts
+    :param post_ids: Iterable of the ids of the changed posts
+    :param user_ids: Users affected besides the readers of the posts
+    :return: None
+    """
+    post_ids = set(post_ids)
+    invalidate_posts(post_ids)
+    touch_users(set(user_ids) | _post_readers(post_ids))
+
+
+def shift_counts(post_ids, field, delta):
+    """
+    Add to a counter of the posts with a single UPDATE, so concurrent
+    changes are not lost
+    :param post_ids: Iterable of post ids
+    :param field: The counter, comment_count or tag_count
+    :param delta: The number to add, negative to subtract
+    :return: None
+    """
+    value = F(field) + delta
+    if delta < 0:
+        value = Greatest(value, 0)
+    Post.objects.filter(pk__in=list(post_ids)).update(**{field: value})
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    """Invalidate the data derived from a changed post"""
+    posts_changed([instance.id], [instance.user_id])
+
+
+@receiver(pre_save, sender=Comment)
+def comment_moving(sender, instance, **kwargs):
+    """Remember the post of a comment that is being updated"""
+    if instance.pk is not None:
+        instance._previous_post_id = Comment.objects.filter(
+            pk=instance.pk
+        ).values_list('post_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Invalidate the data derived from a changed comment"""
+    post_ids = {instance.post_id}
+    previous_post_id = getattr(instance, '_previous_post_id', None)
+    if previous_post_id is not None:
+        post_ids.add(previous_post_id)
+    posts_changed(post_ids, [instance.user_id])
+
+
+def _count_comment(comment, delta):
+    """Count a comment on its post, also on the post loaded in memory"""
+    shift_counts([comment.post_id], 'comment_count', delta)
+    if Comment.post.is_cached(comment):
+        post = comment.post
+        post.comment_count = max(post.comment_count + delta, 0)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_saved(sender, instance, created, **kwargs):
+    """Count a new comment, or a comment moved to another post"""
+    previous_post_id = getattr(instance, '_previous_post_id', None)
+    if created:
+        _count_comment(instance, 1)
+    elif previous_post_id is not None \
+            and previous_post_id != instance.post_id:
+        shift_counts([previous_post_id], 'comment_count', -1)
+        _count_comment(instance, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(sender, instance, **kwargs):
+    """Uncount a deleted comment"""
+    _count_comment(instance, -1)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    """Remember the posts of a tag before its through rows are deleted"""
+    instance._post_ids = list(Post.tags.through.objects.filter(
+        tag_id=instance.id
+    ).values_list('post_id', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    """Invalidate the data derived from a changed tag"""
+    post_ids = getattr(instance, '_post_ids', None)
+    if post_ids is None:
+        post_ids = Post.tags.through.objects.filter(
+            tag_id=instance.id
+        ).values_list('post_id', flat=True)
+    posts_changed(post_ids, [instance.user_id])
+
+
+@receiver(post_delete, sender=Tag)
+def count_tag_deleted(sender, instance, **kwargs):
+    """Uncount a deleted tag on the posts it was assigned to"""
+    shift_counts(getattr(instance, '_post_ids', ()), 'tag_count', -1)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def post_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Update the tag counts and invalidate the data of re-tagged posts"""
+    if reverse:
+        if action == 'pre_clear':
+            # The posts losing the tag are unknown once it is cleared
+            instance._cleared_post_ids = list(sender.objects.filter(
+                tag_id=instance.id
+            ).values_list('post_id', flat=True))
+            return
+        if action == 'post_add':
+            post_ids = pk_set
+            if post_ids:
+                shift_counts(post_ids, 'tag_count', 1)
+        elif action == 'post_remove':
+            post_ids = pk_set
+            Post.objects.filter(pk__in=post_ids).refresh_counts()
+        elif action == 'post_clear':
+            post_ids = instance._cleared_post_ids
+            shift_counts(post_ids, 'tag_count', -1)
+        else:
+            return
+    else:
+        post_ids = [instance.id]
+        if action == 'post_add':
+            # Only the tags that were not assigned yet are in pk_set
+            if pk_set:
+                shift_counts(post_ids, 'tag_count', len(pk_set))
+                instance.tag_count += len(pk_set)
+        elif action == 'post_remove':
+            Post.objects.filter(pk=instance.id).refresh_counts()
+            instance.refresh_from_db(fields=['tag_count'])
+        elif action == 'post_clear':
+            Post.objects.filter(pk=instance.id).update(tag_count=0)
+            instance.tag_count = 0
+        else:
+            return
+
+    posts_changed(post_ids)
+
+
+@receiver(post_save, sender=Tag)
+def index_tag_saved(sender, instance, **kwargs):
+    """Add a new or renamed tag to the suggestions of its user"""
+    suggest.tag_saved(instance)
+
+
+@receiver(post_delete, sender=Tag)
+def index_tag_deleted(sender, instance, **kwargs):
+    """Remove a deleted tag from the suggestions of its user"""
+    suggest.tag_deleted(instance)
+
+
+@receiver(post_delete, sender=Post)
+def index_post_deleted(sender, instance, **kwargs):
+    """Recount the usage of the tags of a deleted post"""
+    suggest.forget_users([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_tag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    """Count the posts gained or lost by tags in the suggestions"""
+    if action == 'post_clear':
+        suggest.forget_users([instance.user_id])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        delta = 1 if action == 'post_add' else -1
+        if reverse:
+            suggest.usage_changed(instance.user_id, [instance.id],
+                                  delta * len(pk_set))
+        else:
+            suggest.usage_changed(instance.user_id, pk_set, delta)
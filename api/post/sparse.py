@@ -0,0 +1,120 @@
+"""
+Sparse fieldsets and expansion of relations, driven by query parameters.
+
+`?fields=id,title` limits a representation to the listed fields and
+`?expand=tags,comments` nests the listed relations instead of their ids.
+Views put the parsed parameters in the serializer context, serializers
+with SparseFieldsetMixin apply them and `model_columns` tells which
+columns the remaining fields read, so that only those are loaded.
+"""
+import hashlib
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(value):
+    return tuple(name for name in (
+        part.strip() for part in value.split(',')
+    ) if name)
+
+
+def parse_fieldset(request):
+    """
+    Read the fieldset parameters of a request
+    :param request: The request being served
+    :return: Dict with the requested `fields` and `expand` names, with
+    only the keys of the parameters present in the request
+    """
+    params = request.query_params
+    fieldset = {}
+    if FIELDS_PARAM in params:
+        fieldset['fields'] = _split(params[FIELDS_PARAM])
+    if EXPAND_PARAM in params:
+        fieldset['expand'] = _split(params[EXPAND_PARAM])
+    return fieldset
+
+
+def fieldset_key(fieldset):
+    """Return a short key identifying a fieldset, e.g. for caching"""
+    if not fieldset:
+        return ''
+    text = ';'.join(
+        f'{name}={",".join(sorted(set(values)))}'
+        for name, values in sorted(fieldset.items())
+    )
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def model_columns(model, fields):
+    """
+    Return the names of the model columns read by serializer fields
+    :param model: The model class of the serialized objects
+    :param fields: Dict of the serializer fields by name
+    :return: Set of concrete model field names
+    """
+    columns = set()
+    for name, field in fields.items():
+        source = name if field.source == '*' else field.source.split('.')[0]
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            continue
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+    return columns
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin applying the `fields` and `expand` of the context.
+    Only the outermost serializer is affected, nested ones are emitted in
+    full.
+    """
+    # Relations that can be nested, mapped to a nested serializer factory
+    expandable_fields = {}
+    # Relations nested when the request does not say otherwise
+    default_expand = ()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self._is_root()
+        expand = self.context.get('expand') if root else None
+        if expand is None:
+            expand = self.default_expand
+
+        unknown = set(expand) - set(self.expandable_fields)
+        if unknown:
+            raise ValidationError({EXPAND_PARAM: [
+                _('Cannot expand: %s.') % ', '.join(sorted(unknown))
+            ]})
+        for name in self.expandable_fields:
+            if name in expand and name in fields:
+                fields[name] = self.expandable_fields[name]()
+
+        requested = self.context.get('fields') if root else None
+        if requested is None:
+            return fields
+
+        unknown = set(requested) - set(fields)
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: [
+                _('Unknown fields: %s.') % ', '.join(sorted(unknown))
+            ]})
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in requested
+        )
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        return parent is None
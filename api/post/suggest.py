@@ -0,0 +1,263 @@
+"""
+Tag autocompletion from an in-process prefix index.
+
+The tags of a user are loaded once, with their number of posts, into a
+list sorted by case-folded name. A prefix is found with two bisections
+and the matches are ranked by usage, so a warm index answers without
+touching the database.
+
+The indexes of the most recently used MAX_USERS users are kept per
+process and changed in place when tags are created, renamed, deleted,
+or assigned to posts in this process, once the transaction commits.
+Changes the signals cannot describe, such as bulk writes, drop the
+index of the user instead. An index is reloaded after TIMEOUT seconds,
+which bounds how long changes made by other processes go unnoticed.
+
+The index of a user is loaded by one thread at a time, the others wait
+for it. A load overlapped by a change of the tags may have missed it,
+so its index answers the request that loaded it but is not kept.
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Tag
+
+DEFAULTS = {
+    # Users whose index is kept in each process
+    'MAX_USERS': 10000,
+    # Seconds an index is used before it is reloaded
+    'TIMEOUT': 300,
+    # Suggestions returned by default, and at most
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+}
+
+# Sorts after any character following a prefix
+_PREFIX_END = '\U0010ffff'
+# Prefixes matching so many tags that their ranking is memoized
+_SHORT_PREFIX = 2
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'TAG_SUGGESTIONS', {})}
+
+
+class TagIndex:
+    """The tags of a user, sorted by case-folded name"""
+
+    def __init__(self, tags):
+        """
+        :param tags: Iterable of (id, name, usage) tuples
+        """
+        self.loaded_at = time.monotonic()
+        self._names = {}
+        self._usage = {}
+        for tag_id, name, usage in tags:
+            self._names[tag_id] = name
+            self._usage[tag_id] = usage
+        self._keys = sorted(
+            (name.casefold(), tag_id) for tag_id, name in self._names.items()
+        )
+        # Rankings of the short prefixes, until the tags change
+        self._ranked = {}
+        self._lock = threading.Lock()
+
+    def add(self, tag_id, name):
+        """Add a tag, or rename it when it is already indexed"""
+        with self._lock:
+            self._remove(tag_id)
+            bisect.insort(self._keys, (name.casefold(), tag_id))
+            self._names[tag_id] = name
+            self._usage.setdefault(tag_id, 0)
+            self._ranked.clear()
+
+    def remove(self, tag_id):
+        with self._lock:
+            self._remove(tag_id)
+            self._usage.pop(tag_id, None)
+            self._ranked.clear()
+
+    def _remove(self, tag_id):
+        name = self._names.pop(tag_id, None)
+        if name is not None:
+            key = (name.casefold(), tag_id)
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def add_usage(self, tag_id, delta):
+        with self._lock:
+            if tag_id in self._usage:
+                self._usage[tag_id] = max(0, self._usage[tag_id] + delta)
+                self._ranked.clear()
+
+    def suggest(self, prefix, limit):
+        """
+        Return the most used tags whose name starts with a prefix
+        :param prefix: Start of the names, compared case-insensitively
+        :param limit: Maximum number of tags returned
+        :return: List of (id, name, usage) tuples, most used first
+        """
+        prefix = prefix.casefold()
+        with self._lock:
+            if len(prefix) >= _SHORT_PREFIX:
+                return self._rank(prefix, limit)
+            ranked = self._ranked.get((prefix, limit))
+            if ranked is None:
+                ranked = self._ranked[prefix, limit] = \
+                    self._rank(prefix, limit)
+            return ranked
+
+    def _rank(self, prefix, limit):
+        start = bisect.bisect_left(self._keys, (prefix,))
+        end = bisect.bisect_left(self._keys, (prefix + _PREFIX_END,), start)
+        top = heapq.nsmallest(
+            limit,
+            self._keys[start:end],
+            key=lambda key: (-self._usage[key[1]], key)
+        )
+        return [
+            (tag_id, self._names[tag_id], self._usage[tag_id])
+            for name, tag_id in top
+        ]
+
+
+class _Load:
+    """The load of the index of a user, shared by the threads needing it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Threads loading or waiting for the index
+        self.threads = 0
+        # Whether the tags changed since the load started
+        self.stale = False
+
+
+_indexes = OrderedDict()
+_loads = {}
+_indexes_lock = threading.Lock()
+
+
+def load_index(user_id):
+    """Read the tags of a user and their usage from the database"""
+    return TagIndex(Tag.objects.filter(user_id=user_id).annotate(
+        usage=Count('post')
+    ).values_list('id', 'name', 'usage').order_by())
+
+
+def get_index(user_id):
+    """
+    Return the index of a user, loading it when it is missing or old
+    :param user_id: Id of the user
+    :return: TagIndex
+    """
+    options = get_options()
+    with _indexes_lock:
+        index = _current_index(user_id, options)
+        if index is not None:
+            return index
+        load = _loads.setdefault(user_id, _Load())
+        load.threads += 1
+
+    try:
+        with load.lock:
+            with _indexes_lock:
+                # Loaded while this thread waited
+                index = _current_index(user_id, options)
+                if index is not None:
+                    return index
+                load.stale = False
+
+            index = load_index(user_id)
+            with _indexes_lock:
+                if not load.stale:
+                    _indexes[user_id] = index
+                    _indexes.move_to_end(user_id)
+                    while len(_indexes) > options['MAX_USERS']:
+                        _indexes.popitem(last=False)
+            return index
+    finally:
+        with _indexes_lock:
+            load.threads -= 1
+            if not load.threads:
+                del _loads[user_id]
+
+
+def _current_index(user_id, options):
+    """Return the index of a user unless missing or old, under the lock"""
+    index = _indexes.get(user_id)
+    if index is None or \
+            time.monotonic() - index.loaded_at >= options['TIMEOUT']:
+        return None
+    _indexes.move_to_end(user_id)
+    return index
+
+
+def _tags_changed(user_id):
+    """Drop the index being loaded for a user, under the lock"""
+    load = _loads.get(user_id)
+    if load is not None:
+        load.stale = True
+
+
+def _on_commit(user_id, change):
+    """Apply a change to the index of a user, if loaded, on commit"""
+    def apply():
+        with _indexes_lock:
+            index = _indexes.get(user_id)
+            _tags_changed(user_id)
+        if index is not None:
+            change(index)
+
+    transaction.on_commit(apply)
+
+
+def tag_saved(tag):
+    tag_id, name = tag.id, tag.name
+    _on_commit(tag.user_id, lambda index: index.add(tag_id, name))
+
+
+def tag_deleted(tag):
+    tag_id = tag.id
+    _on_commit(tag.user_id, lambda index: index.remove(tag_id))
+
+
+def usage_changed(user_id, tag_ids, delta):
+    """
+    Count posts gained or lost by tags
+    :param user_id: Owner of the tags
+    :param tag_ids: Ids of the tags
+    :param delta: Number of posts gained, negative when lost
+    :return: None
+    """
+    tag_ids = list(tag_ids)
+
+    def change(index):
+        for tag_id in tag_ids:
+            index.add_usage(tag_id, delta)
+
+    _on_commit(user_id, change)
+
+
+def forget_users(user_ids):
+    """Drop the indexes of users, reloaded when next used"""
+    user_ids = set(user_ids)
+
+    def forget():
+        with _indexes_lock:
+            for user_id in user_ids:
+                _indexes.pop(user_id, None)
+                _tags_changed(user_id)
+
+    forget()
+    transaction.on_commit(forget)
+
+
+def clear():
+    with _indexes_lock:
+        _indexes.clear()
@@ -0,0 +1,61 @@
+from django.test import TestCase, override_settings
+
+from core.models import Comment, Post, Tag
+from post.benchmark import SCENARIOS, ClientTransport, compare_results, \
+    percentile, run_benchmark, seed_blog
+
+
+class BenchmarkTests(TestCase):
+    """Test cases for the benchmark data generator and runner"""
+
+    def test_seed_blog(self):
+        """Test the generator creates the requested amount of rows"""
+        users = seed_blog(users=2, posts_per_user=3, tags_per_user=4,
+                          tags_per_post=2, comments_per_post=2)
+
+        self.assertEqual(len(users), 2)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(Tag.objects.count(), 8)
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertEqual(Post.tags.through.objects.count(), 12)
+
+    @override_settings(RATE_LIMITS={'ENABLED': False})
+    def test_run_benchmark(self):
+        """Test every scenario is measured without errors"""
+        seed_blog(users=2, posts_per_user=3, tags_per_user=4,
+                  tags_per_post=2, comments_per_post=2)
+
+        results = run_benchmark(ClientTransport(), requests=3, warmup=1)
+
+        self.assertEqual(
+            set(results['results']),
+            {scenario.name for scenario in SCENARIOS}
+        )
+        for name, measures in results['results'].items():
+            self.assertEqual(measures['errors'], 0, name)
+            self.assertEqual(measures['requests'], 3)
+            self.assertIsNotNone(measures['latency_ms']['p99'])
+            self.assertIsNotNone(measures['queries'])
+
+    def test_percentile(self):
+        """Test percentiles use the nearest rank"""
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+        self.assertIsNone(percentile([], 0.5))
+
+    def test_compare_results(self):
+        """Test slower latencies and more queries are regressions"""
+        def result(p95, queries):
+            return {'results': {'post-list': {
+                'throughput_rps': 100.0,
+                'latency_ms': {'p50': 1.0, 'p95': p95, 'p99': p95},
+                'queries': {'mean': queries, 'max': queries},
+            }}}
+
+        rows = compare_results(result(10.0, 2), result(15.0, 3), 0.1)
+
+        regressed = {row[1] for row in rows if row[-1]}
+        self.assertEqual(regressed, {'p95_ms', 'p99_ms', 'queries'})
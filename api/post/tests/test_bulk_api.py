@@ -0,0 +1,221 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag
+
+POSTS_BULK_URL = reverse('post:post-bulk')
+COMMENTS_BULK_URL = reverse('post:comment-bulk')
+TAGS_BULK_URL = reverse('post:tag-bulk')
+
+
+def detail_url(post_id):
+    """
+    Helper method to retrieve the API end-point to post content
+    :param post_id: The unique ID of the post
+    :return: An end-point to retrieve the post content.
+    """
+    return reverse('post:post-detail', args=[post_id])
+
+
+class BulkAPITests(TestCase):
+    """
+    Test cases for the bulk end-points of posts, comments and tags
+    """
+
+    def setUp(self):
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = Tag.objects.create(user=self.user, name='Python')
+        self.tag2 = Tag.objects.create(user=self.user, name='Django')
+
+    def _post_payload(self, count):
+        """
+        Helper method to build a list of new posts
+        :param count: Number of posts in the list
+        :return: List of post payloads
+        """
+        return [
+            {
+                'title': f'Blog Post {index}',
+                'content': 'Some content',
+                'tags': [self.tag1.id, self.tag2.id],
+            }
+            for index in range(count)
+        ]
+
+    def test_bulk_create_posts(self):
+        """Test creating many posts with their tags at once"""
+        res = self.client.post(
+            POSTS_BULK_URL,
+            self._post_payload(3),
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Post.objects.filter(user=self.user).count(), 3)
+        for item in res.data:
+            post = Post.objects.get(id=item['id'])
+            self.assertEqual(post.title, item['title'])
+            self.assertEqual(
+                set(post.tags.values_list('id', flat=True)),
+                {self.tag1.id, self.tag2.id}
+            )
+
+    def test_bulk_create_query_count_is_constant(self):
+        """Test that the number of queries does not grow with the items"""
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(
+                POSTS_BULK_URL,
+                self._post_payload(2),
+                format='json'
+            )
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(
+                POSTS_BULK_URL,
+                self._post_payload(40),
+                format='json'
+            )
+
+        self.assertEqual(len(small), len(large))
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """Test that invalid items are reported and nothing is created"""
+        payload = self._post_payload(3)
+        del payload[1]['title']
+        payload[2]['tags'] = [9999]
+
+        res = self.client.post(POSTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertIn('tags', res.data[2])
+        self.assertFalse(Post.objects.exists())
+
+    def test_bulk_update_posts(self):
+        """Test updating many posts and replacing their tags at once"""
+        post1 = Post.objects.create(user=self.user, title='Post 01')
+        post2 = Post.objects.create(user=self.user, title='Post 02')
+        post1.tags.add(self.tag1)
+        self.client.get(detail_url(post1.id))
+
+        payload = [
+            {'id': post1.id, 'title': 'Updated 01', 'tags': [self.tag2.id]},
+            {'id': post2.id, 'title': 'Updated 02'},
+        ]
+        res = self.client.patch(POSTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        post1.refresh_from_db()
+        post2.refresh_from_db()
+        self.assertEqual(post1.title, 'Updated 01')
+        self.assertEqual(post2.title, 'Updated 02')
+        self.assertEqual(list(post1.tags.all()), [self.tag2])
+
+        res = self.client.get(detail_url(post1.id))
+        self.assertEqual(res.data['title'], 'Updated 01')
+
+    def test_bulk_update_unknown_post(self):
+        """Test that posts of other users cannot be updated"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        post = Post.objects.create(user=other, title='Not mine')
+
+        res = self.client.patch(
+            POSTS_BULK_URL,
+            [{'id': post.id, 'title': 'Mine now'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        post.refresh_from_db()
+        self.assertEqual(post.title, 'Not mine')
+
+    def test_bulk_delete_posts(self):
+        """Test deleting many posts at once"""
+        post1 = Post.objects.create(user=self.user, title='Post 01')
+        post2 = Post.objects.create(user=self.user, title='Post 02')
+        post3 = Post.objects.create(user=self.user, title='Post 03')
+
+        res = self.client.delete(
+            POSTS_BULK_URL,
+            [post1.id, post2.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(list(Post.objects.all()), [post3])
+
+    def test_bulk_create_comments(self):
+        """Test creating many comments at once"""
+        post = Post.objects.create(user=self.user, title='Post 01')
+        payload = [
+            {'post': post.id, 'content': f'Comment {index}'}
+            for index in range(5)
+        ]
+
+        res = self.client.post(COMMENTS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(post.comments.count(), 5)
+        self.assertTrue(all(item['user'] == self.user.id
+                            for item in res.data))
+
+    def test_bulk_create_tags(self):
+        """Test creating many tags at once"""
+        payload = [{'name': 'Rust'}, {'name': 'Go'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            set(Tag.objects.filter(user=self.user)
+                .values_list('name', flat=True)),
+            {'Python', 'Django', 'Rust', 'Go'}
+        )
+
+    def test_bulk_delete_tags(self):
+        """Test deleting many tags at once, only of the user"""
+        other = get_user_model().objects.create_user('o@test.com', 'Test')
+        other_tag = Tag.objects.create(user=other, name='Python')
+        post = Post.objects.create(user=self.user, title='Post 01')
+        post.tags.add(self.tag1, self.tag2)
+
+        res = self.client.delete(
+            f'{TAGS_BULK_URL}?assigned_only=1',
+            [self.tag1.id, other_tag.id],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 1)
+        self.assertEqual(list(Tag.objects.order_by('id')),
+                         [self.tag2, other_tag])
+        self.assertEqual(list(post.tags.all()), [self.tag2])
+
+    def test_bulk_requires_list(self):
+        """Test that a single object is rejected"""
+        res = self.client.post(
+            POSTS_BULK_URL,
+            {'title': 'Post 01', 'content': 'Some content'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Post, Tag
+
+
+class ExplainQueriesCommandTests(TestCase):
+    """Test cases for the explain_queries management command"""
+
+    def test_explain_viewset_querysets(self):
+        """Test that a query plan is printed for every viewset queryset"""
+        user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        post = Post.objects.create(
+            user=user,
+            title='Blog Post 01',
+            content='Some content'
+        )
+        post.tags.add(Tag.objects.create(user=user, name='Python'))
+
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+
+        output = out.getvalue()
+        for label in ('PostViewSet.list', 'PostViewSet.list ?tags=',
+                      'PostViewSet.retrieve', 'CommentViewSet.list',
+                      'TagViewSet.list'):
+            self.assertIn(label, output)
+        self.assertIn('post_user_created_idx', output)
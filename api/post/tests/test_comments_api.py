@@ -101,7 +101,7 @@ class PrivatePostAPITests(TestCase):
         serializer = CommentSerializer(comments, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_comment_detail(self):
         """
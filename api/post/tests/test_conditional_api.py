@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Comment, Tag
+from post.checks import check_shared_caches
+
+POSTS_URL = reverse('post:post-list')
+COMMENTS_URL = reverse('post:comment-list')
+
+
+def detail_url(post_id):
+    """
+    Helper method to retrieve the API end-point to post content
+    :param post_id: The unique ID of the post
+    :return: An end-point to retrieve the post content.
+    """
+    return reverse('post:post-detail', args=[post_id])
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Test cases for the ETag / Last-Modified support of the post API
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            user=self.user,
+            title='Blog Post 01',
+            content='Some content'
+        )
+
+    def test_unchanged_list_not_modified(self):
+        """Test that a matching If-None-Match is answered with 304"""
+        res = self.client.get(POSTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                POSTS_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(res.content)
+
+    def test_new_post_changes_etag(self):
+        """Test that creating a post invalidates the previous ETag"""
+        etag = self.client.get(POSTS_URL)['ETag']
+        Post.objects.create(user=self.user, title='Blog Post 02')
+
+        res = self.client.get(POSTS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_etag_depends_on_query(self):
+        """Test that different pages and filters have different ETags"""
+        res1 = self.client.get(POSTS_URL)
+        res2 = self.client.get(POSTS_URL, {'page_size': 1})
+
+        self.assertNotEqual(res1['ETag'], res2['ETag'])
+
+    def test_comment_by_other_user_changes_etag(self):
+        """Test that a comment on a post changes its owner's ETag"""
+        url = detail_url(self.post.id)
+        etag = self.client.get(url)['ETag']
+
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        Comment.objects.create(user=other, post=self.post, content='Nice!')
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['comments']), 1)
+
+    def test_tagging_post_changes_etag(self):
+        """Test that tagging a post changes the ETag"""
+        url = detail_url(self.post.id)
+        etag = self.client.get(url)['ETag']
+
+        self.post.tags.add(Tag.objects.create(user=self.user, name='Python'))
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_if_modified_since(self):
+        """Test that If-Modified-Since is honoured without an ETag"""
+        res = self.client.get(COMMENTS_URL)
+
+        res = self.client.get(
+            COMMENTS_URL,
+            HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_missing_post_not_cached(self):
+        """Test that error responses do not get an ETag"""
+        res = self.client.get(detail_url(self.post.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+    @override_settings(SERVER_WORKERS=4)
+    def test_deploy_check_warns_of_process_caches(self):
+        """Test several workers keeping version stamps per process warn"""
+        warnings = check_shared_caches(None)
+
+        self.assertEqual([warning.id for warning in warnings],
+                         ['post.W001', 'post.W001'])
+        self.assertFalse(any(warning.is_serious() for warning in warnings))
+        self.assertIn('ETag version stamps', warnings[0].msg)
+
+        dummy = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with self.settings(CACHES={'default': dummy, 'posts': dummy}):
+            self.assertEqual(check_shared_caches(None), [])
+        with self.settings(SERVER_WORKERS=1):
+            self.assertEqual(check_shared_caches(None), [])
@@ -0,0 +1,194 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+from core.streaming import ASGIHandler
+from post.export import export_posts
+
+EXPORT_URL = reverse('post:post-export')
+
+
+def sample_post(user, **params):
+    """
+    Helper method to create a sample blog post
+    :param user: The owner of the post
+    :param params: Fields overriding the defaults
+    :return: The created post
+    """
+    defaults = {
+        'title': 'Blog Post',
+        'content': 'Some content',
+    }
+    defaults.update(params)
+    return Post.objects.create(user=user, **defaults)
+
+
+def streamed(response):
+    return b''.join(response.streaming_content)
+
+
+class PostExportTests(TestCase):
+    """
+    Test cases for the streaming export of the posts
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Python')
+        self.posts = [
+            sample_post(self.user, title=f'Blog Post {index:02}')
+            for index in range(5)
+        ]
+        self.posts[0].tags.add(self.tag)
+        self.comment = Comment.objects.create(
+            user=self.user,
+            post=self.posts[0],
+            content='Nice, "quoted"\nand multiline'
+        )
+
+    def test_export_ndjson(self):
+        """Test the posts of the user are streamed as lines of JSON"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        sample_post(other)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('posts.ndjson', res['Content-Disposition'])
+        records = [
+            json.loads(line) for line in streamed(res).splitlines()
+        ]
+        self.assertEqual(
+            [record['id'] for record in records],
+            [post.id for post in self.posts]
+        )
+        self.assertEqual(
+            records[0]['tags'],
+            [{'id': self.tag.id, 'name': 'Python'}]
+        )
+        self.assertEqual(records[0]['comments'][0]['content'],
+                         self.comment.content)
+        self.assertEqual(records[1]['comments'], [])
+
+    def test_export_csv(self):
+        """Test the posts are followed by their comments in the CSV"""
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(streamed(res).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['record'], 'post')
+        self.assertEqual(rows[0]['tags'], 'Python')
+        self.assertEqual(rows[1]['record'], 'comment')
+        self.assertEqual(rows[1]['post'], str(self.posts[0].id))
+        self.assertEqual(rows[1]['content'], self.comment.content)
+
+    def test_export_gzip(self):
+        """Test the export is compressed on the fly"""
+        res = self.client.get(EXPORT_URL, {'gzip': 1})
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertIn('posts.ndjson.gz', res['Content-Disposition'])
+        lines = gzip.decompress(streamed(res)).splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_export_invalid_format(self):
+        """Test an unknown output format is rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_queries_per_chunk(self):
+        """Test the queries depend on the number of chunks only"""
+        with self.assertNumQueries(1 + 2 * 3):
+            lines = b''.join(export_posts(
+                Post.objects.all(),
+                chunk_size=2
+            )).splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_export_command(self):
+        """Test the export command writes the posts of a user to a file"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.csv.gz')
+            call_command(
+                'export_posts',
+                '--user', self.user.email,
+                '--output-format', 'csv',
+                '--gzip',
+                '--output', path,
+                stderr=io.StringIO()
+            )
+            with gzip.open(path, 'rt') as export:
+                rows = list(csv.DictReader(export))
+        self.assertEqual(len(rows), 6)
+
+
+class PostExportASGITests(TransactionTestCase):
+    """Test cases for the export served by the ASGI handler"""
+
+    def _get(self, path, token):
+        """Send a GET request through the ASGI handler"""
+        async def request():
+            communicator = ApplicationCommunicator(ASGIHandler(), {
+                'type': 'http',
+                'method': 'GET',
+                'path': path,
+                'query_string': b'',
+                'headers': [
+                    (b'host', b'testserver'),
+                    (b'authorization', f'Token {token}'.encode()),
+                ],
+            })
+            await communicator.send_input({'type': 'http.request'})
+            start = await communicator.receive_output(5)
+            body = b''
+            while True:
+                message = await communicator.receive_output(5)
+                body += message.get('body', b'')
+                if not message.get('more_body'):
+                    return start, body
+
+        return async_to_sync(request)()
+
+    def test_export_streamed_under_asgi(self):
+        """Test the export is produced in a thread and awaited"""
+        user = get_user_model().objects.create_user('user@test.com', 'Test')
+        for index in range(3):
+            sample_post(user, title=f'Blog Post {index}')
+        token = Token.objects.create(user=user)
+
+        start, body = self._get(EXPORT_URL, token.key)
+
+        self.assertEqual(start['status'], status.HTTP_200_OK)
+        self.assertIn((b'Content-Type', b'application/x-ndjson'),
+                      start['headers'])
+        titles = [json.loads(line)['title'] for line in body.splitlines()]
+        self.assertEqual(titles, [f'Blog Post {index}' for index in range(3)])
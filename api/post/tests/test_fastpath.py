@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import viewsets
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+from post.fastpath import ValuesListMixin
+
+POSTS_URL = reverse('post:post-list')
+COMMENTS_URL = reverse('post:comment-list')
+TAGS_URL = reverse('post:tag-list')
+
+
+class FastListEquivalenceTests(TestCase):
+    """
+    Test cases checking the lists built from .values() rows are the same
+    as the lists built by the serializers
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Python', 'Django', 'Ünïcode')
+        ]
+        for index in range(7):
+            post = Post.objects.create(
+                user=self.user,
+                title=f'Post {index} django',
+                content='Content   with é',
+                link='https://example.com' if index % 2 else '',
+                image_variants={'thumbnail': {
+                    'width': 150, 'height': 100, 'webp': f'{index}.webp'
+                }} if index % 3 == 0 else {}
+            )
+            post.tags.set(tags[:index % 4])
+            for count in range(index % 3):
+                Comment.objects.create(
+                    user=other if count else self.user,
+                    post=post,
+                    content=f'Comment {count}'
+                )
+
+    def _both(self, url, params=None):
+        """
+        Helper method to fetch every page of a list with and without the
+        fast path
+        :param url: URL of the list end-point
+        :param params: Query parameters of the first page
+        :return: The pages of the serializer and of the fast path
+        """
+        pages = []
+        for fast in (False, True):
+            caches['posts'].clear()
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                res = self.client.get(url, {**(params or {}),
+                                            'page_size': 3})
+                results = [res.content]
+                while res.data['next']:
+                    res = self.client.get(res.data['next'])
+                    results.append(res.content)
+            pages.append(results)
+        return pages
+
+    def test_posts(self):
+        """Test the post lists are identical"""
+        slow, fast = self._both(POSTS_URL)
+        self.assertEqual(fast, slow)
+        self.assertEqual(len(slow), 3)
+
+    def test_slim_posts(self):
+        """Test the slim post lists are identical"""
+        slow, fast = self._both(POSTS_URL, {'slim': 1})
+        self.assertEqual(fast, slow)
+
+    def test_searched_posts(self):
+        """Test the post search results are identical"""
+        slow, fast = self._both(POSTS_URL, {'q': 'django'})
+        self.assertEqual(fast, slow)
+
+    def test_comments(self):
+        """Test the comment lists are identical"""
+        slow, fast = self._both(COMMENTS_URL)
+        self.assertEqual(fast, slow)
+
+    def test_tags(self):
+        """Test the tag lists are identical"""
+        slow, fast = self._both(TAGS_URL)
+        self.assertEqual(fast, slow)
+        slow, fast = self._both(TAGS_URL, {'assigned_only': 1})
+        self.assertEqual(fast, slow)
+
+    def test_views_must_represent_rows(self):
+        """Test a view without represent_values is rejected when defined"""
+        with self.assertRaisesMessage(TypeError, 'TagRowsViewSet must'):
+            class TagRowsViewSet(ValuesListMixin, viewsets.ModelViewSet):
+                queryset = Tag.objects.all()
@@ -0,0 +1,164 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FeedEntry, Follow, Post
+from post import feed
+from post.pagination import FeedPagination
+
+FEED_URL = reverse('post:feed-list')
+FOLLOWS_URL = reverse('post:follow-list')
+POSTS_URL = reverse('post:post-list')
+
+
+def follow_url(user_id):
+    """Return the end-point of the follow of a user"""
+    return reverse('post:follow-detail', args=[user_id])
+
+
+def sample_user(email):
+    return get_user_model().objects.create_user(email, 'Test123')
+
+
+@override_settings(
+    BACKGROUND_TASKS={'ALWAYS_EAGER': True},
+    FEED={'FANOUT_LIMIT': 2, 'BATCH_SIZE': 2, 'BACKFILL': 2}
+)
+class FeedTests(TestCase):
+    """Test cases for the feeds of the followed users"""
+
+    def setUp(self):
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = sample_user('user@test.com')
+        self.author = sample_user('author@test.com')
+        self.client.force_authenticate(self.user)
+
+    def _follow(self, user, followee):
+        with self.captureOnCommitCallbacks(execute=True):
+            return feed.follow(user, followee)
+
+    def _publish(self, user, title):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = client.post(POSTS_URL, {'title': title, 'content': 'Hi'})
+        return res.data['id']
+
+    def _feed_ids(self, **params):
+        res = self.client.get(FEED_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in res.data['results']]
+
+    def test_follow_and_unfollow(self):
+        """Test following a user through the API and unfollowing them"""
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(FOLLOWS_URL, {'followee': self.author.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['followee'], self.author.id)
+        res = self.client.post(FOLLOWS_URL, {'followee': self.user.id})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        post_id = self._publish(self.author, 'Followed')
+        self.assertEqual(self._feed_ids(), [post_id])
+
+        res = self.client.delete(follow_url(self.author.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self._feed_ids(), [])
+
+    def test_posts_fanned_out(self):
+        """Test new posts are written into the feeds of the followers"""
+        self._follow(self.user, self.author)
+        first = self._publish(self.author, 'First')
+        own = self._publish(self.user, 'Own')
+        second = self._publish(self.author, 'Second')
+        self._publish(sample_user('stranger@test.com'), 'Not followed')
+
+        res = self.client.get(FEED_URL)
+
+        self.assertEqual([post['id'] for post in res.data['results']],
+                         [second, own, first])
+        self.assertEqual(res.data['results'][0]['user'], self.author.id)
+        self.assertEqual(res.data['results'][0]['title'], 'Second')
+        self.assertEqual(FeedEntry.objects.filter(user=self.user).count(), 2)
+
+    def test_backfill_on_follow(self):
+        """Test the latest posts of a user show up once followed"""
+        ids = [self._publish(self.author, f'Post {n}') for n in range(3)]
+
+        self._follow(self.user, self.author)
+
+        self.assertEqual(self._feed_ids(), ids[:0:-1])
+
+    def test_large_followings_pulled(self):
+        """Test the posts of users with many followers are pulled"""
+        old = self._publish(self.author, 'Old')
+        self._follow(self.user, self.author)
+        for n in range(2):
+            self._follow(sample_user(f'fan{n}@test.com'), self.author)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.feed_pull)
+
+        new = self._publish(self.author, 'New')
+
+        self.assertFalse(FeedEntry.objects.filter(post_id=new).exists())
+        self.assertEqual(self._feed_ids(), [new, old])
+
+    def test_pagination(self):
+        """Test the merged sources are paged without gaps or repeats"""
+        self._follow(self.user, self.author)
+        ids = [
+            self._publish(user, f'Post {n}')
+            for n, user in enumerate([self.author, self.user] * 3)
+        ]
+
+        res = self.client.get(FEED_URL, {'page_size': 4})
+        first_page = [post['id'] for post in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second_page = [post['id'] for post in res.data['results']]
+
+        self.assertEqual(first_page + second_page, ids[::-1])
+        self.assertIsNone(res.data['next'])
+        res = self.client.get(res.data['previous'])
+        self.assertEqual([post['id'] for post in res.data['results']],
+                         first_page)
+
+    def test_deleted_posts_leave_feeds(self):
+        """Test a deleted post is removed from the feeds"""
+        self._follow(self.user, self.author)
+        post_id = self._publish(self.author, 'Deleted')
+
+        Post.objects.filter(id=post_id).delete()
+
+        self.assertEqual(self._feed_ids(), [])
+
+    def test_post_deleted_while_serving(self):
+        """Test a post deleted after its feed row was read is skipped"""
+        self._follow(self.user, self.author)
+        kept = self._publish(self.author, 'Kept')
+        deleted = self._publish(self.author, 'Deleted')
+        paginate = FeedPagination.paginate_querysets
+
+        def paginate_then_delete(*args, **kwargs):
+            rows = paginate(*args, **kwargs)
+            Post.objects.filter(id=deleted).delete()
+            return rows
+
+        with patch.object(FeedPagination, 'paginate_querysets',
+                          paginate_then_delete):
+            self.assertEqual(self._feed_ids(), [kept])
+
+    def test_fan_out_counts_offered_entries(self):
+        """Test entries already in the feeds are skipped and counted"""
+        self._follow(self.user, self.author)
+        post_id = self._publish(self.author, 'Post')
+
+        self.assertEqual(feed.fan_out_posts([post_id]), 1)
+        self.assertEqual(FeedEntry.objects.filter(post_id=post_id).count(), 1)
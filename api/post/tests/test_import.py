@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.models import Comment, Post, Tag
+from post.export import export_posts
+
+
+class ImportBlogCommandTests(TestCase):
+    """Test cases for the import_blog management command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _write(self, lines, name='posts.ndjson'):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as output:
+            output.writelines(f'{line}\n' for line in lines)
+        return path
+
+    def _import(self, path, *args):
+        call_command('import_blog', path, *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_import_posts(self):
+        """Test posts are imported with their tags, comments and dates"""
+        existing = Tag.objects.create(user=self.user, name='python')
+        path = self._write([
+            json.dumps({
+                'title': 'First',
+                'content': 'Some content',
+                'created_on': '2020-01-02T03:04:05Z',
+                'tags': ['python', 'django', 'python'],
+                'comments': [
+                    {'content': 'Mine'},
+                    {'content': 'Theirs', 'user': 'other@test.com',
+                     'created_on': '2020-01-03T00:00:00Z'},
+                ],
+            }),
+            '',
+            json.dumps({'title': 'Second', 'user': 'other@test.com',
+                        'tags': [{'id': 1, 'name': 'python'}]}),
+        ])
+
+        self._import(path, '--user', self.user.email, '--chunk-size', '2')
+
+        first = Post.objects.get(title='First')
+        self.assertEqual(first.user, self.user)
+        self.assertEqual(first.created_on.year, 2020)
+        self.assertEqual(
+            sorted(first.tags.values_list('name', flat=True)),
+            ['django', 'python']
+        )
+        self.assertIn(existing, first.tags.all())
+        self.assertEqual((first.tag_count, first.comment_count), (2, 2))
+        theirs = Comment.objects.get(content='Theirs')
+        self.assertEqual(theirs.user, self.other)
+        self.assertEqual(theirs.created_on.day, 3)
+        self.assertEqual(Comment.objects.get(content='Mine').user, self.user)
+
+        second = Post.objects.get(title='Second')
+        self.assertEqual(second.user, self.other)
+        self.assertNotEqual(second.tags.get().id, existing.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_import_export_round_trip(self):
+        """Test the output of the export can be imported"""
+        post = Post.objects.create(user=self.user, title='Exported')
+        post.tags.add(Tag.objects.create(user=self.user, name='python'))
+        Comment.objects.create(user=self.other, post=post, content='Hi')
+        path = os.path.join(self.directory.name, 'posts.ndjson.gz')
+        with open(path, 'wb') as output:
+            output.writelines(export_posts(Post.objects.all(), compress=True))
+
+        self._import(path, '--user', self.other.email)
+
+        imported = Post.objects.exclude(id=post.id).get()
+        self.assertEqual(imported.user, self.other)
+        self.assertEqual(imported.title, 'Exported')
+        self.assertEqual(imported.created_on, post.created_on)
+        self.assertEqual(imported.comments.get().user, self.other)
+        self.assertEqual(imported.tags.get().user, self.other)
+
+    def test_resume_from_checkpoint(self):
+        """Test an import stopped by an invalid line resumes after a fix"""
+        lines = [json.dumps({'title': f'Post {index}'}) for index in range(5)]
+        path = self._write(lines[:3] + ['{"title": ""}'] + lines[4:])
+        checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+        args = ('--user', self.user.email, '--chunk-size', '2',
+                '--checkpoint', checkpoint)
+
+        with self.assertRaisesMessage(CommandError, 'Line 4'):
+            self._import(path, *args)
+        self.assertEqual(Post.objects.count(), 2)
+
+        self._write(lines)
+        self._import(path, *args)
+
+        self.assertEqual(
+            sorted(Post.objects.values_list('title', flat=True)),
+            [f'Post {index}' for index in range(5)]
+        )
+
+    def test_import_without_owner(self):
+        """Test posts without a user are rejected without --user"""
+        path = self._write([json.dumps({'title': 'Orphan'})])
+
+        with self.assertRaises(CommandError):
+            self._import(path)
+        self.assertFalse(Post.objects.exists())
+
+    def test_invalid_values_name_their_line(self):
+        """Test values the columns cannot store are rejected by line"""
+        valid = json.dumps({'title': 'Valid'})
+        for record, message in (
+            ({'title': 'T' * 256}, 'Invalid title'),
+            ({'title': 'Post', 'content': ['Text']},
+             '"content" must be a string'),
+            ({'title': 'Post', 'link': 'Nul\x00'},
+             '"link" contains a null character'),
+            ({'title': 'Post', 'tags': ['t' * 256]}, 'Invalid tag'),
+            ({'title': 'Post', 'comments': [{'content': 'C' * 5001}]},
+             'Invalid comment content'),
+            ({'title': 'Post', 'comments': ['Text']}, 'A comment must be'),
+            ({'title': 'Post', 'user': ['user@test.com']}, 'Invalid user'),
+            ({'title': 'Post', 'created_on': '2020-13-45T00:00:00'},
+             'Invalid date'),
+        ):
+            with self.subTest(message):
+                path = self._write([valid, json.dumps(record)])
+
+                with self.assertRaisesMessage(CommandError,
+                                              f'Line 2: {message}'):
+                    self._import(path, '--user', self.user.email)
+                self.assertFalse(Post.objects.exists())
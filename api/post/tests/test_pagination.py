@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag
+
+POSTS_URL = reverse('post:post-list')
+TAGS_URL = reverse('post:tag-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Test cases for the cursor pagination of the list end-points
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, params):
+        """
+        Helper method to follow the next links until the last page
+        :param url: List end-point to paginate through
+        :param params: Query parameters for the first page
+        :return: List of the ids returned, in order
+        """
+        ids = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in res.data['results'])
+            if not res.data['next']:
+                return ids
+            res = self.client.get(res.data['next'])
+
+    def test_posts_paginated_with_stable_order_on_ties(self):
+        """
+        Test that every post is returned exactly once, newest first,
+        even when several posts share the same creation time
+        """
+        for index in range(7):
+            Post.objects.create(
+                user=self.user,
+                title=f'Blog Post {index}',
+                content='Some content'
+            )
+        Post.objects.update(created_on=timezone.now())
+
+        ids = self._walk(POSTS_URL, {'page_size': 3})
+
+        expected = list(
+            Post.objects.order_by('-created_on', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        """Test that the previous link returns the page before"""
+        for index in range(5):
+            Post.objects.create(
+                user=self.user,
+                title=f'Blog Post {index}',
+                content='Some content'
+            )
+
+        first = self.client.get(POSTS_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        previous = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_tags_paginated_by_name(self):
+        """Test that tags are paginated in descending name order"""
+        for name in ('Django', 'Python', 'Docker', 'Flask', 'Rust'):
+            Tag.objects.create(user=self.user, name=name)
+
+        ids = self._walk(TAGS_URL, {'page_size': 2})
+
+        expected = list(
+            Tag.objects.order_by('-name', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        res = self.client.get(POSTS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
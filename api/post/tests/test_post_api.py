@@ -9,7 +9,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Post, Tag
+from core.models import Post, Tag, Comment
 
 from post.serializers import PostSerializer, PostDetailSerializer
 
@@ -104,11 +104,11 @@ class PrivatePostAPITests(TestCase):
 
         res = self.client.get(POSTS_URL)
 
-        posts = Post.objects.all().order_by('id')
+        posts = Post.objects.all().order_by('-created_on', '-id')
         serializer = PostSerializer(posts, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_post_detail(self):
         """
@@ -162,6 +162,30 @@ class PrivatePostAPITests(TestCase):
         self.assertIn(tag1, tags)
         self.assertIn(tag2, tags)
 
+    def test_create_post_ignores_comments(self):
+        """
+        Test the comments of other posts cannot be moved to a new post
+        """
+        other = get_user_model().objects.create_user('o@test.com', 'Test')
+        comment = Comment.objects.create(
+            user=other,
+            post=sample_post(user=other),
+            content='Comment'
+        )
+        payload = {
+            'title': 'Blog post 01',
+            'content': 'Content for blog post 01',
+            'tags': [],
+            'comments': [comment.id]
+        }
+
+        res = self.client.post(POSTS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['comments'], [])
+        comment.refresh_from_db()
+        self.assertNotEqual(comment.post_id, res.data['id'])
+
     def test_partial_update_post(self):
         """
         Test updating post with PATCH
@@ -279,6 +303,107 @@ class TestPostFilteringAPI(TestCase):
         serializer2 = PostSerializer(post2)
         serializer3 = PostSerializer(post3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_posts_by_tags_match(self):
+        """Test posts with several of the tags are returned once"""
+        tag1 = sample_tag(user=self.user, name='Technology')
+        tag2 = sample_tag(user=self.user, name='Frameworks')
+        both = sample_post(user=self.user, title='Both')
+        both.tags.add(tag1, tag2)
+        one = sample_post(user=self.user, title='One')
+        one.tags.add(tag1)
+        sample_post(user=self.user, title='None')
+        tags = f'{tag1.id},{tag2.id}'
+
+        any_res = self.client.get(POSTS_URL, {'tags': tags})
+        all_res = self.client.get(POSTS_URL,
+                                  {'tags': tags, 'tags_match': 'all'})
+
+        self.assertEqual([post['id'] for post in any_res.data['results']],
+                         [one.id, both.id])
+        self.assertEqual([post['id'] for post in all_res.data['results']],
+                         [both.id])
+
+    def test_filter_posts_invalid(self):
+        """Test malformed filters are rejected"""
+        res = self.client.get(POSTS_URL, {'tags': '1,x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+        res = self.client.get(POSTS_URL, {'tags': '1', 'tags_match': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PostQueryCountTests(TestCase):
+    """
+    Test cases to ensure the post API does not issue
+    additional queries for every post, tag or comment.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_posts(self, count, tags_per_post, comments_per_post):
+        """
+        Helper method to create posts along with tags and comments
+        :param count: Number of posts to create
+        :param tags_per_post: Number of tags to assign to every post
+        :param comments_per_post: Number of comments to add to every post
+        :return: List of the created posts
+        """
+        posts = []
+        for index in range(count):
+            post = sample_post(user=self.user, title=f'Blog Post {index}')
+            for tag_index in range(tags_per_post):
+                post.tags.add(
+                    sample_tag(user=self.user,
+                               name=f'Tag {post.id}-{tag_index}')
+                )
+            for comment_index in range(comments_per_post):
+                Comment.objects.create(
+                    user=self.user,
+                    post=post,
+                    content=f'Comment {comment_index}'
+                )
+            posts.append(post)
+        return posts
+
+    def test_list_posts_query_count_is_constant(self):
+        """
+        Test that listing posts takes the same number of queries
+        regardless of the number of posts, tags and comments
+        """
+        self._create_posts(1, 1, 1)
+        with self.assertNumQueries(3):
+            self.client.get(POSTS_URL)
+
+        self._create_posts(10, 3, 4)
+        with self.assertNumQueries(3):
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(len(res.data['results']), 11)
+
+    def test_retrieve_post_query_count_is_constant(self):
+        """
+        Test that the post detail takes the same number of queries
+        regardless of the number of tags and comments
+        """
+        small, large = self._create_posts(1, 1, 1) + \
+            self._create_posts(1, 5, 10)
+
+        with self.assertNumQueries(3):
+            self.client.get(detail_url(small.id))
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(large.id))
+
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['comments']), 10)
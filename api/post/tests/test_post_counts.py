@@ -0,0 +1,185 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+
+POSTS_URL = reverse('post:post-list')
+POSTS_BULK_URL = reverse('post:post-bulk')
+COMMENTS_BULK_URL = reverse('post:comment-bulk')
+
+
+def sample_post(user, **params):
+    """
+    Helper method to create a sample blog post
+    :param user: The owner of the post
+    :param params: Fields overriding the defaults
+    :return: The created post
+    """
+    defaults = {
+        'title': 'Blog Post',
+        'content': 'Some content',
+    }
+    defaults.update(params)
+    return Post.objects.create(user=user, **defaults)
+
+
+class PostCountsTests(TestCase):
+    """
+    Test cases for the comment and tag counts stored on the posts
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.post = sample_post(self.user)
+        self.tag1 = Tag.objects.create(user=self.user, name='Python')
+        self.tag2 = Tag.objects.create(user=self.user, name='Django')
+
+    def _counts(self, post=None):
+        post = Post.objects.get(id=(post or self.post).id)
+        return post.comment_count, post.tag_count
+
+    def test_comment_counts(self):
+        """Test comments are counted when created, moved and deleted"""
+        other = sample_post(self.user)
+        comment = Comment.objects.create(
+            user=self.user,
+            post=self.post,
+            content='First'
+        )
+        Comment.objects.create(user=self.user, post=self.post, content='2nd')
+        self.assertEqual(self._counts(), (2, 0))
+
+        comment.post = other
+        comment.save()
+        self.assertEqual(self._counts(), (1, 0))
+        self.assertEqual(self._counts(other), (1, 0))
+
+        comment.delete()
+        self.assertEqual(self._counts(other), (0, 0))
+
+    def test_tag_counts(self):
+        """Test tags are counted on every kind of m2m change"""
+        self.post.tags.add(self.tag1, self.tag2)
+        self.post.tags.add(self.tag1)
+        self.assertEqual(self._counts(), (0, 2))
+        self.assertEqual(self.post.tag_count, 2)
+
+        self.post.tags.remove(self.tag1)
+        self.assertEqual(self._counts(), (0, 1))
+
+        self.tag1.post_set.add(self.post)
+        self.assertEqual(self._counts(), (0, 2))
+
+        self.tag2.post_set.clear()
+        self.assertEqual(self._counts(), (0, 1))
+
+        self.tag1.delete()
+        self.assertEqual(self._counts(), (0, 0))
+
+    def test_save_keeps_counts(self):
+        """Test saving a post loaded earlier does not reset its counts"""
+        post = Post.objects.get(id=self.post.id)
+        Comment.objects.create(user=self.user, post=self.post, content='Hi')
+
+        post.title = 'New title'
+        post.save()
+
+        self.assertEqual(self._counts(), (1, 0))
+
+    def test_save_update_fields_without_counts(self):
+        """Test the fields to save are kept, minus the counts"""
+        post = Post.objects.get(id=self.post.id)
+        post.title = 'New title'
+        post.content = 'Not saved'
+        post.comment_count = 5
+
+        post.save(update_fields=['title', 'comment_count'])
+
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.content, post.comment_count),
+                         ('New title', 'Some content', 0))
+
+    def test_save_deferred_post(self):
+        """Test saving a partly loaded post writes the loaded fields"""
+        post = Post.objects.only('title').get(id=self.post.id)
+        post.title = 'New title'
+
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+
+        self.assertFalse(any(
+            '"content"' in query['sql'] for query in queries.captured_queries
+        ))
+
+        post.refresh_from_db()
+        self.assertEqual((post.title, post.content),
+                         ('New title', 'Some content'))
+
+    def test_bulk_requests_update_counts(self):
+        """Test the bulk end-points keep the counts right"""
+        res = self.client.post(POSTS_BULK_URL, [
+            {'title': 'Bulk', 'content': 'Text',
+             'tags': [self.tag1.id, self.tag2.id]},
+        ], format='json')
+        self.assertEqual(res.data[0]['tag_count'], 2)
+
+        self.client.post(COMMENTS_BULK_URL, [
+            {'post': self.post.id, 'content': 'One'},
+            {'post': self.post.id, 'content': 'Two'},
+        ], format='json')
+
+        self.assertEqual(self._counts(), (2, 0))
+
+    def test_create_post_returns_counts(self):
+        """Test a created post is returned with its tag count"""
+        res = self.client.post(POSTS_URL, {
+            'title': 'New post',
+            'content': 'Text',
+            'tags': [self.tag1.id, self.tag2.id],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['tag_count'], 2)
+        self.assertEqual(res.data['comment_count'], 0)
+
+    def test_slim_list(self):
+        """Test the slim list has the counts instead of the id lists"""
+        self.post.tags.add(self.tag1)
+        Comment.objects.create(user=self.user, post=self.post, content='Hi')
+
+        res = self.client.get(POSTS_URL, {'slim': 1})
+
+        item = res.data['results'][0]
+        self.assertNotIn('tags', item)
+        self.assertNotIn('comments', item)
+        self.assertEqual(item['comment_count'], 1)
+        self.assertEqual(item['tag_count'], 1)
+
+    def test_repair_command(self):
+        """Test the repair command fixes drifted counts only"""
+        self.post.tags.add(self.tag1)
+        Post.objects.filter(id=self.post.id).update(
+            comment_count=5,
+            tag_count=0
+        )
+        sample_post(self.user)
+
+        out = StringIO()
+        call_command('repair_post_counts', stdout=out)
+
+        self.assertIn('Repaired the counts of 1 posts', out.getvalue())
+        self.assertEqual(self._counts(), (0, 1))
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post
+from post.images import process_post_image
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_upload_url(post_id):
+    """
+    Helper method to retrieve the API end-point to upload the image.
+    :param post_id: The unique ID of the post we want to add image to.
+    :return: An end-point to which we can POST an image
+    """
+    return reverse('post:post-upload-image', args=[post_id])
+
+
+def detail_url(post_id):
+    """
+    Helper method to retrieve the API end-point to post content
+    :param post_id: The unique ID of the post
+    :return: An end-point to retrieve the post content.
+    """
+    return reverse('post:post-detail', args=[post_id])
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    BACKGROUND_TASKS={'ALWAYS_EAGER': True},
+    POST_IMAGE_VARIANTS={
+        'SIZES': {'thumbnail': 50, 'small': 200},
+        'FORMATS': {'webp': 80, 'jpeg': 85},
+    }
+)
+class PostImageVariantTests(TestCase):
+    """
+    Test cases for the resized variants of uploaded post images
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            user=self.user,
+            title='Blog Post 01',
+            content='Some content'
+        )
+
+    def _upload(self, size=(400, 300)):
+        """
+        Helper method to upload an image and run the background task
+        :param size: Width and height of the uploaded image
+        :return: The response of the upload
+        """
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    image_upload_url(self.post.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+    def test_upload_generates_variants(self):
+        """Test that every configured size and format is generated"""
+        res = self._upload()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.post.refresh_from_db()
+        variants = self.post.image_variants
+        self.assertEqual(set(variants), {'thumbnail', 'small'})
+        self.assertEqual(variants['thumbnail']['width'], 50)
+        self.assertEqual(variants['small']['height'], 150)
+        for variant in variants.values():
+            for fmt in ('webp', 'jpeg'):
+                self.assertTrue(default_storage.exists(variant[fmt]))
+
+    def test_variant_urls_in_post_detail(self):
+        """Test that the post detail exposes the variant URLs"""
+        self._upload()
+
+        res = self.client.get(detail_url(self.post.id))
+
+        thumbnail = res.data['image_variants']['thumbnail']
+        self.assertTrue(thumbnail['webp'].startswith('/media/'))
+        self.assertTrue(thumbnail['webp'].endswith('.webp'))
+
+    def test_replacing_image_deletes_old_variants(self):
+        """Test that the variants of a replaced image are deleted"""
+        self._upload()
+        self.post.refresh_from_db()
+        old_path = self.post.image_variants['thumbnail']['jpeg']
+
+        self._upload(size=(100, 100))
+
+        self.assertFalse(default_storage.exists(old_path))
+
+    def test_outdated_task_is_discarded(self):
+        """Test that a task for a replaced image stores nothing"""
+        self._upload()
+        self.post.refresh_from_db()
+        old_image = self.post.image.name
+        self._upload()
+
+        process_post_image(self.post.id, old_image)
+
+        self.post.refresh_from_db()
+        for variant in self.post.image_variants.values():
+            self.assertIn(
+                os.path.splitext(os.path.basename(self.post.image.name))[0],
+                variant['jpeg']
+            )
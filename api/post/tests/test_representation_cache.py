@@ -0,0 +1,173 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Comment, Tag
+from post.representations import RepresentationCacheMixin, get_versions
+from post.signals import posts_changed
+
+POSTS_URL = reverse('post:post-list')
+
+
+def detail_url(post_id):
+    """
+    Helper method to retrieve the API end-point to post content
+    :param post_id: The unique ID of the post
+    :return: An end-point to retrieve the post content.
+    """
+    return reverse('post:post-detail', args=[post_id])
+
+
+class PostRepresentationCacheTests(TestCase):
+    """
+    Test cases for the cache of serialized posts
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Python')
+        self.post = Post.objects.create(
+            user=self.user,
+            title='Blog Post 01',
+            content='Some content'
+        )
+        self.post.tags.add(self.tag)
+
+    def test_cached_post_retrieved_without_queries(self):
+        """Test that a cached post is served without any query"""
+        url = detail_url(self.post.id)
+        res1 = self.client.get(url)
+
+        with self.assertNumQueries(0):
+            res2 = self.client.get(url)
+
+        self.assertEqual(res2.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.data, res2.data)
+
+    def test_cached_posts_listed_without_prefetch(self):
+        """Test that listing cached posts skips the prefetch queries"""
+        self.client.get(POSTS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(POSTS_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'], [self.tag.id])
+
+    def test_cached_post_hidden_from_other_users(self):
+        """Test that a cached post is not served to other users"""
+        self.client.get(detail_url(self.post.id))
+
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(detail_url(self.post.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_new_comment_invalidates_post(self):
+        """Test that adding a comment refreshes the cached post"""
+        url = detail_url(self.post.id)
+        self.client.get(url)
+
+        Comment.objects.create(
+            user=self.user,
+            post=self.post,
+            content='A comment'
+        )
+        res = self.client.get(url)
+
+        self.assertEqual(len(res.data['comments']), 1)
+
+    def test_moved_comment_invalidates_previous_post(self):
+        """Test that moving a comment refreshes both posts"""
+        comment = Comment.objects.create(
+            user=self.user,
+            post=self.post,
+            content='A comment'
+        )
+        url = detail_url(self.post.id)
+        self.client.get(url)
+
+        comment.post = Post.objects.create(user=self.user, title='Post 02')
+        comment.save()
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['comments'], [])
+
+    def test_renamed_tag_invalidates_post(self):
+        """Test that renaming a tag refreshes the posts using it"""
+        url = detail_url(self.post.id)
+        self.client.get(url)
+
+        self.tag.name = 'Django'
+        self.tag.save()
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['tags'][0]['name'], 'Django')
+
+    def test_deleted_tag_invalidates_post(self):
+        """Test that deleting a tag refreshes the posts using it"""
+        url = detail_url(self.post.id)
+        self.client.get(url)
+
+        self.tag.delete()
+        res = self.client.get(url)
+
+        self.assertEqual(res.data['tags'], [])
+
+    def test_change_while_serving_not_cached(self):
+        """Test a post changed after its row was read is not cached stale"""
+        represent = RepresentationCacheMixin.cached_representations
+
+        def change_then_represent(view, *args):
+            title = f'Changed {len(changes)}'
+            Post.objects.filter(pk=self.post.id).update(title=title)
+            posts_changed([self.post.id])
+            changes.append(title)
+            return represent(view, *args)
+
+        for url in (detail_url(self.post.id), POSTS_URL):
+            changes = []
+            with mock.patch.object(RepresentationCacheMixin,
+                                   'cached_representations',
+                                   change_then_represent):
+                self.client.get(url)
+
+            res = self.client.get(detail_url(self.post.id))
+
+            self.assertEqual(res.data['title'], changes[-1])
+
+    def test_versions_ignore_the_wall_clock(self):
+        """Test a post changed by a process with a fast clock is cached"""
+        with mock.patch('post.representations.time.time',
+                        return_value=time.time() + 3600):
+            posts_changed([self.post.id])
+        self.client.get(POSTS_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(POSTS_URL)
+
+    def test_versions_increase(self):
+        """Test every change gives a post a greater version"""
+        versions = []
+        for _ in range(3):
+            posts_changed([self.post.id])
+            versions.append(get_versions([self.post.id])[self.post.id])
+
+        self.assertEqual(versions, sorted(set(versions)))
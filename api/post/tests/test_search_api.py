@@ -0,0 +1,142 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post
+
+POSTS_URL = reverse('post:post-list')
+POSTS_BULK_URL = reverse('post:post-bulk')
+COMMENTS_URL = reverse('post:comment-list')
+
+
+def sample_post(user, **params):
+    """
+    Helper method to create a sample blog post
+    :param user: The owner of the post
+    :param params: Fields overriding the defaults
+    :return: The created post
+    """
+    defaults = {
+        'title': 'Blog Post',
+        'content': 'Some content',
+    }
+    defaults.update(params)
+    return Post.objects.create(user=user, **defaults)
+
+
+class SearchAPITests(TestCase):
+    """
+    Test cases for the full-text search of posts and comments
+    """
+
+    def setUp(self):
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _search(self, url, text, **params):
+        res = self.client.get(url, {'q': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def _ids(self, res):
+        return [item['id'] for item in res.data['results']]
+
+    def test_search_posts_by_relevance(self):
+        """Test the posts matching the most are listed first"""
+        weak = sample_post(self.user, title='Cooking',
+                           content='A word about django')
+        strong = sample_post(self.user, title='Django',
+                             content='Django, django and more django')
+        sample_post(self.user, title='Flask', content='Nothing related')
+
+        res = self._search(POSTS_URL, 'django')
+
+        self.assertEqual(self._ids(res), [strong.id, weak.id])
+
+    def test_search_every_term_and_prefix(self):
+        """Test all the terms must match, the last one as a prefix"""
+        match = sample_post(self.user, title='Django testing',
+                            content='Writing tests')
+        sample_post(self.user, title='Django', content='Views')
+
+        res = self._search(POSTS_URL, 'django test')
+
+        self.assertEqual(self._ids(res), [match.id])
+
+    def test_search_without_terms(self):
+        """Test a query without words matches nothing"""
+        sample_post(self.user)
+
+        res = self._search(POSTS_URL, '"*')
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_own_posts_only(self):
+        """Test the posts of other users are not searched"""
+        other = get_user_model().objects.create_user(
+            'other@test.com',
+            'Test123'
+        )
+        sample_post(other, title='Django')
+
+        res = self._search(POSTS_URL, 'django')
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_index_follows_changes(self):
+        """Test updated, deleted and bulk created posts are searchable"""
+        post = sample_post(self.user, title='Old title')
+        post.title = 'New title'
+        post.save()
+        deleted = sample_post(self.user, title='New post')
+        deleted.delete()
+        self.client.post(
+            POSTS_BULK_URL,
+            [{'title': 'Newest', 'content': 'Bulk', 'tags': []}],
+            format='json'
+        )
+
+        res = self._search(POSTS_URL, 'new')
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIn(post.id, self._ids(res))
+        self.assertEqual(self._search(POSTS_URL, 'old').data['results'], [])
+
+    def test_search_results_pages(self):
+        """Test the search results are paginated without duplicates"""
+        posts = [
+            sample_post(self.user, title=f'Django {index}')
+            for index in range(5)
+        ]
+
+        ids = []
+        res = self._search(POSTS_URL, 'django', page_size=2)
+        ids += self._ids(res)
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += self._ids(res)
+
+        self.assertCountEqual(ids, [post.id for post in posts])
+
+    def test_search_comments(self):
+        """Test searching the comments of the user"""
+        post = sample_post(self.user)
+        match = Comment.objects.create(
+            user=self.user,
+            post=post,
+            content='Great django article'
+        )
+        Comment.objects.create(user=self.user, post=post, content='Thanks')
+
+        res = self._search(COMMENTS_URL, 'article')
+
+        self.assertEqual(self._ids(res), [match.id])
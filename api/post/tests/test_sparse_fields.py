@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Comment, Post, Tag
+
+POSTS_URL = reverse('post:post-list')
+
+
+def detail_url(post_id):
+    """
+    Helper method to retrieve the API end-point to post content
+    :param post_id: The unique ID of the post
+    :return: An end-point to retrieve the post content.
+    """
+    return reverse('post:post-detail', args=[post_id])
+
+
+class SparseFieldsetTests(TestCase):
+    """
+    Test cases for the ?fields= and ?expand= parameters of the posts
+    """
+
+    def setUp(self):
+        caches['posts'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            user=self.user,
+            title='Blog Post',
+            content='Some content'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Python')
+        self.post.tags.add(self.tag)
+        self.comment = Comment.objects.create(
+            user=self.user,
+            post=self.post,
+            content='Nice'
+        )
+
+    def test_list_selected_fields(self):
+        """Test only the requested fields are listed and loaded"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(POSTS_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.post.id, 'title': 'Blog Post'}]
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"content"', queries[0]['sql'])
+
+    def test_unknown_field(self):
+        """Test asking for a field that does not exist is an error"""
+        res = self.client.get(POSTS_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_expand_tags(self):
+        """Test tags can be nested in the list"""
+        res = self.client.get(POSTS_URL, {
+            'fields': 'id,tags',
+            'expand': 'tags',
+        })
+
+        self.assertEqual(
+            res.data['results'][0]['tags'],
+            [{'id': self.tag.id, 'name': 'Python'}]
+        )
+
+    def test_detail_expanded_by_default(self):
+        """Test the detail nests its relations unless told otherwise"""
+        res = self.client.get(detail_url(self.post.id))
+        self.assertEqual(res.data['comments'][0]['content'], 'Nice')
+
+        res = self.client.get(detail_url(self.post.id), {'expand': ''})
+        self.assertEqual(res.data['comments'], [self.comment.id])
+        self.assertEqual(res.data['tags'], [self.tag.id])
+
+    def test_fieldsets_cached_separately(self):
+        """Test cached representations do not leak between fieldsets"""
+        self.client.get(POSTS_URL)
+
+        res = self.client.get(POSTS_URL, {'fields': 'id'})
+
+        self.assertEqual(res.data['results'], [{'id': self.post.id}])
+        res = self.client.get(POSTS_URL)
+        self.assertIn('content', res.data['results'][0])
@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag
+from core.tags import normalize_tag_name
+from post.importer import BlogImporter
+
+TAGS_URL = reverse('post:tag-list')
+TAGS_BULK_URL = reverse('post:tag-bulk')
+
+
+class TagNormalizationTests(TestCase):
+    """Test cases for the uniqueness of the normalized tag names"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Machine Learning')
+
+    def test_normalize_tag_name(self):
+        """Test names differing in case, width or spacing are the same"""
+        self.assertEqual(normalize_tag_name('  Machine\tＬearning '),
+                         'machine learning')
+        self.assertEqual(self.tag.normalized_name, 'machine learning')
+
+    def test_create_rejects_taken_name(self):
+        """Test creating a tag with a taken name is rejected"""
+        res = self.client.post(TAGS_URL, {'name': 'machine  LEARNING'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+
+        res = self.client.post(TAGS_URL, {'name': 'Rust'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_get_or_create(self):
+        """Test bulk creation reuses the tags with the same names"""
+        payload = [{'name': 'Rust'}, {'name': 'MACHINE learning'},
+                   {'name': 'rust'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        rust = Tag.objects.get(user=self.user, name='Rust')
+        self.assertEqual([tag['id'] for tag in res.data],
+                         [rust.id, self.tag.id, rust.id])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_rename_to_taken_name(self):
+        """Test tags cannot be renamed to the name of another tag"""
+        other = Tag.objects.create(user=self.user, name='Rust')
+
+        res = self.client.patch(
+            TAGS_BULK_URL,
+            [{'id': other.id, 'name': 'machine learning'}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        other.refresh_from_db()
+        self.assertEqual(other.name, 'Rust')
+
+    def test_import_reuses_tags(self):
+        """Test imported tags are matched by their normalized names"""
+        BlogImporter(self.user).import_records([{
+            'title': 'Post',
+            'tags': ['machine learning', 'Machine  Learning', 'Python'],
+        }])
+
+        post = Post.objects.get(user=self.user)
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)),
+                         ['Machine Learning', 'Python'])
+        self.assertEqual(post.tag_count, 2)
+
+    def test_merge_duplicate_tags(self):
+        """Test duplicates left by older rules are merged into the oldest"""
+        Tag.objects.bulk_create([
+            Tag(user=self.user, name='machine-learning ', normalized_name='a'),
+            Tag(user=self.user, name='MACHINE LEARNING', normalized_name='b'),
+        ])
+        duplicate = Tag.objects.get(normalized_name='b')
+        both = Post.objects.create(user=self.user, title='T', content='C')
+        both.tags.add(self.tag, duplicate)
+        moved = Post.objects.create(user=self.user, title='T', content='C')
+        moved.tags.add(duplicate)
+
+        out = StringIO()
+        call_command('merge_duplicate_tags', '--batch-size', '1', stdout=out)
+
+        self.assertIn('Merged 1 duplicate tags, re-tagging 2 posts',
+                      out.getvalue())
+        self.assertEqual(
+            list(Tag.objects.order_by('id').values_list('normalized_name',
+                                                        flat=True)),
+            ['machine learning', 'machine-learning']
+        )
+        for post in (both, moved):
+            post.refresh_from_db()
+            self.assertEqual(list(post.tags.all()), [self.tag])
+            self.assertEqual(post.tag_count, 1)
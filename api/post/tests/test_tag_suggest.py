@@ -0,0 +1,144 @@
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Post, Tag
+from post import suggest
+
+SUGGEST_URL = reverse('post:tag-suggest')
+
+
+class TagSuggestionTests(TestCase):
+    """Test cases for the tag autocompletion"""
+
+    def setUp(self):
+        suggest.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@test.com',
+            'Test123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('Django', 'django-rest', 'Docker', 'Python')
+        }
+        post = Post.objects.create(user=self.user, title='T', content='C')
+        post.tags.add(self.tags['django-rest'], self.tags['Docker'])
+        post = Post.objects.create(user=self.user, title='T', content='C')
+        post.tags.add(self.tags['django-rest'])
+
+    def _suggest(self, prefix, **params):
+        res = self.client.get(SUGGEST_URL, {'prefix': prefix, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [tag['name'] for tag in res.data]
+
+    def test_suggest_by_prefix_and_usage(self):
+        """Test tags starting with the prefix are ranked by usage"""
+        res = self.client.get(SUGGEST_URL, {'prefix': 'D'})
+
+        self.assertEqual(res.data, [
+            {'id': self.tags['django-rest'].id, 'name': 'django-rest',
+             'usage': 2},
+            {'id': self.tags['Docker'].id, 'name': 'Docker', 'usage': 1},
+            {'id': self.tags['Django'].id, 'name': 'Django', 'usage': 0},
+        ])
+        self.assertEqual(self._suggest('djA'), ['django-rest', 'Django'])
+        self.assertEqual(self._suggest('', limit=1), ['django-rest'])
+        self.assertEqual(self._suggest('x'), [])
+
+    def test_warm_index_without_queries(self):
+        """Test a loaded index answers without database queries"""
+        self._suggest('d')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._suggest('py'), ['Python'])
+
+    def test_index_follows_changes(self):
+        """Test the loaded index is updated when tags change"""
+        self._suggest('d')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            new = Tag.objects.create(user=self.user, name='Deploy')
+            self.tags['Docker'].delete()
+            self.tags['Python'].name = 'Django 4'
+            self.tags['Python'].save()
+            Post.objects.create(
+                user=self.user, title='T', content='C'
+            ).tags.add(new, self.tags['Django'])
+            self.tags['Django'].post_set.add(
+                Post.objects.create(user=self.user, title='T', content='C')
+            )
+
+        with self.assertNumQueries(0):
+            names = self._suggest('d')
+        # Ties are ranked by name
+        self.assertEqual(names, ['Django', 'django-rest', 'Deploy',
+                                 'Django 4'])
+
+    def test_other_users_tags_not_suggested(self):
+        """Test only the tags of the user are suggested"""
+        other = get_user_model().objects.create_user('o@test.com', 'Test')
+        Tag.objects.create(user=other, name='Dart')
+
+        self.assertNotIn('Dart', self._suggest('d'))
+
+    def test_concurrent_loads_share_the_index(self):
+        """Test threads needing the same index wait for a single load"""
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def load_index(user_id):
+            loads.append(user_id)
+            started.set()
+            release.wait(5)
+            return suggest.TagIndex([])
+
+        indexes = []
+        with patch.object(suggest, 'load_index', load_index):
+            threads = [
+                threading.Thread(
+                    target=lambda: indexes.append(
+                        suggest.get_index(self.user.id)
+                    )
+                )
+                for _ in range(3)
+            ]
+            for thread in threads:
+                thread.start()
+            started.wait(5)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(loads, [self.user.id])
+        self.assertEqual(len(indexes), 3)
+        self.assertTrue(all(index is indexes[0] for index in indexes))
+
+    def test_load_overlapped_by_change_not_kept(self):
+        """Test an index loaded while the tags changed is used once"""
+        load_index = suggest.load_index
+        loads = []
+
+        def load_and_change(user_id):
+            index = load_index(user_id)
+            if not loads:
+                suggest.forget_users([user_id])
+            loads.append(user_id)
+            return index
+
+        with patch.object(suggest, 'load_index', load_and_change):
+            first = suggest.get_index(self.user.id)
+            second = suggest.get_index(self.user.id)
+            third = suggest.get_index(self.user.id)
+
+        self.assertEqual(len(loads), 2)
+        self.assertIsNot(first, second)
+        self.assertIs(second, third)
@@ -1,15 +1,27 @@
-from django.urls import path, include
+from django.urls import URLPattern
 from rest_framework.routers import DefaultRouter
 
+from core.async_views import as_async_view
 from post import views
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('posts', views.PostViewSet)
 router.register('comments', views.CommentViewSet)
+router.register('follows', views.FollowViewSet)
+router.register('feed', views.FeedViewSet, basename='feed')
 
 app_name = 'post'
 
+# Read-heavy routes served from the thread pool under ASGI
+ASYNC_ROUTES = ('post-list', 'post-detail', 'comment-list', 'feed-list')
+
 urlpatterns = [
-    path('', include(router.urls))
+    URLPattern(
+        pattern.pattern,
+        as_async_view(pattern.callback),
+        pattern.default_args,
+        pattern.name
+    ) if pattern.name in ASYNC_ROUTES else pattern
+    for pattern in router.urls
 ]
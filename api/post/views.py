@@ -1,23 +1,49 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.serializers import BaseSerializer
+
+from core import tasks
+from core.streaming import ThreadedStreamingHttpResponse
+from core.models import Follow, Tag, Post, Comment
+from post import serializers, suggest
+from post.bulk import BulkModelMixin
+from post.conditional import ConditionalGetMixin
+from post.export import CONTENT_TYPES, GZIP_CONTENT_TYPE, export_filename, \
+    export_posts
+from post.fastpath import ValuesListMixin, comment_rows_representations, \
+    post_rows_representations, tag_rows_representations
+from post.feed import fan_out_posts, feed_querysets, follow, unfollow
+from post.images import process_post_image
+from post.representations import RepresentationCacheMixin
+from post.pagination import FeedPagination, TagPagination
+from post.signals import posts_changed
+from post.sparse import fieldset_key, model_columns, parse_fieldset
+from user.authentication import CachedTokenAuthentication
 
-from core.models import Tag, Post, Comment
-from post import serializers
+TAGS_MATCH = ('any', 'all')
 
 
 class TagViewSet(
+    ValuesListMixin,
+    BulkModelMixin,
     viewsets.GenericViewSet,
     mixins.ListModelMixin,
     mixins.CreateModelMixin
 ):
     """ViewSet for blog post tags"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    pagination_class = TagPagination
+    values_fields = ('id', 'name')
 
     def get_queryset(self):
         """Return objects for the current authenticated user only!"""
@@ -32,22 +58,108 @@ class TagViewSet(
         ).order_by('-name').distinct()
 
     def perform_create(self, serializer):
-        """Create a new object"""
-        serializer.save(user=self.request.user)
+        """Create a new tag, rejecting the names the user already has"""
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError(
+                {'name': ['You already have a tag with this name.']}
+            )
+
+    def represent_values(self, rows):
+        """Build the representations of tag rows"""
+        return tag_rows_representations(rows)
 
+    def bulk_create(self, items):
+        """Return the tags with the given names, creating the missing ones"""
+        serializer = self._validate_items(items)
+        if serializer is None:
+            return Response(self._errors, status=status.HTTP_400_BAD_REQUEST)
 
-class PostViewSet(viewsets.ModelViewSet):
+        tags = Tag.objects.get_or_create_many(
+            self.request.user.id,
+            [attrs['name'] for attrs in serializer.validated_data],
+            self.bulk_batch_size
+        )
+        instances = [
+            tags[attrs['normalized_name']]
+            for attrs in serializer.validated_data
+        ]
+        self.bulk_changed(instances)
+        return Response(
+            self.get_serializer(instances, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def bulk_update(self, items):
+        """Rename a list of tags, rejecting names already taken"""
+        try:
+            with transaction.atomic():
+                return super().bulk_update(items)
+        except IntegrityError:
+            return Response(
+                {'detail': 'Tag names must be unique.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+    def bulk_changed(self, instances):
+        """Invalidate the posts and the suggestions using the tags"""
+        post_ids = Post.tags.through.objects.filter(
+            tag_id__in=[tag.id for tag in instances]
+        ).values_list('post_id', flat=True)
+        posts_changed(post_ids, [self.request.user.id])
+        suggest.forget_users([self.request.user.id])
+
+    @action(methods=['GET'], detail=False, url_path='suggest',
+            url_name='suggest')
+    def suggest_tags(self, request):
+        """
+        Suggest the most used tags of the user starting with `?prefix=`.
+        `?limit=` sets the number of suggestions.
+        """
+        options = suggest.get_options()
+        try:
+            limit = int(request.query_params.get('limit', options['LIMIT']))
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+        limit = max(1, min(limit, options['MAX_LIMIT']))
+
+        index = suggest.get_index(request.user.id)
+        return Response([
+            {'id': tag_id, 'name': name, 'usage': usage}
+            for tag_id, name, usage in index.suggest(
+                request.query_params.get('prefix', ''),
+                limit
+            )
+        ])
+
+
+class PostViewSet(
+    ConditionalGetMixin,
+    ValuesListMixin,
+    RepresentationCacheMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet
+):
     """
     Manage blog posts in the database
     """
     serializer_class = serializers.PostSerializer
     queryset = Post.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    # Rate limit scope, reads or writes unless an action sets it
+    throttle_scope = None
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param=None):
         """Convert a list of string IDs to integers"""
-        return [int(str_id) for str_id in qs.split(',')]
+        try:
+            return [int(str_id) for str_id in qs.split(',')]
+        except ValueError:
+            raise ValidationError({param or 'ids': [
+                'Must be a comma separated list of ids.'
+            ]})
 
     def get_queryset(self):
         """Retrieve the posts for the authenticated user"""
@@ -57,38 +169,154 @@ class PostViewSet(viewsets.ModelViewSet):
         queryset = self.queryset
 
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = queryset.with_tags(
+                self._params_to_ints(tags, 'tags'),
+                self.tags_match
+            )
 
         if comments:
-            comments_ids = self._params_to_ints(comments)
-            queryset = queryset.filter(comments__id__in=comments_ids)
+            queryset = queryset.with_comments(
+                self._params_to_ints(comments, 'comments')
+            )
+
+        queryset = queryset.filter(user=self.request.user)
+
+        if self.action == 'list' and self.search_text is not None:
+            queryset = queryset.search(self.search_text)
+
+        # Load the relations each serializer emits up front, so that the
+        # number of queries does not grow with the number of posts.
+        if self.action in ('list', 'retrieve'):
+            queryset = self._load_fieldset(queryset)
+        elif self.action == 'bulk':
+            queryset = queryset.with_relation_ids()
+        return queryset
+
+    def _load_fieldset(self, queryset):
+        """Load only the columns and relations the serializer emits"""
+        fields = self.get_serializer().fields
+        queryset = queryset.only(
+            'user', 'created_on', *model_columns(Post, fields)
+        )
+
+        relations = [name for name in ('tags', 'comments') if name in fields]
+        nested = [
+            name for name in relations
+            if isinstance(fields[name], BaseSerializer)
+        ]
+        return queryset.with_relations(nested).with_relation_ids(
+            [name for name in relations if name not in nested]
+        )
+
+    def get_serializer_context(self):
+        """Pass the requested fieldset to the serializers of reads"""
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context.update(parse_fieldset(self.request))
+        return context
+
+    def get_representation_kind(self):
+        """Cache every requested fieldset separately"""
+        kind = super().get_representation_kind()
+        key = fieldset_key(parse_fieldset(self.request))
+        return f'{kind}:{key}' if key else kind
 
-        return queryset.filter(user=self.request.user)
+    def get_values_fields(self):
+        """Select the columns of the fields of the list serializer"""
+        fields = self.get_serializer().fields
+        return ['id', 'user', *sorted(model_columns(Post, fields) - {'id'})]
+
+    def represent_values(self, rows):
+        """Build the representations of post rows, through the cache"""
+        fields = list(self.get_serializer().fields)
+        return self.cached_representations(
+            rows,
+            lambda row: (row['id'], row['user']),
+            lambda misses: post_rows_representations(misses, fields)
+        )
+
+    @property
+    def search_text(self):
+        """Return the full-text search query of the request, if any"""
+        return self.request.query_params.get('q')
+
+    @property
+    def tags_match(self):
+        """Return whether posts must have `any` or `all` the tags"""
+        match = self.request.query_params.get('tags_match', 'any')
+        if match not in TAGS_MATCH:
+            raise ValidationError({'tags_match': [
+                f'Must be one of: {", ".join(TAGS_MATCH)}.'
+            ]})
+        return match
+
+    @property
+    def slim(self):
+        """Whether to list the counts of the relations instead of ids"""
+        return bool(int(self.request.query_params.get('slim', 0)))
+
+    def get_keyset_ordering(self):
+        """Order search results by relevance"""
+        if self.search_text is not None:
+            return ('search_rank', '-id')
+        return None
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
             return serializers.PostDetailSerializer
+        elif self.action == 'list' and self.slim:
+            return serializers.PostSlimSerializer
         elif self.action == 'upload_image':
             return serializers.PostImageSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
-        """Create a new blog post"""
-        serializer.save(user=self.request.user)
+        """Create a new blog post and write it into the feeds"""
+        post = serializer.save(user=self.request.user)
+        tasks.submit(fan_out_posts, [post.id])
+
+    def bulk_create(self, items):
+        """Create blog posts and write them into the feeds"""
+        response = super().bulk_create(items)
+        if response.status_code == status.HTTP_201_CREATED:
+            tasks.submit(fan_out_posts, [post['id'] for post in response.data])
+        return response
+
+    def bulk_changed(self, instances):
+        """Recount and invalidate the data derived from the posts"""
+        Post.objects.filter(
+            id__in=[post.id for post in instances]
+        ).refresh_counts()
+        posts_changed(
+            [post.id for post in instances],
+            [self.request.user.id]
+        )
+        suggest.forget_users([self.request.user.id])
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['POST'], detail=True, url_path='upload-image',
+            throttle_scope='upload')
     def upload_image(self, request, pk=None):
-        """Upload an image to a blog post"""
+        """
+        Upload an image to a blog post.
+        The resized variants of the image are generated in the background
+        and show up in the post once they are ready.
+        """
         post = self.get_object()
+        stale_variants = post.image_variants
         serializer = self.get_serializer(
             post,
             data=request.data
         )
 
         if serializer.is_valid():
-            serializer.save()
+            post = serializer.save(image_variants={})
+            tasks.submit(
+                process_post_image,
+                post.id,
+                post.image.name,
+                stale_variants
+            )
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -99,24 +327,94 @@ class PostViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """
+        Stream the posts of the user with their tags and comments.
+        `?output=ndjson` (default) or `?output=csv` picks the format,
+        `?gzip=1` compresses the export on the fly.
+        """
+        export_format = request.query_params.get('output', 'ndjson')
+        if export_format not in CONTENT_TYPES:
+            raise ValidationError({'output': [
+                f'Must be one of: {", ".join(CONTENT_TYPES)}.'
+            ]})
+        compress = bool(int(request.query_params.get('gzip', 0)))
+        queryset = self.get_queryset()
+
+        def export():
+            return export_posts(queryset, export_format, compress)
 
-class CommentViewSet(viewsets.ModelViewSet):
+        content_type = GZIP_CONTENT_TYPE if compress \
+            else CONTENT_TYPES[export_format]
+        # Under ASGI the export is produced in a thread of its own and
+        # awaited by core.streaming.ASGIHandler, as the ORM cannot run in
+        # the thread of the event loop and must not block it
+        if isinstance(request._request, ASGIRequest):
+            response = ThreadedStreamingHttpResponse(
+                export,
+                content_type=content_type
+            )
+        else:
+            response = StreamingHttpResponse(
+                export(),
+                content_type=content_type
+            )
+        response['Content-Disposition'] = (
+            f'attachment; filename="'
+            f'{export_filename(export_format, compress)}"'
+        )
+        return response
+
+
+class CommentViewSet(
+    ConditionalGetMixin,
+    ValuesListMixin,
+    BulkModelMixin,
+    viewsets.ModelViewSet
+):
     """ViewSet for blog post comments"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Comment.objects.all()
     serializer_class = serializers.CommentSerializer
+    values_fields = ('id', 'content', 'post', 'user', 'created_on')
 
     def get_queryset(self):
         """Return objects for the current authenticated user only!"""
-        return self.queryset.filter(
+        queryset = self.queryset.filter(
             user=self.request.user
         ).order_by('-created_on')
 
+        if self.action == 'list' and self.search_text is not None:
+            queryset = queryset.search(self.search_text)
+
+        if self.action == 'retrieve':
+            queryset = queryset.select_related('post').prefetch_related(
+                'post__tags',
+                'post__comments'
+            )
+        return queryset
+
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    @property
+    def search_text(self):
+        """Return the full-text search query of the request, if any"""
+        return self.request.query_params.get('q')
+
+    def get_keyset_ordering(self):
+        """Order search results by relevance"""
+        if self.search_text is not None:
+            return ('search_rank', '-id')
+        return None
+
+    def represent_values(self, rows):
+        """Build the representations of comment rows"""
+        return comment_rows_representations(rows)
+
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action == 'retrieve':
@@ -126,3 +424,84 @@ class CommentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Create a new blog post"""
         serializer.save(user=self.request.user)
+
+    def bulk_changed(self, instances):
+        """Recount and invalidate the posts of the comments"""
+        post_ids = {comment.post_id for comment in instances}
+        Post.objects.filter(id__in=post_ids).refresh_counts()
+        posts_changed(post_ids, [self.request.user.id])
+
+
+class FollowViewSet(
+    viewsets.GenericViewSet,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin
+):
+    """ViewSet for the users followed by the authenticated user"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = Follow.objects.all()
+    serializer_class = serializers.FollowSerializer
+    lookup_field = 'followee'
+
+    def get_queryset(self):
+        """Return the follows of the current authenticated user only!"""
+        return self.queryset.filter(follower=self.request.user)
+
+    def perform_create(self, serializer):
+        """Follow a user, which is a no-op when already following them"""
+        serializer.instance, created = follow(
+            self.request.user,
+            serializer.validated_data['followee']
+        )
+
+    def perform_destroy(self, instance):
+        """Unfollow a user and drop their posts from the feed"""
+        unfollow(instance.follower_id, instance.followee_id)
+
+
+class FeedViewSet(RepresentationCacheMixin, viewsets.GenericViewSet):
+    """
+    Read the posts of the followed users and of the authenticated user,
+    newest first, with the id of their author in `user`
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = Post.objects.all()
+    serializer_class = serializers.PostSerializer
+    pagination_class = FeedPagination
+
+    def list(self, request, *args, **kwargs):
+        rows = self.paginator.paginate_querysets(
+            feed_querysets(request.user.id),
+            request,
+            self
+        )
+        data = self.cached_representations(
+            rows,
+            lambda row: (row['post_id'], row['author_id']),
+            self._serialize
+        )
+        return self.get_paginated_response([
+            {'user': row['author_id'], **representation}
+            for row, representation in zip(rows, data)
+            if representation is not None
+        ])
+
+    def _serialize(self, rows):
+        """
+        Serialize the posts of feed rows, in the order of the rows, with
+        None for the posts deleted since the rows were read
+        """
+        posts = self.queryset.with_relation_ids().in_bulk(
+            [row['post_id'] for row in rows]
+        )
+        data = iter(self.get_serializer(
+            [posts[row['post_id']] for row in rows if row['post_id'] in posts],
+            many=True
+        ).data)
+        return [
+            next(data) if row['post_id'] in posts else None
+            for row in rows
+        ]
@@ -0,0 +1,218 @@
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from rest_framework.authentication import TokenAuthentication
+
+DEFAULTS = {
+    # Number of tokens kept in the memory of every process
+    'MAX_SIZE': 10000,
+    # Seconds after which a cached token is looked up again
+    'TTL': 60,
+    # Alias of a Django cache shared by all processes, if any
+    'CACHE_ALIAS': None,
+    # Seconds a token found in the shared cache is also kept in memory,
+    # which bounds how long other processes miss an invalidation
+    'LOCAL_TTL': 5,
+}
+
+
+def get_options():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+class TokenCache:
+    """
+    Cache of authenticated (user, token) pairs.
+    The pairs are kept in a bounded LRU in the memory of the process. With
+    a cache alias, they are kept in that Django cache too, and only for
+    LOCAL_TTL seconds in memory, so an invalidation made by any process
+    is seen by all of them within LOCAL_TTL seconds. Without, other
+    processes only notice invalidations once the entries expire.
+
+    Invalidations bump a generation, and the credentials looked up before
+    an invalidation are not cached under the new generation, so a request
+    racing an invalidation cannot cache the credentials it read. Every
+    lookup returns new copies, which a request can change without
+    affecting the others.
+    """
+
+    def __init__(self, max_size, ttl, cache_alias=None, local_ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = caches[cache_alias] if cache_alias else None
+        if self.shared is None or local_ttl is None:
+            local_ttl = ttl
+        self.local_ttl = min(local_ttl, ttl)
+        self._entries = OrderedDict()
+        # Bumped by every invalidation made in this process
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Create the cache configured by the TOKEN_AUTH_CACHE setting"""
+        options = get_options()
+        return cls(
+            max_size=options['MAX_SIZE'],
+            ttl=options['TTL'],
+            cache_alias=options['CACHE_ALIAS'],
+            local_ttl=options['LOCAL_TTL']
+        )
+
+    @staticmethod
+    def _shared_key(key):
+        # Avoid storing the raw token keys in the shared cache
+        return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def _generation_key(cls, key):
+        return cls._shared_key(key) + ':generation'
+
+    def get(self, key):
+        """
+        Return the cached credentials for a token key
+        :param key: The token key sent by the client
+        :return: (user, token) tuple or None when not cached
+        """
+        return self.lookup(key)[0]
+
+    def lookup(self, key):
+        """
+        Return the cached credentials for a token key, and the stamp to
+        cache the credentials read on a miss with
+        :param key: The token key sent by the client
+        :return: ((user, token) tuple or None when not cached, stamp)
+        """
+        now = time.monotonic()
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            return pickle.loads(entry[1]), None
+        if self.shared is None:
+            return None, (generation, None)
+
+        shared_key = self._shared_key(key)
+        generation_key = self._generation_key(key)
+        values = self.shared.get_many([shared_key, generation_key])
+        shared_generation = values.get(generation_key, 0)
+        entry = values.get(shared_key)
+        if entry is not None and entry[0] == shared_generation:
+            self._set_local(key, entry[1], generation)
+            return pickle.loads(entry[1]), None
+        return None, (generation, shared_generation)
+
+    def set(self, key, credentials, stamp=None):
+        """
+        Cache the credentials of a token key
+        :param key: The token key sent by the client
+        :param credentials: (user, token) tuple
+        :param stamp: Stamp returned by the lookup that missed, before the
+        credentials were read, None to cache them as current
+        :return: None
+        """
+        if stamp is None:
+            stamp = self.current_stamp(key)
+        generation, shared_generation = stamp
+        data = pickle.dumps(credentials, pickle.HIGHEST_PROTOCOL)
+        if self.shared is not None:
+            self.shared.set(
+                self._shared_key(key),
+                (shared_generation, data),
+                self.ttl
+            )
+        self._set_local(key, data, generation)
+
+    def current_stamp(self, key):
+        """Return the stamp to cache the current credentials of a token"""
+        with self._lock:
+            generation = self._generation
+        if self.shared is None:
+            return generation, None
+        return generation, self.shared.get(self._generation_key(key), 0)
+
+    def _set_local(self, key, data, generation):
+        with self._lock:
+            # Invalidated since the credentials were read
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.local_ttl, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        """Remove the given token keys from the cache"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+        if self.shared is None:
+            return
+        for key in keys:
+            generation_key = self._generation_key(key)
+            try:
+                self.shared.incr(generation_key)
+            except ValueError:
+                # First invalidation, unless another process won
+                if not self.shared.add(generation_key, 1, None):
+                    self.shared.incr(generation_key)
+        if keys:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Remove all the tokens cached in the memory of this process"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the token cache of this process"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache.from_settings()
+    return _token_cache
+
+
+def _reset_token_cache(*args, setting, **kwargs):
+    global _token_cache
+    if setting in ('TOKEN_AUTH_CACHE', 'CACHES'):
+        _token_cache = None
+
+
+setting_changed.connect(_reset_token_cache)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that caches the token lookups.
+    The entries are invalidated by the signals in user.signals whenever a
+    token is deleted or its user is saved, e.g. deactivated or given a new
+    password. Processes sharing a cache, see TOKEN_AUTH_CACHE, all see the
+    invalidation within LOCAL_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        credentials, stamp = token_cache.lookup(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials, stamp)
+        return credentials
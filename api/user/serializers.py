@@ -3,8 +3,10 @@ from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for the users object"""
 
     class Meta:
@@ -27,7 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class AuthTokenSerializer(serializers.Serializer):
+class AuthTokenSerializer(TimedSerializerMixin, serializers.Serializer):
     """Serializer for the user authentication object"""
     email = serializers.CharField(max_length=255)
     password = serializers.CharField(
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import get_token_cache
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Drop a deleted token from the authentication cache"""
+    _invalidate([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Drop the cached tokens of a user whenever the user is saved.
+    This covers deactivation, password changes made through
+    UserSerializer.update and any other change to the cached user.
+    """
+    if created:
+        return
+
+    _invalidate(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+
+
+def _invalidate(keys):
+    """
+    Drop tokens from the cache now, and again once the transaction
+    commits, as requests may cache the rows read before the commit
+    """
+    keys = list(keys)
+
+    def invalidate():
+        get_token_cache().delete(*keys)
+
+    invalidate()
+    transaction.on_commit(invalidate)
@@ -0,0 +1,143 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import TokenCache, get_token_cache
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test cases for the cached token authentication
+    """
+
+    def setUp(self):
+        caches['default'].clear()
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@test.com',
+            password='Test123',
+            name='Test User'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_lookup_is_cached(self):
+        """Test that the token is only looked up on the first request"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_deleted_token_is_rejected(self):
+        """Test that a deleted token cannot be used any more"""
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_is_rejected(self):
+        """Test that deactivating a user invalidates the cached token"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        """Test that updating the user is reflected on the next request"""
+        self.client.get(ME_URL)
+        payload = {'name': 'New Name', 'password': 'NewPassword123'}
+        self.client.patch(ME_URL, payload)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], payload['name'])
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1, 'TTL': 60})
+    def test_cache_size_is_bounded(self):
+        """Test that the least recently used tokens are evicted"""
+        other = get_user_model().objects.create_user(
+            email='other@test.com',
+            password='Test123'
+        )
+        other_token = Token.objects.create(user=other)
+
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        self.client.get(ME_URL)
+
+        self.assertIsNone(get_token_cache().get(self.token.key))
+        self.assertIsNotNone(get_token_cache().get(other_token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 10, 'TTL': 60})
+    def test_requests_get_copies_of_the_user(self):
+        """Test a request changing its user does not change the cache"""
+        self.client.get(ME_URL)
+
+        user, token = get_token_cache().get(self.token.key)
+        user.name = 'Changed'
+
+        cached_user, cached_token = get_token_cache().get(self.token.key)
+        self.assertIsNot(cached_user, user)
+        self.assertEqual(cached_user.name, 'Test User')
+        self.assertIs(cached_token.user, cached_user)
+
+    def _shared_cache(self, local_ttl=0):
+        return TokenCache(max_size=10, ttl=60, cache_alias='default',
+                          local_ttl=local_ttl)
+
+    def test_invalidation_seen_by_every_process(self):
+        """Test processes sharing a cache see the deletions of the others"""
+        first = self._shared_cache()
+        second = self._shared_cache()
+        first.set(self.token.key, (self.user, self.token))
+        self.assertEqual(second.get(self.token.key), (self.user, self.token))
+
+        second.delete(self.token.key)
+
+        self.assertIsNone(first.get(self.token.key))
+
+    def test_memory_in_front_of_shared_cache(self):
+        """Test tokens found in the shared cache are then kept in memory"""
+        token_cache = self._shared_cache(local_ttl=5)
+        self._shared_cache().set(self.token.key, (self.user, self.token))
+        self.assertIsNotNone(token_cache.get(self.token.key))
+
+        with patch.object(caches['default'], 'get_many') as get_many:
+            self.assertEqual(token_cache.get(self.token.key),
+                             (self.user, self.token))
+        get_many.assert_not_called()
+
+    def test_lookup_racing_invalidation_not_cached(self):
+        """Test credentials read before an invalidation are not cached"""
+        for invalidating in (self._shared_cache(), None):
+            with self.subTest(same_process=invalidating is None):
+                token_cache = self._shared_cache(local_ttl=5)
+                credentials, stamp = token_cache.lookup(self.token.key)
+                self.assertIsNone(credentials)
+
+                (invalidating or token_cache).delete(self.token.key)
+                token_cache.set(self.token.key, (self.user, self.token),
+                                stamp)
+
+                self.assertIsNone(self._shared_cache().get(self.token.key))
+                if invalidating is None:
+                    self.assertIsNone(token_cache.get(self.token.key))
@@ -1,11 +1,24 @@
 from django.urls import path
 
+from core import hashers
+from core.async_views import as_async_view
+
 from .views import CreateUserView, CreateTokenView, ManageUserView
 
 app_name = "user"
 
+# Under ASGI, logins waiting for a hashing slot wait in the event loop
+# instead of holding threads the other views need
+HASHING_CONCURRENCY = hashers.get_options()['MAX_CONCURRENCY']
+
 urlpatterns = [
-    path('create/', CreateUserView.as_view(), name='create'),
-    path('token/', CreateTokenView.as_view(), name='token'),
+    path('create/', as_async_view(
+        CreateUserView.as_view(),
+        max_concurrency=HASHING_CONCURRENCY
+    ), name='create'),
+    path('token/', as_async_view(
+        CreateTokenView.as_view(),
+        max_concurrency=HASHING_CONCURRENCY
+    ), name='token'),
     path('me/', ManageUserView.as_view(), name='me'),
 ]
@@ -1,25 +1,31 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.hashers import HashingSlotMixin
+
+from .authentication import CachedTokenAuthentication
 from .serializers import UserSerializer, AuthTokenSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(HashingSlotMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_scope = 'auth'
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(HashingSlotMixin, ObtainAuthToken):
     """Create a bew auth token for user"""
     serializer_class = AuthTokenSerializer
+    throttle_scope = 'auth'
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the Authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):